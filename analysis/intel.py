@@ -1,45 +1,223 @@
-import re
-from typing import List, Dict, Any
-from output.logger import log
-
-class IntelAnalyzer:
-    def __init__(self, records: List[Dict[str, Any]]):
-        self.records = records
-        self.vulns = []
-
-    def run(self) -> List[Dict[str, Any]]:
-        self._check_rfc1918()
-        self._check_email_spoofing()
-        self._check_high_value()
-        return self.vulns
-
-    def _check_rfc1918(self):
-        """Checks for Private IP leakage."""
-        private_patterns = [r"^10\.", r"^172\.(1[6-9]|2[0-9]|3[0-1])\.", r"^192\.168\."]
-        for rec in self.records:
-            if rec['type'] == 'A':
-                for pat in private_patterns:
-                    if re.match(pat, rec['value']):
-                        msg = f"Private IP Leakage: {rec['name']} -> {rec['value']}"
-                        self.vulns.append({"severity": "HIGH", "msg": msg})
-
-    def _check_email_spoofing(self):
-        """Checks for DMARC/SPF weakness."""
-        has_spf = False
-        has_dmarc = False
-        for rec in self.records:
-            if rec['type'] == 'TXT':
-                if "v=spf1" in rec['value']: has_spf = True
-                if "_dmarc" in rec['name']: has_dmarc = True
-        
-        if not has_dmarc:
-            self.vulns.append({"severity": "MEDIUM", "msg": "Missing DMARC record (Email Spoofing Risk)"})
-        if not has_spf:
-            self.vulns.append({"severity": "MEDIUM", "msg": "Missing SPF record"})
-
-    def _check_high_value(self):
-        keywords = ['git', 'dev', 'stg', 'vpn', 'admin', 'jenkins', 'k8s', 'api']
-        for rec in self.records:
-            for kw in keywords:
-                if kw in rec['name'].lower():
-                    self.vulns.append({"severity": "INFO", "msg": f"High Value Target: {rec['name']}"})
\ No newline at end of file
+import bisect
+import importlib
+import ipaddress
+import json
+import os
+import re
+import socket
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from output.logger import log
+from core.records import Record, RecordSet, NameTree
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "intel_rules.json")
+
+class CIDRSet:
+    """
+    Address ranges flattened into sorted, non-overlapping integer intervals per IP version,
+    so looking an address up is one bisect no matter how many networks are loaded.
+    Where networks nest, the narrowest one labels the addresses it covers.
+    """
+    def __init__(self, networks: Dict[str, Iterable[str]]):
+        self._starts = {4: [], 6: []}
+        self._ranges = {4: [], 6: []}
+        spans = {4: [], 6: []}
+        for label, cidrs in networks.items():
+            for cidr in cidrs:
+                net = ipaddress.ip_network(cidr, strict=False)
+                spans[net.version].append((int(net.network_address), int(net.broadcast_address), label))
+        for version, items in spans.items():
+            for start, end, label in self._flatten(items):
+                self._starts[version].append(start)
+                self._ranges[version].append((start, end, label))
+
+    @staticmethod
+    def _flatten(spans: List[tuple]) -> List[tuple]:
+        # CIDR blocks are either nested or disjoint, so a stack sweep splits them cleanly
+        segments = []
+        stack = [] # (end, label), innermost last
+        cursor = 0
+
+        def close_until(limit):
+            nonlocal cursor
+            while stack and stack[-1][0] < limit:
+                end, label = stack.pop()
+                if cursor <= end:
+                    segments.append((cursor, end, label))
+                    cursor = end + 1
+
+        for start, end, label in sorted(spans, key=lambda s: (s[0], -s[1])):
+            close_until(start)
+            if stack and cursor < start:
+                segments.append((cursor, start - 1, stack[-1][1]))
+            cursor = start
+            stack.append((end, label))
+        close_until(float("inf"))
+        return segments
+
+    def lookup(self, address: str) -> Optional[str]:
+        """Label of the range address falls in, or None (also for anything that is not an IP)."""
+        # inet_pton parses in C, several times faster than ipaddress.ip_address()
+        try:
+            packed = socket.inet_pton(socket.AF_INET, address)
+            version = 4
+        except OSError:
+            try:
+                packed = socket.inet_pton(socket.AF_INET6, address)
+                version = 6
+            except (OSError, ValueError):
+                return None
+        value = int.from_bytes(packed, "big")
+        i = bisect.bisect_right(self._starts[version], value) - 1
+        if i >= 0:
+            start, end, label = self._ranges[version][i]
+            if value <= end:
+                return label
+        return None
+
+class KeywordMatcher:
+    """
+    Finds which of many keywords occur in a string in one scan. The keywords are compiled
+    into a single alternation, which the C regex engine walks once per string.
+    """
+    def __init__(self, keywords: Iterable[str]):
+        keywords = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+
+    def search(self, text: str) -> Optional[str]:
+        """The first keyword found in text, or None."""
+        match = self._pattern.search(text.lower()) if self._pattern else None
+        return match.group() if match else None
+
+class Rule:
+    """
+    One check. start() gets the name index before the pass, for checks about particular
+    names; observe() sees every record of the listed types exactly once; finish() runs
+    after the pass, for checks that depend on the zone as a whole.
+    """
+    types: Optional[Tuple[str, ...]] = None # None = every record type, () = none
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.vulns = []
+
+    def start(self, tree: NameTree, domain: Optional[str]):
+        pass
+
+    def observe(self, rec: Record):
+        pass
+
+    def finish(self) -> List[Dict[str, Any]]:
+        return self.vulns
+
+RULES: Dict[str, type] = {}
+
+def register_rule(name: str):
+    """Class decorator that makes a rule available to the config under name."""
+    def wrap(cls):
+        RULES[name] = cls
+        return cls
+    return wrap
+
+@register_rule("private_address")
+class PrivateAddressRule(Rule):
+    """Checks for Private IP Leakage."""
+    types = ("A", "AAAA")
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.ranges = CIDRSet({**config.get("private_ranges", {}), **config.get("cidrs", {})})
+
+    def observe(self, rec: Record):
+        label = self.ranges.lookup(rec.value)
+        if label:
+            msg = f"Private IP Leakage: {rec.name} -> {rec.value} ({label})"
+            self.vulns.append({"severity": "HIGH", "msg": msg})
+
+@register_rule("email_spoofing")
+class EmailSpoofingRule(Rule):
+    """Checks for DMARC/SPF weakness at the apex; needs the domain."""
+    types = () # Two owner lookups in the name index instead of a pass over every TXT record
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.has_spf = None # None until start() had a domain to look at
+        self.has_dmarc = None
+
+    def start(self, tree: NameTree, domain: Optional[str]):
+        if domain is None:
+            return
+        apex, dmarc = tree.find(domain), tree.find(f"_dmarc.{domain}")
+        self.has_spf = apex is not None and any("v=spf1" in rec.value for rec in apex.records.get("TXT", ()))
+        self.has_dmarc = dmarc is not None and "TXT" in dmarc.records
+
+    def finish(self) -> List[Dict[str, Any]]:
+        if self.has_dmarc is None:
+            return self.vulns
+        if not self.has_dmarc:
+            self.vulns.append({"severity": "MEDIUM", "msg": "Missing DMARC record (Email Spoofing Risk)"})
+        if not self.has_spf:
+            self.vulns.append({"severity": "MEDIUM", "msg": "Missing SPF record"})
+        return self.vulns
+
+@register_rule("high_value")
+class HighValueRule(Rule):
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.matcher = KeywordMatcher(config.get("keywords", []))
+
+    def observe(self, rec: Record):
+        if self.matcher.search(rec.name):
+            self.vulns.append({"severity": "INFO", "msg": f"High Value Target: {rec.name}"})
+
+def load_config(path: str = DEFAULT_CONFIG) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def build_rules(config: Dict[str, Any]) -> List[Rule]:
+    """Instantiates the configured rules; "package.module:Class" loads a plugin rule."""
+    rules = []
+    for name in config.get("rules", list(RULES)):
+        if ":" in name:
+            module, cls = name.split(":", 1)
+            rule_cls = getattr(importlib.import_module(module), cls)
+        elif name in RULES:
+            rule_cls = RULES[name]
+        else:
+            log.warning(f"[yellow]![/] Unknown intel rule '{name}', skipping")
+            continue
+        rules.append(rule_cls(config))
+    return rules
+
+class IntelAnalyzer:
+    """Runs every configured rule over the records in a single pass."""
+    def __init__(self, records: Iterable[Record], config: Optional[Dict[str, Any]] = None,
+                 domain: Optional[str] = None):
+        self.records = records
+        self.config = config if config is not None else load_config()
+        self.domain = domain
+        self.vulns = []
+
+    def run(self) -> List[Dict[str, Any]]:
+        rules = build_rules(self.config)
+        tree = self.records.index() if isinstance(self.records, RecordSet) else NameTree(self.records)
+        for rule in rules:
+            rule.start(tree, self.domain)
+        # Dispatch table: each record only visits the rules that look at its type
+        by_type = {}
+        for rule in rules:
+            for rtype in ("*",) if rule.types is None else rule.types:
+                by_type.setdefault(rtype, []).append(rule)
+        every = by_type.pop("*", [])
+        cache = {}
+
+        for rec in self.records:
+            rtype = rec.type
+            targets = cache.get(rtype)
+            if targets is None:
+                targets = cache[rtype] = by_type.get(rtype, []) + every
+            for rule in targets:
+                rule.observe(rec)
+
+        for rule in rules:
+            self.vulns.extend(rule.finish())
+        return self.vulns
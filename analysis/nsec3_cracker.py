@@ -0,0 +1,86 @@
+import base64
+import itertools
+import multiprocessing
+import dns.name
+from typing import List, Iterable, Iterator, Set, Optional
+from output.logger import log
+from core.nsec3 import NSEC3Chain, name_wire, nsec3_digest
+from core.records import Record
+
+# Suffixes tried on every word in permutation mode
+PERMUTATIONS = [str(n) for n in range(10)] + ["-dev", "-test", "-stg", "-prod", "-api", "-old", "-new"]
+
+# Per-process state, set once by the pool initializer instead of being pickled per batch
+_targets = None
+_origin_wire = None
+_salt = None
+_iterations = None
+
+def _init_worker(targets: Set[bytes], origin_wire: bytes, salt: bytes, iterations: int):
+    global _targets, _origin_wire, _salt, _iterations
+    _targets, _origin_wire, _salt, _iterations = targets, origin_wire, salt, iterations
+
+def _crack_batch(labels: List[str]) -> tuple:
+    found = []
+    for label in labels:
+        try:
+            wire = name_wire(label, _origin_wire)
+        except ValueError:
+            continue # Longer than a name may be under this origin
+        digest = nsec3_digest(wire, _salt, _iterations)
+        if digest in _targets:
+            found.append((label, digest))
+    return len(labels), found
+
+class NSEC3Cracker:
+    """
+    Offline dictionary attack on harvested NSEC3 hashes. Candidates are hashed in batches
+    across a multiprocessing pool; each worker only sends back its matches.
+    """
+    def __init__(self, chain: NSEC3Chain, domain: str):
+        self.chain = chain
+        self.domain = domain
+        self.origin_wire = dns.name.from_text(domain).canonicalize().to_wire()
+        self.tried = 0
+
+    def crack(self, wordlist: str, permute: bool = False, processes: Optional[int] = None,
+              batch_size: int = 5000) -> List[Record]:
+        targets = self.chain.hashes()
+        log.info(f"[cyan]➜[/] Cracking {len(targets)} NSEC3 hashes with {wordlist}...")
+        cracked = {}
+
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(targets, self.origin_wire, self.chain.salt, self.chain.iterations)) as pool:
+            batches = self._batches(self._candidates(wordlist, permute), batch_size)
+            for tried, found in pool.imap_unordered(_crack_batch, batches):
+                self.tried += tried
+                for label, digest in found:
+                    cracked[digest] = label
+                if len(cracked) == len(targets):
+                    break # Leaving the with block terminates the remaining batches
+
+        log.info(f"[bold green]✓[/] Cracked {len(cracked)}/{len(targets)} NSEC3 hashes ({self.tried} candidates)")
+        return [Record(f"{label}.{self.domain}", "NSEC3_CRACKED", base64.b32hexencode(digest).decode().lower())
+                for digest, label in cracked.items()]
+
+    def _candidates(self, wordlist: str, permute: bool) -> Iterator[str]:
+        with open(wordlist, errors="ignore") as f:
+            for line in f:
+                word = line.strip().lower()
+                labels = word.split(".")
+                if not word.isascii() or not all(0 < len(label) <= 63 for label in labels):
+                    continue
+                yield word
+                if permute:
+                    for suffix in PERMUTATIONS:
+                        # Permutations extend the leftmost label: "www.dev" -> "www-old.dev"
+                        if len(labels[0]) + len(suffix) <= 63:
+                            yield labels[0] + suffix + word[len(labels[0]):]
+
+    def _batches(self, candidates: Iterable[str], size: int) -> Iterator[List[str]]:
+        iterator = iter(candidates)
+        while True:
+            batch = list(itertools.islice(iterator, size))
+            if not batch:
+                return
+            yield batch
@@ -1,39 +1,200 @@
-import networkx as nx
-from typing import List, Dict, Any
-from output.logger import log
-
-class TopologyVisualizer:
-    def __init__(self, records: List[Dict[str, Any]], domain: str):
-        self.records = records
-        self.domain = domain
-        self.graph = nx.DiGraph()
-
-    def generate(self, output_path: str):
-        log.info("[cyan]➜[/] Generating network topology graph...")
-        
-        # Add Root
-        self.graph.add_node(self.domain, type='root', color='red')
-
-        for rec in self.records:
-            node_name = rec['name']
-            value = rec['value']
-            rtype = rec['type']
-
-            # Simplify graph: Connect subdomains to root
-            if node_name.endswith(self.domain):
-                self.graph.add_edge(self.domain, node_name)
-                self.graph.add_node(node_name, type='subdomain', label=f"{node_name}\n({rtype})")
-
-                # If it's a CNAME or MX, connect to the target
-                if rtype in ['CNAME', 'MX', 'NS']:
-                    self.graph.add_edge(node_name, value)
-                    self.graph.add_node(value, type='external', color='grey')
-            
-        try:
-            # Export to DOT format
-            nx.drawing.nx_pydot.write_dot(self.graph, output_path)
-            log.info(f"[bold green]✓[/] Graph saved to {output_path}")
-        except ImportError:
-            log.error("[red]![/] PyGraphviz/Pydot not installed. Cannot write .dot file directly. Install 'pydot'.")
-        except Exception as e:
-            log.error(f"[red]![/] Visualization failed: {e}")
\ No newline at end of file
+import json
+import socket
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+from output.logger import log
+from core.records import Record, RecordSet, NameTree, NameNode
+
+GRAPH_FORMATS = ("dot", "graphml", "json")
+# File suffix per format; the edge list must not clobber the exporter's <domain>.json
+GRAPH_SUFFIXES = {"dot": "dot", "graphml": "graphml", "json": "edges.json"}
+AGGREGATIONS = ("parent", "network", "provider")
+
+# Record types whose value names another host the graph links to
+LINK_TYPES = ("CNAME", "MX", "NS")
+
+class DotWriter:
+    """Graphviz DOT, written node by node; a node's attributes come from its first declaration."""
+    def __init__(self, f: TextIO, name: str):
+        self.f = f
+        f.write(f"digraph {self._quote(name)} {{\n")
+
+    # DOT takes the same \" \\ \n escapes as JSON, and the C encoder is far quicker than replace()
+    _quote = staticmethod(json.JSONEncoder(ensure_ascii=False).encode)
+
+    def _attrs(self, attrs: Dict[str, str]) -> str:
+        if not attrs:
+            return ""
+        return " [" + ", ".join(f"{key}={self._quote(value)}" for key, value in attrs.items()) + "]"
+
+    def node(self, node: str, **attrs):
+        self.f.write(f"{self._quote(node)}{self._attrs(attrs)};\n")
+
+    def edge(self, source: str, target: str, **attrs):
+        self.f.write(f"{self._quote(source)} -> {self._quote(target)}{self._attrs(attrs)};\n")
+
+    def close(self):
+        self.f.write("}\n")
+
+class GraphMLWriter:
+    """GraphML for Gephi/yEd/Cytoscape. Nodes and edges may interleave inside <graph>."""
+    NODE_KEYS = ("label", "type", "color")
+    EDGE_KEYS = ("type",)
+
+    def __init__(self, f: TextIO, name: str):
+        self.f = f
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for key in self.NODE_KEYS:
+            f.write(f'<key id="n_{key}" for="node" attr.name="{key}" attr.type="string"/>\n')
+        for key in self.EDGE_KEYS:
+            f.write(f'<key id="e_{key}" for="edge" attr.name="{key}" attr.type="string"/>\n')
+        f.write(f'<graph id={quoteattr(name)} edgedefault="directed">\n')
+
+    def _data(self, prefix: str, attrs: Dict[str, str]) -> str:
+        return "".join(f'<data key="{prefix}_{key}">{escape(value)}</data>' for key, value in attrs.items())
+
+    def node(self, node: str, **attrs):
+        self.f.write(f"<node id={quoteattr(node)}>{self._data('n', attrs)}</node>\n")
+
+    def edge(self, source: str, target: str, **attrs):
+        self.f.write(f"<edge source={quoteattr(source)} target={quoteattr(target)}>{self._data('e', attrs)}</edge>\n")
+
+    def close(self):
+        self.f.write("</graph>\n</graphml>\n")
+
+class JSONEdgeWriter:
+    """A JSON array of {"source", "target", "type"} edges; node attributes are not kept."""
+    def __init__(self, f: TextIO, name: str):
+        self.f = f
+        self.first = True
+        f.write("[")
+
+    def node(self, node: str, **attrs):
+        pass
+
+    def edge(self, source: str, target: str, **attrs):
+        entry = {"source": source, "target": target, "type": attrs.get("type", "")}
+        self.f.write(("\n" if self.first else ",\n") + json.dumps(entry))
+        self.first = False
+
+    def close(self):
+        self.f.write("\n]\n")
+
+WRITERS = {"dot": DotWriter, "graphml": GraphMLWriter, "json": JSONEdgeWriter}
+
+def network_of(address: str) -> Optional[str]:
+    """The /24 (IPv4) or /48 (IPv6) an address belongs to, or None for anything else."""
+    # inet_pton/ntop work in C; ipaddress objects cost several times more per record
+    try:
+        packed = socket.inet_pton(socket.AF_INET, address)
+        return socket.inet_ntop(socket.AF_INET, packed[:3] + bytes(1)) + "/24"
+    except OSError:
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, address)
+        return socket.inet_ntop(socket.AF_INET6, packed[:6] + bytes(10)) + "/48"
+    except (OSError, ValueError):
+        return None
+
+class TopologyVisualizer:
+    """
+    Writes the zone as a graph straight from the records: root -> subdomain edges, plus
+    CNAME/MX/NS edges to their targets. The names under the domain come from the name
+    index, so records outside the zone are never visited. Nothing else is held but the
+    set of nodes and edges already written, and the aggregation modes shrink that for
+    large zones:
+      parent   - hosts collapse into their parent name ("*.dev.example.com")
+      network  - addresses collapse into their /24 or /48 instead of one node per host
+      provider - CNAME targets collapse into their takeover-signature provider or
+                 registered domain
+    """
+    def __init__(self, records: Iterable[Record], domain: str, fmt: str = "dot",
+                 aggregate: Sequence[str] = (), signatures=None):
+        self.records = records
+        self.domain = domain
+        self.fmt = fmt
+        self.aggregate = set(aggregate)
+        self.signatures = signatures
+        self._nodes: Set[str] = set()
+        self._hosts: Set[str] = set()
+        self._edges: Set[Tuple[str, str]] = set()
+        self._extract: Optional[Callable] = None
+
+    def _host(self, owner: NameNode, zone: NameNode) -> str:
+        if owner is zone:
+            return self.domain
+        if "parent" in self.aggregate and owner.parent is not zone:
+            return f"*.{owner.parent.name}"
+        return owner.name
+
+    def _target(self, rtype: str, value: str) -> str:
+        target = value.split()[-1].rstrip(".").lower() if rtype == "MX" else value.rstrip(".").lower()
+        if "provider" in self.aggregate and rtype == "CNAME":
+            return self._provider(target)
+        return target
+
+    def _provider(self, target: str) -> str:
+        if self.signatures is not None:
+            found = self.signatures.match(target)
+            if found:
+                return found[0].provider
+        if self._extract is None:
+            import tldextract
+            # The bundled suffix list snapshot; graphing never goes to the network
+            self._extract = tldextract.TLDExtract(suffix_list_urls=())
+        return self._extract(target).registered_domain or target
+
+    def _node(self, writer, node: str, **attrs) -> bool:
+        if node in self._nodes:
+            return False
+        self._nodes.add(node)
+        writer.node(node, **attrs)
+        return True
+
+    def _edge(self, writer, source: str, target: str, rtype: str):
+        if (source, target) in self._edges:
+            return
+        self._edges.add((source, target))
+        writer.edge(source, target, type=rtype)
+
+    def _write(self, writer):
+        self._node(writer, self.domain, type="root", color="red")
+        tree = self.records.index() if isinstance(self.records, RecordSet) else NameTree(self.records)
+        zone = tree.find(self.domain)
+        if zone is None:
+            return
+        network_mode = "network" in self.aggregate
+
+        for owner in tree.subtree(self.domain):
+            host = self._host(owner, zone)
+            for rec in owner:
+                rtype, value = rec.type, rec.value
+                if network_mode and rtype in ("A", "AAAA"):
+                    network = network_of(value)
+                    if network:
+                        self._node(writer, network, type="network", color="blue")
+                        self._edge(writer, self.domain, network, rtype)
+                        continue
+
+                if host != self.domain and host not in self._hosts:
+                    # A host is new exactly once, so its root edge needs no dedup entry
+                    self._hosts.add(host)
+                    self._node(writer, host, type="subdomain", label=f"{host}\n({rtype})")
+                    writer.edge(self.domain, host)
+
+                if rtype in LINK_TYPES:
+                    target = self._target(rtype, value)
+                    self._node(writer, target, type="external", color="grey")
+                    self._edge(writer, host, target, rtype)
+
+    def generate(self, output_path: str):
+        log.info("[cyan]➜[/] Generating network topology graph...")
+        try:
+            with open(output_path, "w", encoding="utf-8") as f:
+                writer = WRITERS[self.fmt](f, self.domain)
+                self._write(writer)
+                writer.close()
+            log.info(f"[bold green]✓[/] Graph saved to {output_path} ({len(self._nodes)} nodes)")
+        except Exception as e:
+            log.error(f"[red]![/] Visualization failed: {e}")
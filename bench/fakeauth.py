@@ -0,0 +1,392 @@
+import argparse
+import asyncio
+import base64
+import bisect
+import random
+import struct
+import time
+import dns.flags
+import dns.message
+import dns.name
+import dns.opcode
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from output.logger import setup_logger, log
+from core.nsec3 import nsec3_digest
+
+# (owner relative to the origin, type, rdata), the unit zones and diffs are built from
+Entry = Tuple[str, str, str]
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+TTL = 300
+FIRST_SERIAL = 1000 # serial of the oldest version a zone keeps a diff for
+
+def cache_names(count: int, seed: int = 1) -> List[str]:
+    """Names outside the zone the fake server pretends to have cached; the first half are hits."""
+    rng = random.Random(seed)
+    return [f"{''.join(rng.choices(ALPHABET, k=8))}{i}.cached.example" for i in range(count)]
+
+class SyntheticZone:
+    """
+    A generated zone of size names, together with the diffs of its last history versions.
+    Names are spread over the label space like real hostnames, so NSEC walks and NSEC3
+    chains see realistic gaps. Each version deletes churn A records and adds churn names.
+    """
+    def __init__(self, origin: str = "bench.test", size: int = 1000, history: int = 5, churn: int = 10,
+                 nsec3: bool = False, salt: bytes = b"\xab\xcd", iterations: int = 5,
+                 ns_address: str = "127.0.0.2", seed: int = 1):
+        self.origin = dns.name.from_text(origin)
+        self.nsec3 = nsec3
+        self.salt = salt
+        self.iterations = iterations
+        self.churn = churn
+        self.first_serial = FIRST_SERIAL
+        self.serial = self.first_serial + history
+        # diffs[old serial] = (deleted entries, added entries) taking old serial to old serial + 1
+        self.diffs: Dict[int, Tuple[List[Entry], List[Entry]]] = {}
+
+        rng = random.Random(seed)
+        apex = [("@", "NS", "ns1"), ("@", "MX", "10 mail"), ("@", "TXT", '"v=spf1 -all"'),
+                ("ns1", "A", ns_address), ("mail", "A", "10.255.0.1"), ("_dmarc", "TXT", '"v=DMARC1; p=none"')]
+        hosts = [self._host(rng, i) for i in range(size)]
+
+        self._apex = apex
+        self._entries = dict.fromkeys(apex + hosts)
+        for version in range(history):
+            self._change(self.first_serial + version, self._deletable()[version * churn:(version + 1) * churn])
+        self._build()
+
+    def _deletable(self) -> List[Entry]:
+        return [e for e in self._entries if e[1] == "A" and e not in self._apex]
+
+    def _change(self, serial: int, deleted: List[Entry]):
+        """Applies the diff taking serial to serial + 1 to the entries and keeps it for IXFR."""
+        version = serial - self.first_serial
+        added = [(f"v{serial + 1}-{k}", "A", f"10.254.{version % 256}.{k % 256}")
+                 for k in range(self.churn)]
+        for entry in deleted:
+            del self._entries[entry]
+        self._entries.update(dict.fromkeys(added))
+        self.diffs[serial] = (deleted, added)
+
+    def _build(self):
+        self.nodes: Dict[dns.name.Name, Dict[int, dns.rrset.RRset]] = {}
+        self._add(self.soa_rrset(self.serial))
+        for entry in self._entries:
+            self._add(self.rrset(entry))
+        self.names = sorted(self.nodes)
+        self.hashes = sorted((self._hash(name), name) for name in self.names) if self.nsec3 else []
+
+    def advance(self):
+        """Publishes a new version, as a live zone changes between scans."""
+        self._change(self.serial, self._deletable()[:self.churn])
+        self.serial += 1
+        self._build()
+
+    @staticmethod
+    def _host(rng: random.Random, i: int) -> Entry:
+        label = "".join(rng.choices(ALPHABET, k=rng.randint(3, 10))) + str(i)
+        if i % 20 == 0:
+            return (label, "CNAME", f"{label}.cdn{i % 7}.example.net.")
+        return (label, "A", f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}")
+
+    def rrset(self, entry: Entry) -> dns.rrset.RRset:
+        owner, rtype, value = entry
+        return dns.rrset.from_text_list(dns.name.from_text(owner, self.origin), TTL, "IN", rtype, [value],
+                                        origin=self.origin, relativize=False)
+
+    def soa_rrset(self, serial: int) -> dns.rrset.RRset:
+        return self.rrset(("@", "SOA", f"ns1 hostmaster {serial} 3600 600 86400 {TTL}"))
+
+    def _add(self, rrset: dns.rrset.RRset):
+        node = self.nodes.setdefault(rrset.name, {})
+        if rrset.rdtype in node:
+            node[rrset.rdtype].union_update(rrset)
+        else:
+            node[rrset.rdtype] = rrset
+
+    def _hash(self, name: dns.name.Name) -> bytes:
+        return nsec3_digest(name.canonicalize().to_wire(), self.salt, self.iterations)
+
+    def _types(self, name: dns.name.Name, extra: str) -> str:
+        return " ".join(sorted(dns.rdatatype.to_text(t) for t in self.nodes[name]) + ["RRSIG", extra])
+
+    def nsec(self, name: dns.name.Name) -> dns.rrset.RRset:
+        """The NSEC record owned by name, which must exist."""
+        i = bisect.bisect_left(self.names, name)
+        next_name = self.names[(i + 1) % len(self.names)]
+        return dns.rrset.from_text(name, TTL, "IN", "NSEC", f"{next_name} {self._types(name, 'NSEC')}")
+
+    def covering_nsec(self, name: dns.name.Name) -> dns.rrset.RRset:
+        """The NSEC record proving that name does not exist."""
+        # bisect - 1 wraps to the last owner for names before the first one
+        return self.nsec(self.names[bisect.bisect_left(self.names, name) - 1])
+
+    def covering_nsec3(self, name: dns.name.Name) -> dns.rrset.RRset:
+        """The NSEC3 record whose hash interval covers the hash of name."""
+        i = bisect.bisect_left(self.hashes, (self._hash(name),)) - 1
+        owner_hash, owner = self.hashes[i]
+        next_hash = self.hashes[(i + 1) % len(self.hashes)][0]
+        salt = self.salt.hex() or "-"
+        return dns.rrset.from_text(
+            dns.name.from_text(base64.b32hexencode(owner_hash).decode().lower(), self.origin), TTL, "IN", "NSEC3",
+            f"1 0 {self.iterations} {salt} {base64.b32hexencode(next_hash).decode().lower()} {self._types(owner, 'NSEC3PARAM')}"
+        )
+
+    def axfr(self) -> List[dns.rrset.RRset]:
+        soa = self.nodes[self.origin][dns.rdatatype.SOA]
+        rrsets = [soa]
+        for name in self.names:
+            rrsets.extend(rrset for rdtype, rrset in self.nodes[name].items() if rdtype != dns.rdatatype.SOA)
+        rrsets.append(soa)
+        return rrsets
+
+    def ixfr(self, serial: int) -> Optional[List[dns.rrset.RRset]]:
+        """The RFC 1995 diff sequence from serial to the current version, or None if serial is unknown."""
+        current = self.nodes[self.origin][dns.rdatatype.SOA]
+        if serial == self.serial:
+            return [current]
+        if serial not in self.diffs:
+            return None
+        rrsets = [current]
+        for old in range(serial, self.serial):
+            deleted, added = self.diffs[old]
+            rrsets.append(self.soa_rrset(old))
+            rrsets.extend(self.rrset(entry) for entry in deleted)
+            rrsets.append(self.soa_rrset(old + 1))
+            rrsets.extend(self.rrset(entry) for entry in added)
+        rrsets.append(current)
+        return rrsets
+
+@dataclass
+class ServerStats:
+    queries: int = 0
+    dropped: int = 0
+    transfers: int = 0
+
+class FakeAuthServer(asyncio.DatagramProtocol):
+    """
+    Authoritative server for a SyntheticZone over UDP and TCP: plain answers, NSEC or
+    NSEC3 denial proofs for DNSSEC queries, AXFR and IXFR, and RD=0 answers from a
+    pretend cache for snooping. Every response is delayed by latency (plus up to
+    jitter) and a loss share of UDP queries is dropped.
+    """
+    def __init__(self, zone: SyntheticZone, host: str = "127.0.0.2", port: int = 53,
+                 latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0,
+                 cache: Optional[Dict[str, int]] = None, refuse_xfr: bool = False, seed: int = 1,
+                 bump: float = 0.0, notify: Optional[Tuple[str, int]] = None):
+        self.zone = zone
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.refuse_xfr = refuse_xfr
+        self.bump = bump
+        self.notify = notify
+        self.stats = ServerStats()
+        self.transport = None
+        self._rng = random.Random(seed)
+        self._started = time.monotonic()
+        # name -> (TTL, seconds into the TTL at start), so cached TTLs decay like a real cache
+        self.cache = {dns.name.from_text(name): (ttl, self._rng.uniform(0, ttl))
+                      for name, ttl in (cache or {}).items()}
+        self._server = None
+        self._bumper = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+        self._server = await asyncio.start_server(self._tcp, self.host, self.port)
+        if self.bump:
+            self._bumper = asyncio.create_task(self._publish())
+
+    def close(self):
+        if self._bumper:
+            self._bumper.cancel()
+        if self.transport:
+            self.transport.close()
+        if self._server:
+            self._server.close()
+
+    async def _publish(self):
+        """Advances the zone every bump seconds and NOTIFYs (RFC 1996) the notify address of it."""
+        while True:
+            await asyncio.sleep(self.bump)
+            self.zone.advance()
+            log.info(f"[blue]*[/] {self.zone.origin} is now at serial {self.zone.serial}")
+            if self.notify and self.transport:
+                message = dns.message.make_query(self.zone.origin, dns.rdatatype.SOA)
+                message.flags = dns.flags.AA # set_opcode() keeps its bits in flags too
+                message.set_opcode(dns.opcode.NOTIFY)
+                self.transport.sendto(message.to_wire(), self.notify)
+
+    def _delay(self) -> float:
+        return self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.stats.queries += 1
+        if self.loss and self._rng.random() < self.loss:
+            self.stats.dropped += 1
+            return
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        if query.flags & dns.flags.QR:
+            return # The answer to one of our NOTIFYs
+        wire = self.respond(query).to_wire(max_size=65535)
+        delay = self._delay()
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, wire, addr)
+        else:
+            self.transport.sendto(wire, addr)
+
+    async def _tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                (length,) = struct.unpack("!H", await reader.readexactly(2))
+                query = dns.message.from_wire(await reader.readexactly(length))
+                self.stats.queries += 1
+                delay = self._delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                for response in self._tcp_responses(query):
+                    wire = response.to_wire(max_size=65535)
+                    writer.write(struct.pack("!H", len(wire)) + wire)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            log.debug(f"TCP client failed: {e}")
+        finally:
+            writer.close()
+
+    def _tcp_responses(self, query: dns.message.Message):
+        rdtype = query.question[0].rdtype
+        if rdtype not in (dns.rdatatype.AXFR, dns.rdatatype.IXFR):
+            yield self.respond(query)
+            return
+        if self.refuse_xfr or query.question[0].name != self.zone.origin:
+            response = dns.message.make_response(query)
+            response.set_rcode(dns.rcode.REFUSED)
+            yield response
+            return
+
+        self.stats.transfers += 1
+        rrsets = None
+        if rdtype == dns.rdatatype.IXFR and query.authority:
+            rrsets = self.zone.ixfr(query.authority[0][0].serial)
+        if rrsets is None:
+            rrsets = self.zone.axfr() # Unknown serial: AXFR-style answer, as RFC 1995 allows
+        for i in range(0, len(rrsets), 200):
+            response = dns.message.make_response(query)
+            response.flags |= dns.flags.AA
+            response.answer = rrsets[i:i + 200]
+            yield response
+
+    def respond(self, query: dns.message.Message) -> dns.message.Message:
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name, rdtype = question.name, question.rdtype
+        zone = self.zone
+        if not name.is_subdomain(zone.origin):
+            return self._from_cache(query, response)
+
+        response.flags |= dns.flags.AA
+        dnssec = bool(query.ednsflags & dns.flags.DO)
+        node = zone.nodes.get(name)
+        soa = zone.nodes[zone.origin][dns.rdatatype.SOA]
+        if node is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+            response.authority.append(soa)
+            if dnssec:
+                response.authority.append(zone.covering_nsec3(name) if zone.nsec3 else zone.covering_nsec(name))
+        elif rdtype == dns.rdatatype.NSEC and dnssec and not zone.nsec3:
+            response.answer.append(zone.nsec(name))
+        elif rdtype in node:
+            response.answer.append(node[rdtype])
+        elif dns.rdatatype.CNAME in node:
+            response.answer.append(node[dns.rdatatype.CNAME])
+        else:
+            response.authority.append(soa) # NODATA
+        return response
+
+    def _from_cache(self, query: dns.message.Message, response: dns.message.Message) -> dns.message.Message:
+        if query.flags & dns.flags.RD:
+            response.set_rcode(dns.rcode.REFUSED) # Not an open resolver
+            return response
+        entry = self.cache.get(query.question[0].name)
+        if entry and query.question[0].rdtype == dns.rdatatype.A:
+            ttl, offset = entry
+            remaining = ttl - int((time.monotonic() - self._started + offset) % ttl)
+            response.answer.append(dns.rrset.from_text(query.question[0].name, remaining, "IN", "A", "192.0.2.1"))
+        return response
+
+async def serve(server: FakeAuthServer, ready=None, counter=None):
+    """Runs server until cancelled; ready is set once it listens, counter mirrors stats.queries."""
+    await server.start()
+    if ready is not None:
+        ready.set()
+    try:
+        while True:
+            await asyncio.sleep(0.05)
+            if counter is not None:
+                counter.value = server.stats.queries
+    finally:
+        server.close()
+
+def run_server(options: dict, ready=None, counter=None):
+    """Process entry point: builds the zone and server from plain options and serves forever."""
+    zone = SyntheticZone(origin=options["origin"], size=options["size"], history=options["history"],
+                         churn=options["churn"], nsec3=options["nsec3"], ns_address=options["address"])
+    cache = {name: 300 + 60 * (i % 50) for i, name in enumerate(cache_names(options["cache"]))
+             if i < options["cache"] // 2}
+    server = FakeAuthServer(zone, host=options["address"], port=options["port"], latency=options["latency"],
+                            jitter=options["jitter"], loss=options["loss"], cache=cache,
+                            refuse_xfr=options["refuse_xfr"], bump=options.get("bump", 0.0),
+                            notify=options.get("notify"))
+    asyncio.run(serve(server, ready, counter))
+
+def notify_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"invalid address {text!r}, expected HOST:PORT")
+    return host, int(port)
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--origin", default="bench.test", help="Zone served")
+    parser.add_argument("--size", type=int, default=1000, help="Names in the zone")
+    parser.add_argument("--history", type=int, default=5, help="Earlier versions kept for IXFR")
+    parser.add_argument("--churn", type=int, default=10, help="Names deleted and added per version")
+    parser.add_argument("--nsec3", action="store_true", help="Deny with NSEC3 instead of NSEC")
+    parser.add_argument("--address", default="127.0.0.2", help="Loopback address to listen on")
+    parser.add_argument("--port", type=int, default=53, help="Port (the scanner always queries 53)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds per response")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of UDP queries dropped (0-1)")
+    parser.add_argument("--cache", type=int, default=1000, help="Snoopable names; half of them are cached")
+    parser.add_argument("--refuse-xfr", action="store_true", help="Refuse AXFR/IXFR")
+    parser.add_argument("--bump", type=float, default=0.0, help="Publish a new zone version every this many seconds")
+    parser.add_argument("--notify", type=notify_address, help="HOST:PORT to send a NOTIFY to after every new version")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake authoritative server for offline benchmarks")
+    add_arguments(parser)
+    args = parser.parse_args()
+    setup_logger("INFO")
+    log.info(f"[blue]*[/] Serving {args.origin} ({args.size} names, serial {FIRST_SERIAL + args.history}) "
+             f"on {args.address}:{args.port}")
+    try:
+        run_server(vars(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+from rich.console import Console
+from rich.table import Table
+from bench.fakeauth import FIRST_SERIAL, add_arguments, cache_names, run_server
+
+console = Console()
+
+async def bench_axfr(options: dict) -> int:
+    from core.strategies import AXFRStrategy
+    total = 0
+    async for batch in AXFRStrategy().stream(options["origin"], options["address"]):
+        total += len(batch)
+    return total
+
+async def bench_ixfr(options: dict) -> int:
+    from core.strategies import IXFRStrategy
+    # From the oldest serial the server still has a diff for
+    strategy = IXFRStrategy(FIRST_SERIAL)
+    total = 0
+    async for changes in strategy.changes(options["origin"], options["address"]):
+        total += len(changes)
+    return total
+
+async def bench_nsec(options: dict) -> int:
+    from core.strategies import NSECWalkStrategy
+    return len(await NSECWalkStrategy().execute_async(options["origin"], options["address"]))
+
+async def bench_nsec3(options: dict) -> int:
+    from core.nsec3 import NSEC3Collector
+    chain = await NSEC3Collector(options["origin"], options["address"]).run()
+    return len(chain.links) if chain else 0
+
+async def bench_snoop(options: dict) -> int:
+    from core.snooper import CacheSnooper
+    snooper = CacheSnooper(options["address"], cache_names(options["cache"]))
+    return len(await snooper.run_async())
+
+async def bench_scan(options: dict) -> int:
+    import main
+    with tempfile.TemporaryDirectory() as output:
+        args = main.build_parser().parse_args([
+            "-d", options["origin"], "--headless", "--walk", "--snoop", "--resolver", options["address"],
+            "-o", output
+        ])
+        ctx = await main.run_scan(args)
+    return len(ctx.found_records)
+
+@dataclass
+class Benchmark:
+    run: Callable
+    unit: str
+    server: Dict[str, object] # overrides of the fake server options
+
+BENCHMARKS = {
+    "axfr": Benchmark(bench_axfr, "records", {}),
+    "ixfr": Benchmark(bench_ixfr, "changes", {}),
+    "nsec": Benchmark(bench_nsec, "names", {}),
+    "nsec3": Benchmark(bench_nsec3, "hashes", {"nsec3": True}),
+    "snoop": Benchmark(bench_snoop, "hits", {}),
+    "scan": Benchmark(bench_scan, "records", {}),
+}
+
+@dataclass
+class Result:
+    name: str
+    unit: str
+    items: int # per run
+    seconds: List[float]
+    queries: int # seen by the server, all runs
+    rss_mb: float # peak RSS of the benchmark process
+    base_rss_mb: float # RSS after imports, before the first run
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.seconds)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    @property
+    def throughput(self) -> float:
+        return self.items * len(self.seconds) / sum(self.seconds)
+
+    @property
+    def qps(self) -> float:
+        return self.queries / sum(self.seconds)
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KiB on Linux
+
+def _child(name: str, options: dict, repeat: int, verbose: bool, results):
+    """Runs one benchmark in a fresh process, so its peak RSS is its own."""
+    if not verbose:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    benchmark = BENCHMARKS[name]
+    base = _rss_mb()
+    seconds, items = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = asyncio.run(benchmark.run(options))
+        seconds.append(time.perf_counter() - started)
+    results.put((items, seconds, _rss_mb(), base))
+
+class Harness:
+    """
+    Starts the fake server in its own process (restarting it when a benchmark needs a
+    different zone) and runs every benchmark in a fresh process against it.
+    """
+    def __init__(self, options: dict, repeat: int, verbose: bool = False):
+        self.options = options
+        self.repeat = repeat
+        self.verbose = verbose
+        self.mp = multiprocessing.get_context("spawn")
+        self._server = None
+        self._server_options = None
+        self._counter = None
+
+    def _ensure_server(self, options: dict):
+        if options == self._server_options:
+            return
+        self.stop()
+        ready = self.mp.Event()
+        self._counter = self.mp.RawValue("Q", 0)
+        self._server = self.mp.Process(target=run_server, args=(options, ready, self._counter), daemon=True)
+        self._server.start()
+        while not ready.wait(0.2):
+            if not self._server.is_alive():
+                raise SystemExit(f"Fake server failed to start on {options['address']}:{options['port']} "
+                                 "(binding port 53 needs root or CAP_NET_BIND_SERVICE)")
+        self._server_options = options
+
+    def stop(self):
+        if self._server:
+            self._server.terminate()
+            self._server.join()
+            self._server = None
+            self._server_options = None
+
+    def run(self, name: str) -> Result:
+        benchmark = BENCHMARKS[name]
+        options = {**self.options, **benchmark.server}
+        self._ensure_server(options)
+        time.sleep(0.1)
+        before = self._counter.value
+        results = self.mp.Queue()
+        child = self.mp.Process(target=_child, args=(name, options, self.repeat, self.verbose, results))
+        child.start()
+        items, seconds, rss, base = results.get()
+        child.join()
+        time.sleep(0.1) # The server publishes its query count every 50 ms
+        return Result(name, benchmark.unit, items, seconds, self._counter.value - before, rss, base)
+
+def report(results: List[Result], baseline: Optional[Dict[str, dict]] = None):
+    table = Table(title="[bold green]BENCHMARKS[/]")
+    for column in ("Benchmark", "Items/run", "p50", "p95", "p99", "Items/s", "Queries/s", "Peak RSS (MB)"):
+        table.add_column(column, style="white" if column == "Benchmark" else "green", justify="right")
+    if baseline:
+        table.add_column("p50 vs baseline", justify="right")
+    for r in results:
+        row = [f"{r.name} ({r.unit})", f"{r.items:,}", f"{r.percentile(50) * 1000:.0f} ms", f"{r.percentile(95) * 1000:.0f} ms",
+               f"{r.percentile(99) * 1000:.0f} ms", f"{r.throughput:,.0f}", f"{r.qps:,.0f}",
+               f"{r.rss_mb:.0f} (+{r.rss_mb - r.base_rss_mb:.0f})"]
+        if baseline:
+            old = baseline.get(r.name)
+            if old:
+                old_p50 = Result(**old).percentile(50)
+                change = (r.percentile(50) - old_p50) / old_p50 * 100
+                row.append(f"[{'red' if change > 5 else 'green'}]{change:+.1f}%[/]")
+            else:
+                row.append("-")
+        table.add_row(*row)
+    console.print(table)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local fake authoritative server")
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS), help=f"Any of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--json", help="Write the raw results here")
+    parser.add_argument("--baseline", help="Earlier --json results to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the benchmarks' own output")
+    add_arguments(parser)
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)}")
+
+    options = {key: value for key, value in vars(args).items()
+               if key not in ("benchmarks", "repeat", "json", "baseline", "verbose")}
+    harness = Harness(options, args.repeat, args.verbose)
+    results = []
+    try:
+        for name in args.benchmarks:
+            console.print(f"[cyan]➜[/] {name} ({args.repeat} runs, {args.size} names)...")
+            results.append(harness.run(name))
+    finally:
+        harness.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {entry["name"]: entry for entry in json.load(f)["results"]}
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"options": options, "python": sys.version.split()[0],
+                       "results": [asdict(r) for r in results]}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import struct
+import time
+import dns.message
+import dns.rcode
+import dns.rdatatype
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Callable, Iterator, Optional, Set
+from output.logger import log
+from core.transport import HedgedPool
+from core.records import Record
+
+QTYPE_A = struct.pack("!HH", dns.rdatatype.A, 1) # A / IN
+RECENT_LABELS = 4096 # wordlist labels remembered to skip repeats; merged lists repeat names close together
+
+@dataclass
+class BruteForceStats:
+    sent: int = 0
+    answered: int = 0
+    found: int = 0
+    wildcards: int = 0
+    lost: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def qps(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.answered / elapsed if elapsed > 0 else 0.0
+
+class BruteForcer:
+    """
+    Wordlist brute force straight against the zone's authoritative servers. The wordlist
+    is streamed from disk, queries are spread over one shared UDP socket per NS, and
+    negative answers are recognised from the header alone without parsing the message.
+    Timeouts follow each server's measured RTT, and a query one server is slow to answer
+    is hedged to the fastest other one. Memory stays flat however long the wordlist is:
+    only the last RECENT_LABELS labels are remembered for skipping repeats, and found
+    records are kept for run() to return only when there is no on_records sink.
+    """
+    def __init__(self, domain: str, nameservers: List[str], wordlist: str, concurrency: int = 1000,
+                 timeout: float = 2.0, retries: int = 2,
+                 on_records: Optional[Callable[[List[Record]], None]] = None):
+        self.domain = domain.rstrip(".").lower()
+        self.nameservers = nameservers
+        self.wordlist = wordlist
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.on_records = on_records
+        self.stats = BruteForceStats()
+        self.records = [] # only filled without on_records
+        self._wildcard: Set[tuple] = set()
+        self._wildcard_nodata = False
+
+    async def run(self) -> List[Record]:
+        """Returns the names found, or [] when they were handed to on_records instead."""
+        log.info(f"[cyan]➜[/] Brute forcing {self.domain} with {self.wordlist} "
+                 f"({self.concurrency} in flight over {len(self.nameservers)} NS)...")
+        async with HedgedPool(self.nameservers) as pool:
+            await self._detect_wildcard(pool)
+
+            labels = self._labels()
+            # Workers share the streamed wordlist and take turns across the nameservers
+            await asyncio.gather(*(self._worker(labels, pool, i) for i in range(self.concurrency)))
+
+        log.info(f"[bold green]✓[/] Brute force found {self.stats.found} names "
+                 f"({self.stats.answered} answers, {self.stats.qps:.0f} q/s, {self.stats.lost} lost)")
+        return self.records
+
+    async def _worker(self, labels: Iterator[str], pool: HedgedPool, primary: int):
+        for label in labels:
+            fqdn = f"{label}.{self.domain}"
+            question = self._question(fqdn)
+            if question is None:
+                continue
+            data = None
+            # A name lost on every attempt gets one slower try right away, so nothing piles up
+            for timeout in (self.timeout, self.timeout * 2):
+                self.stats.sent += 1
+                try:
+                    data = await pool.query_raw(question, timeout=timeout, retries=self.retries, primary=primary)
+                    break
+                except Exception:
+                    continue
+            if data is None:
+                self.stats.lost += 1
+                continue
+            self.stats.answered += 1
+            records = self._parse(fqdn, data)
+            if records:
+                self.stats.found += 1
+                if self.on_records:
+                    self.on_records(records)
+                else:
+                    self.records.extend(records)
+
+    def _parse(self, fqdn: str, data: bytes) -> List[Record]:
+        # RCODE sits in the low 4 bits of byte 3; NXDOMAIN and errors need no parsing
+        if data[3] & 0x0F != dns.rcode.NOERROR:
+            return []
+        response = dns.message.from_wire(data)
+        records = []
+        for rrset in response.answer:
+            for rdata in rrset:
+                records.append(Record(rrset.name.to_text(omit_final_dot=True),
+                                      dns.rdatatype.to_text(rrset.rdtype), str(rdata)))
+        if not records:
+            # Delegated child zones answer with a referral
+            for rrset in response.authority:
+                if rrset.rdtype == dns.rdatatype.NS:
+                    records.extend(Record(fqdn, "NS", str(rdata)) for rdata in rrset)
+        if self._is_wildcard(records):
+            self.stats.wildcards += 1
+            return []
+        # NOERROR without data still proves the name exists
+        return records or [Record(fqdn, "BRUTE_FORCED", "N/A")]
+
+    def _is_wildcard(self, records: List[Record]) -> bool:
+        if not records:
+            return self._wildcard_nodata
+        answers = {(r.type, r.value) for r in records if r.type in ("A", "AAAA", "CNAME")}
+        return bool(self._wildcard) and bool(answers) and answers <= self._wildcard
+
+    async def _detect_wildcard(self, pool: HedgedPool, probes: int = 3):
+        """Resolves random labels; whatever they return is wildcard noise to filter out."""
+        for _ in range(probes):
+            fqdn = f"{os.urandom(6).hex()}.{self.domain}"
+            try:
+                data = await pool.query_raw(self._question(fqdn), timeout=self.timeout, retries=self.retries)
+            except Exception:
+                continue
+            if data[3] & 0x0F != dns.rcode.NOERROR:
+                continue
+            response = dns.message.from_wire(data)
+            if not response.answer:
+                self._wildcard_nodata = True
+            for rrset in response.answer:
+                if rrset.rdtype in (dns.rdatatype.A, dns.rdatatype.AAAA, dns.rdatatype.CNAME):
+                    self._wildcard.update((dns.rdatatype.to_text(rrset.rdtype), str(rdata)) for rdata in rrset)
+        if self._wildcard or self._wildcard_nodata:
+            log.warning(f"[yellow]![/] Wildcard DNS detected on {self.domain}; matching answers will be filtered")
+
+    def _labels(self) -> Iterator[str]:
+        # A set of every label would grow with the wordlist; repeats that slip past the
+        # window cost a query, and the RecordSet downstream drops the duplicate records
+        recent: Set[str] = set()
+        order = deque()
+        with open(self.wordlist, errors="ignore") as f:
+            for line in f:
+                label = line.strip().strip(".").lower()
+                if not label or label in recent:
+                    continue
+                if len(order) >= RECENT_LABELS:
+                    recent.discard(order.popleft())
+                recent.add(label)
+                order.append(label)
+                yield label
+
+    def _question(self, fqdn: str) -> Optional[bytes]:
+        wire = b""
+        for label in fqdn.split("."):
+            raw = label.encode("ascii", "ignore")
+            if not raw or len(raw) > 63:
+                return None
+            wire += bytes([len(raw)]) + raw
+        return wire + b"\x00" + QTYPE_A
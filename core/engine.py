@@ -0,0 +1,233 @@
+import asyncio
+import time
+from contextlib import aclosing, nullcontext
+from typing import List, Dict, Optional, Callable, Awaitable, AsyncIterator, Tuple
+from output.logger import log
+from core.strategies import AXFRStrategy, IXFRStrategy, NSECWalkStrategy
+from output.store import ScanStore
+from core.records import Record
+
+RecordSink = Callable[[List[Record]], None]
+
+class NameServerSlots:
+    """
+    Caps how many scans may work against the same NS address at once.
+    One instance is shared by every domain of a batch, since many domains share NS.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores = {}
+
+    def __call__(self, ns: str) -> asyncio.Semaphore:
+        if ns not in self._semaphores:
+            self._semaphores[ns] = asyncio.Semaphore(self.limit)
+        return self._semaphores[ns]
+
+class StrategyEngine:
+    """
+    Races the active strategies against every Name Server at the same time. Only a transfer
+    ending in the closing SOA wins; a loser's records and stored copy are rolled back.
+    """
+    def __init__(self, domain: str, nameservers: List[str], serials: Optional[Dict[str, int]] = None,
+                 walk: bool = False, deadline: float = 60.0, on_records: Optional[RecordSink] = None,
+                 ns_slots: Optional[NameServerSlots] = None, walk_concurrency: int = 32,
+                 store: Optional[ScanStore] = None):
+        self.domain = domain
+        self.nameservers = nameservers
+        self.serials = serials or {}
+        self.walk = walk
+        self.deadline = deadline
+        self.on_records = on_records
+        self.ns_slots = ns_slots
+        self.walk_concurrency = walk_concurrency
+        self.store = store
+        self._owner = None
+        self._mark = 0 # len(self._records) when the current owner claimed the output
+        self._pending = {}
+        self._preempted = set() # NS whose attempts were cancelled by the current owner
+        self._records = []
+
+    async def run(self) -> Tuple[Optional[str], List[Record]]:
+        """
+        Returns (winning nameserver, records), or (None, []) if every NS failed.
+        Records are only returned when no on_records sink was given.
+        """
+        expiration = time.monotonic() + self.deadline
+
+        unchanged = self._unchanged()
+        if unchanged:
+            return unchanged, self._records
+
+        winner = await self._race(self._transfer, expiration)
+        if not winner and self.walk:
+            winner = await self._race(self._walk, expiration)
+        return winner, self._records
+
+    def _slot(self, ns: str):
+        return self.ns_slots(ns) if self.ns_slots else nullcontext()
+
+    def _unchanged(self) -> Optional[str]:
+        """An NS whose stored copy is at the live serial; it is served without a transfer."""
+        if not self.store:
+            return None
+        for ns in self.nameservers:
+            serial = self.serials.get(ns)
+            if serial is not None and self.store.serial(self.domain, ns) == serial:
+                log.info(f"[bold green]✓[/] {self.domain} unchanged on {ns} (Serial: {serial}), using stored copy")
+                self.store.touch(self.domain, ns)
+                self._owner = (None, ns)
+                for batch in self.store.records(self.domain, ns):
+                    self._deliver(batch)
+                return ns
+        return None
+
+    async def _transfer(self, ns: str) -> int:
+        async with self._slot(ns):
+            if self.store:
+                stored = self.store.serial(self.domain, ns)
+                if stored is not None:
+                    delivered = await self._update(ns, stored)
+                    if delivered:
+                        return delivered
+                return await self._full_transfer(ns)
+
+            axfr = AXFRStrategy()
+            delivered = await self._consume(ns, axfr, axfr.stream(self.domain, ns))
+            if not delivered:
+                serial = self.serials.get(ns)
+                if serial:
+                    ixfr = IXFRStrategy(serial)
+                    delivered = await self._consume(ns, ixfr, ixfr.stream(self.domain, ns))
+        return delivered
+
+    async def _update(self, ns: str, stored: int) -> int:
+        """IXFR from the stored serial, applied to the stored copy, which is then delivered."""
+        strategy = IXFRStrategy(stored)
+        changes = []
+        stream = strategy.changes(self.domain, ns)
+        async with aclosing(stream):
+            async for batch in stream:
+                changes.extend(batch)
+        if not strategy.complete or not self._claim(ns):
+            return 0
+
+        if strategy.incremental:
+            self.store.apply(self.domain, ns, strategy.end_serial, changes)
+        elif changes:
+            # Servers without the history answer an IXFR with the whole zone
+            writer = self.store.writer(self.domain, ns)
+            writer.add([record for op, record in changes if op == "add"])
+            writer.commit(strategy.end_serial)
+
+        delivered = 0
+        for batch in self.store.records(self.domain, ns):
+            self._deliver(batch)
+            delivered += len(batch)
+        return delivered
+
+    async def _full_transfer(self, ns: str) -> int:
+        """AXFR streamed to the sink and into a fresh stored copy at the same time."""
+        strategy = AXFRStrategy()
+        writer = None
+        delivered = 0
+        stream = strategy.stream(self.domain, ns)
+        try:
+            async with aclosing(stream):
+                async for batch in stream:
+                    if not self._claim(ns):
+                        break
+                    writer = writer or self.store.writer(self.domain, ns)
+                    writer.add(batch)
+                    self._deliver(batch)
+                    delivered += len(batch)
+        finally:
+            if writer:
+                if strategy.complete:
+                    writer.commit(strategy.serial)
+                else:
+                    writer.abort()
+        if delivered and not strategy.complete:
+            self._release(ns, delivered)
+            return 0
+        return delivered
+
+    async def _walk(self, ns: str) -> int:
+        async with self._slot(ns):
+            walker = NSECWalkStrategy(self.walk_concurrency, alternates=self.nameservers)
+            records = await walker.execute_async(self.domain, ns)
+        if records and self._claim(ns):
+            self._deliver(records)
+        return len(records)
+
+    async def _consume(self, ns: str, strategy, stream: AsyncIterator[List[Record]]) -> int:
+        """Delivers a transfer as it streams in; 0 unless it reached the closing SOA."""
+        delivered = 0
+        async with aclosing(stream):
+            async for batch in stream:
+                if not self._claim(ns):
+                    break # Another NS is already streaming this zone
+                self._deliver(batch)
+                delivered += len(batch)
+        if delivered and not strategy.complete:
+            self._release(ns, delivered)
+            return 0
+        return delivered
+
+    def _claim(self, ns: str) -> bool:
+        """The first attempt to produce records owns the output; everyone else is cancelled."""
+        current = asyncio.current_task()
+        if self._owner is None:
+            self._owner = (current, ns)
+            self._mark = len(self._records)
+            for task, other in self._pending.items():
+                if task is not current and not task.done():
+                    task.cancel()
+                    self._preempted.add(other)
+        return self._owner[0] is current
+
+    def _release(self, ns: str, delivered: int):
+        """Gives up the output after a broken transfer, so the cancelled NS get another go."""
+        if not self._owner or self._owner[0] is not asyncio.current_task():
+            return
+        log.warning(f"[yellow]![/] Transfer from {ns} broke off after {delivered} records, trying the other Name Servers")
+        del self._records[self._mark:]
+        self._owner = None
+
+    def _deliver(self, batch: List[Record]):
+        if self.on_records:
+            self.on_records(batch)
+        else:
+            self._records.extend(batch)
+
+    async def _race(self, attempt: Callable[[str], Awaitable[int]], expiration: float) -> Optional[str]:
+        """The NS whose attempt completed, or None; a transfer still streaming at the deadline does not count."""
+        self._pending = {asyncio.create_task(attempt(ns)): ns for ns in self.nameservers}
+        self._preempted = set()
+        try:
+            while self._pending:
+                remaining = expiration - time.monotonic()
+                if remaining <= 0:
+                    log.warning(f"[yellow]![/] Scan deadline of {self.deadline}s reached for {self.domain}")
+                    break
+                done, _ = await asyncio.wait(self._pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    ns = self._pending.pop(task)
+                    if not task.cancelled() and not task.exception() and task.result():
+                        return ns
+                    if self._owner and self._owner[0] is task:
+                        # The owner failed without releasing (an exception): drop what it returned
+                        del self._records[self._mark:]
+                        self._owner = None
+                if self._owner is None and self._preempted:
+                    # The NS that took the output failed; retry the ones it cancelled
+                    retry, self._preempted = self._preempted, set()
+                    for ns in retry:
+                        self._pending[asyncio.create_task(attempt(ns))] = ns
+        finally:
+            for task in self._pending:
+                task.cancel()
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+            self._pending = {}
+            self._owner = None
+        return None
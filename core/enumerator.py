@@ -1,38 +1,130 @@
-import dns.resolver
-from typing import List, Tuple, Optional
-from output.logger import log
-
-class NSEnumerator:
-    def __init__(self, domain: str, resolver: dns.resolver.Resolver):
-        self.domain = domain
-        self.resolver = resolver
-
-    def get_nameservers(self) -> List[str]:
-        """Returns a list of Name Server IPs for the domain."""
-        ns_ips = []
-        try:
-            answers = self.resolver.resolve(self.domain, 'NS')
-            for rdata in answers:
-                ns_target = rdata.target.to_text()
-                # Resolve NS hostname to IP
-                try:
-                    ip_answers = self.resolver.resolve(ns_target, 'A')
-                    for ip in ip_answers:
-                        ns_ips.append(ip.to_text())
-                except Exception:
-                    continue
-            log.info(f"[blue]*[/] Found {len(ns_ips)} Name Servers for {self.domain}")
-        except Exception as e:
-            log.warning(f"[yellow]![/] Could not enumerate NS: {e}")
-        return list(set(ns_ips))
-
-    def get_soa_serial(self, nameserver: str) -> Optional[int]:
-        """Fetches current SOA Serial for IXFR."""
-        try:
-            request = dns.message.make_query(self.domain, dns.rdatatype.SOA)
-            response = dns.query.udp(request, nameserver, timeout=5.0)
-            if response.answer:
-                return response.answer[0][0].serial
-        except Exception:
-            return None
-        return None
\ No newline at end of file
+import asyncio
+import time
+import dns.resolver
+import dns.asyncresolver
+from dns.rdtypes.ANY.SOA import SOA
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Optional
+from output.logger import log
+from utils.ratelimit import RateLimiter
+from utils.metrics import Metrics
+from core.transport import open_channel
+
+@dataclass
+class NameServerInfo:
+    """Everything later stages need to know about one NS host."""
+    hostname: str
+    ips: List[str] = field(default_factory=list)
+    serials: Dict[str, int] = field(default_factory=dict)
+    rtts: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def serial(self) -> Optional[int]:
+        return max(self.serials.values()) if self.serials else None
+
+    @property
+    def rtt(self) -> Optional[float]:
+        return min(self.rtts.values()) if self.rtts else None
+
+class NSEnumerator:
+    def __init__(self, domain: str, resolver: dns.resolver.Resolver):
+        self.domain = domain
+        self.resolver = resolver
+
+    def get_nameservers(self) -> List[str]:
+        """Returns a list of Name Server IPs for the domain."""
+        ns_ips = []
+        try:
+            answers = self.resolver.resolve(self.domain, 'NS')
+            for rdata in answers:
+                ns_target = rdata.target.to_text()
+                # Resolve NS hostname to IP
+                try:
+                    ip_answers = self.resolver.resolve(ns_target, 'A')
+                    for ip in ip_answers:
+                        ns_ips.append(ip.to_text())
+                except Exception:
+                    continue
+            log.info(f"[blue]*[/] Found {len(ns_ips)} Name Servers for {self.domain}")
+        except Exception as e:
+            log.warning(f"[yellow]![/] Could not enumerate NS: {e}")
+        return list(set(ns_ips))
+
+    def get_soa_serial(self, nameserver: str) -> Optional[int]:
+        """Fetches current SOA Serial for IXFR."""
+        try:
+            RateLimiter.acquire_sync(nameserver)
+            request = dns.message.make_query(self.domain, dns.rdatatype.SOA)
+            response = dns.query.udp(request, nameserver, timeout=5.0)
+            if response.answer:
+                return response.answer[0][0].serial
+        except Exception:
+            return None
+        return None
+
+    async def discover(self) -> List[NameServerInfo]:
+        """
+        Async counterpart of get_nameservers(): resolves A and AAAA for every NS
+        host and fetches the SOA serial from every address in one concurrent batch.
+        """
+        resolver = self._async_resolver()
+        try:
+            answers = await resolver.resolve(self.domain, 'NS')
+        except Exception as e:
+            log.warning(f"[yellow]![/] Could not enumerate NS: {e}")
+            return []
+
+        hosts = sorted({rdata.target.to_text() for rdata in answers})
+        addresses = await asyncio.gather(*(self._resolve_addresses(resolver, host) for host in hosts))
+        infos = [NameServerInfo(host, ips) for host, ips in zip(hosts, addresses)]
+
+        probes = [(info, ip) for info in infos for ip in info.ips]
+        soas = await asyncio.gather(*(self.get_soa_serial_async(ip) for _, ip in probes))
+        for (info, ip), (serial, rtt) in zip(probes, soas):
+            if serial is not None:
+                info.serials[ip] = serial
+                info.rtts[ip] = rtt
+
+        log.info(f"[blue]*[/] Found {len(probes)} Name Servers ({len(infos)} hosts) for {self.domain}")
+        return infos
+
+    async def get_soa_serial_async(self, nameserver: str) -> Tuple[Optional[int], Optional[float]]:
+        """Returns (serial, rtt in seconds) for the zone as seen by one NS address."""
+        soa, rtt = await self.get_soa_async(nameserver)
+        return (soa.serial, rtt) if soa else (None, None)
+
+    async def get_soa_async(self, nameserver: str, retries: int = 0) -> Tuple[Optional[SOA], Optional[float]]:
+        """Returns (SOA rdata, rtt in seconds) for the zone as seen by one NS address."""
+        try:
+            request = dns.message.make_query(self.domain, dns.rdatatype.SOA)
+            # The channel's RTT sample seeds the timeouts of every later stage
+            async with open_channel(nameserver) as channel:
+                start = time.monotonic()
+                response = await channel.query(request, timeout=5.0, retries=retries)
+                rtt = time.monotonic() - start
+            for rrset in response.answer:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    return rrset[0], rtt
+        except Exception as e:
+            Metrics.error(nameserver, e)
+        return None, None
+
+    async def _resolve_addresses(self, resolver: dns.asyncresolver.Resolver, host: str) -> List[str]:
+        lookups = await asyncio.gather(
+            resolver.resolve(host, 'A'), resolver.resolve(host, 'AAAA'),
+            return_exceptions=True
+        )
+        ips = []
+        for answer in lookups:
+            if isinstance(answer, Exception):
+                continue
+            ips.extend(rdata.to_text() for rdata in answer)
+        return ips
+
+    def _async_resolver(self) -> dns.asyncresolver.Resolver:
+        # Mirror the nameservers and timeouts of the configured sync resolver
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = self.resolver.nameservers
+        resolver.timeout = self.resolver.timeout
+        resolver.lifetime = self.resolver.lifetime
+        return resolver
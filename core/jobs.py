@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from core.records import Record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER UNIQUE,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_job ON results (job_id);
+"""
+
+@dataclass
+class Job:
+    id: int
+    domain: str
+    attempts: int
+
+class JobQueue:
+    """
+    Domains to scan, shared through one SQLite file by a coordinator and any number of
+    worker processes (on other machines too, given a filesystem with working locks).
+    A worker leases each job it takes and renews the lease while scanning; when a
+    worker dies its leases run out and the jobs are handed out again. Finished jobs
+    keep their summary and records and are numbered in completion order, so the
+    coordinator can stream them into one merged output as they come in.
+    """
+    def __init__(self, path: str, lease: float = 600.0, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Autocommit, with explicit write transactions so a claim is atomic across processes
+        self.db = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        with self._transaction():
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.db.execute(statement)
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def _transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def add(self, domains: Iterable[str]) -> int:
+        """Queues domains not queued before; returns how many were new."""
+        with self._transaction():
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO jobs (domain) VALUES (?)", ((d,) for d in domains))
+            return self.db.total_changes - before
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Leases the next pending job (or one whose worker went silent) to worker."""
+        now = time.time()
+        with self._transaction():
+            while True:
+                row = self.db.execute(
+                    "SELECT id, domain, attempts FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+                ).fetchone() or self.db.execute(
+                    "SELECT id, domain, attempts FROM jobs WHERE status = 'running' AND lease_until < ? LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, domain, attempts = row
+                if attempts < self.max_attempts:
+                    break
+                # Every worker that took this one died on it
+                self._finish(job_id, "failed", {"domain": domain, "status": "error: worker lost"})
+            self.db.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                            "WHERE id = ?", (worker, now + self.lease, job_id))
+        return Job(job_id, domain, attempts + 1)
+
+    def heartbeat(self, worker: str):
+        """Renews the leases of every job worker is running."""
+        with self._transaction():
+            self.db.execute("UPDATE jobs SET lease_until = ? WHERE worker = ? AND status = 'running'",
+                            (time.time() + self.lease, worker))
+
+    def complete(self, job: Job, worker: str, summary: dict, records: Iterable[Record]) -> bool:
+        """Stores a finished job; False if its lease was lost and another worker has it now."""
+        with self._transaction():
+            if not self._owned(job, worker):
+                return False
+            self.db.executemany("INSERT INTO results (job_id, name, type, value) VALUES (?, ?, ?, ?)",
+                                ((job.id, r.name, r.type, r.value) for r in records))
+            self._finish(job.id, "done", summary)
+        return True
+
+    def fail(self, job: Job, worker: str, summary: dict):
+        """Puts a failed job back in the queue, or records the failure after max_attempts."""
+        with self._transaction():
+            if not self._owned(job, worker):
+                return
+            if job.attempts < self.max_attempts:
+                self.db.execute("UPDATE jobs SET status = 'pending', worker = NULL WHERE id = ?", (job.id,))
+            else:
+                self._finish(job.id, "failed", summary)
+
+    def release(self, worker: str):
+        """Hands the jobs of a worker that is shutting down back to the queue, attempt not counted."""
+        with self._transaction():
+            self.db.execute("UPDATE jobs SET status = 'pending', worker = NULL, attempts = attempts - 1 "
+                            "WHERE worker = ? AND status = 'running'", (worker,))
+
+    def _owned(self, job: Job, worker: str) -> bool:
+        return self.db.execute("SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                               (job.id, worker)).fetchone() is not None
+
+    def _finish(self, job_id: int, status: str, summary: dict):
+        self.db.execute("UPDATE jobs SET status = ?, summary = ?, worker = NULL, "
+                        "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs) WHERE id = ?",
+                        (status, json.dumps(summary), job_id))
+
+    def finished(self, after: int = 0) -> List[Tuple[int, int, dict]]:
+        """(seq, job id, summary) of the jobs finished after seq, in completion order."""
+        rows = self.db.execute("SELECT seq, id, summary FROM jobs WHERE seq > ? ORDER BY seq", (after,)).fetchall()
+        return [(seq, job_id, json.loads(summary)) for seq, job_id, summary in rows]
+
+    def records(self, job_id: int, batch_size: int = 1000) -> Iterator[List[Record]]:
+        cursor = self.db.execute("SELECT name, type, value FROM results WHERE job_id = ?", (job_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [Record(name, rtype, value) for name, rtype, value in rows]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def remaining(self) -> int:
+        """Jobs still pending or running."""
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
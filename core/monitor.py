@@ -0,0 +1,299 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+import dns.flags
+import dns.message
+import dns.opcode
+import dns.rcode
+import dns.resolver
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from output.logger import log
+from output.store import ScanStore
+from core.enumerator import NSEnumerator
+from core.records import Record
+from core.strategies import AXFRStrategy, IXFRStrategy
+from core.xfr import Change
+
+MIN_INTERVAL = 10.0 # floor for zones that publish a refresh or retry of (nearly) zero
+MAX_FAILURES = 3 # failed checks in a row before the NS set is looked up again
+
+def serial_newer(a: int, b: int) -> bool:
+    """True if serial a is later than b in RFC 1982 serial number arithmetic."""
+    return a != b and (a - b) % 2**32 < 2**31
+
+@dataclass
+class ChangeEvent:
+    """A record added to or deleted from a watched zone; op "serial" (no record) if the zone cannot be transferred."""
+    domain: str
+    op: str
+    record: Optional[Record]
+    serial: int
+    nameserver: str
+    time: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        event = {"time": round(self.time, 3), "domain": self.domain, "op": self.op,
+                 "serial": self.serial, "nameserver": self.nameserver}
+        if self.record:
+            event.update(self.record.to_dict())
+        return event
+
+@dataclass
+class Watch:
+    """Scheduling state of one monitored zone."""
+    domain: str
+    enumerator: NSEnumerator
+    nameservers: List[str] = field(default_factory=list)
+    source: Optional[str] = None # NS whose stored copy changes are diffed against
+    serial: Optional[int] = None # last serial seen, for zones without a stored copy
+    refresh: float = MIN_INTERVAL
+    retry: float = MIN_INTERVAL
+    due: float = 0.0
+    failures: int = 0
+    busy: bool = False
+    notified: bool = False # a NOTIFY came in while a check was running
+
+class Monitor:
+    """
+    Watches many zones for the price of one SOA query per zone per refresh interval.
+    A heap orders the zones by when they are next due; each check asks the NS the
+    stored copy came from for the SOA and only transfers when the serial moved on:
+    IXFR from the stored serial where the server keeps history, AXFR otherwise, and
+    either way the difference to the stored copy is reported as ChangeEvents. The SOA
+    refresh and retry fields time the next check, as they do for a secondary server,
+    and a NOTIFY from one of a zone's name servers makes it due at once.
+    """
+    def __init__(self, domains: Iterable[str], resolver: dns.resolver.Resolver, store: ScanStore,
+                 on_event: Callable[[ChangeEvent], None], concurrency: int = 20, max_refresh: float = 3600.0):
+        self.watches: Dict[str, Watch] = {domain: Watch(domain, NSEnumerator(domain, resolver)) for domain in domains}
+        self.store = store
+        self.on_event = on_event
+        self.max_refresh = max_refresh
+        self.checks = 0
+        self.transfers = 0
+        self._heap = []
+        self._counter = itertools.count() # tie-breaker, so equal due times never compare Watches
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self):
+        """Checks zones as they fall due, forever."""
+        for watch in self.watches.values():
+            self._schedule(watch, 0.0)
+        try:
+            while True:
+                while self._heap and self._heap[0][0] <= time.monotonic():
+                    due, _, watch = heapq.heappop(self._heap)
+                    if due != watch.due or watch.busy:
+                        continue # Superseded by a NOTIFY, or still being checked
+                    watch.busy = True
+                    await self._slots.acquire()
+                    task = asyncio.create_task(self._check(watch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def notify(self, watch: Watch):
+        """Makes watch due now, as its primary asked with a NOTIFY."""
+        if watch.busy:
+            watch.notified = True
+        else:
+            self._schedule(watch, 0.0)
+
+    def _schedule(self, watch: Watch, delay: float):
+        watch.due = time.monotonic() + delay
+        heapq.heappush(self._heap, (watch.due, next(self._counter), watch))
+        self._wake.set()
+
+    async def _check(self, watch: Watch):
+        delay = watch.retry
+        try:
+            delay = await self._poll(watch)
+        except Exception as e:
+            log.warning(f"[yellow]![/] Check of {watch.domain} failed: {e}")
+        finally:
+            self._slots.release()
+            watch.busy = False
+        self.checks += 1
+        notified, watch.notified = watch.notified, False
+        self._schedule(watch, 0.0 if notified else delay)
+
+    async def _poll(self, watch: Watch) -> float:
+        """One SOA check, and a transfer if the zone changed. Returns the seconds until the next check."""
+        if not watch.nameservers:
+            await self._discover(watch)
+            if not watch.nameservers:
+                return self._failed(watch)
+
+        # The source first; the others only stand in while it does not answer
+        for ns in [watch.source] + [ns for ns in watch.nameservers if ns != watch.source]:
+            soa, _ = await watch.enumerator.get_soa_async(ns, retries=1)
+            if soa:
+                break
+        else:
+            return self._failed(watch)
+
+        watch.failures = 0
+        watch.refresh = self._interval(soa.refresh)
+        watch.retry = self._interval(soa.retry)
+        stored = self.store.serial(watch.domain, watch.source)
+        known = stored if stored is not None else watch.serial
+        if known is not None and not serial_newer(soa.serial, known):
+            if stored is not None:
+                self.store.touch(watch.domain, watch.source)
+            return self._jitter(watch.refresh)
+
+        if known is not None:
+            log.info(f"[cyan]➜[/] {watch.domain} changed on {ns}: serial {known} -> {soa.serial}")
+        if not await self._sync(watch, ns, soa.serial):
+            if stored is None:
+                # Nothing to diff against: report that the zone changed, and wait for the next serial
+                if watch.serial is None:
+                    log.warning(f"[yellow]![/] No transfer of {watch.domain} allowed; only serial changes are reported")
+                else:
+                    self.on_event(ChangeEvent(watch.domain, "serial", None, soa.serial, ns))
+                watch.serial = soa.serial
+                return self._jitter(watch.refresh)
+            return self._jitter(watch.retry)
+        watch.serial = soa.serial
+        return self._jitter(watch.refresh)
+
+    async def _discover(self, watch: Watch):
+        """Looks up the NS set and picks the source: the NS of the stored copy, else the most current one."""
+        infos = await watch.enumerator.discover()
+        serials = {ip: serial for info in infos for ip, serial in info.serials.items()}
+        watch.nameservers = [ip for info in infos for ip in info.ips]
+        latest = self.store.latest(watch.domain)
+        if latest and latest[0] in watch.nameservers:
+            watch.source = latest[0]
+        elif serials:
+            watch.source = max(serials, key=serials.get)
+        elif watch.nameservers:
+            watch.source = watch.nameservers[0]
+
+    async def _sync(self, watch: Watch, ns: str, serial: int) -> bool:
+        """Brings the stored copy of ns up to date and reports what changed; False if no transfer worked."""
+        self.transfers += 1
+        stored = self.store.serial(watch.domain, ns)
+        if stored is not None:
+            strategy = IXFRStrategy(stored)
+            changes: List[Change] = []
+            stream = strategy.changes(watch.domain, ns)
+            async with aclosing(stream):
+                async for batch in stream:
+                    changes.extend(batch)
+            if strategy.complete and strategy.incremental:
+                self.store.apply(watch.domain, ns, strategy.end_serial, changes)
+                self._report(watch, ns, strategy.end_serial, self._net(changes))
+                return True
+            if strategy.complete and changes:
+                # Servers without the history answer with the whole zone
+                return self._replace(watch, ns, strategy.end_serial, [r for op, r in changes if op == "add"])
+
+        strategy = AXFRStrategy()
+        records = await strategy.execute_async(watch.domain, ns)
+        if not strategy.complete:
+            return False
+        return self._replace(watch, ns, strategy.serial, records)
+
+    def _replace(self, watch: Watch, ns: str, serial: int, records: List[Record]) -> bool:
+        """Stores a full copy from ns and reports its difference to the copy of the current source."""
+        reference = ns if self.store.serial(watch.domain, ns) is not None else watch.source
+        baseline = self.store.serial(watch.domain, reference) is None
+        old = set()
+        for batch in self.store.records(watch.domain, reference):
+            old.update(batch)
+        writer = self.store.writer(watch.domain, ns)
+        writer.add(records)
+        writer.commit(serial)
+        if baseline:
+            log.info(f"[bold green]✓[/] Watching {watch.domain}: {len(records)} records at serial {serial} from {ns}")
+        else:
+            new = set(records)
+            self._report(watch, ns, serial, [("add", r) for r in records if r not in old] +
+                         [("delete", r) for r in old if r not in new])
+        watch.source = ns
+        return True
+
+    def _report(self, watch: Watch, ns: str, serial: int, changes: List[Change]):
+        added = deleted = 0
+        for op, record in changes:
+            if record.type == "SOA":
+                continue # Changes with every version; the serial is on the event already
+            self.on_event(ChangeEvent(watch.domain, op, record, serial, ns))
+            added += op == "add"
+            deleted += op == "delete"
+        log.info(f"[bold green]✓[/] {watch.domain} at serial {serial}: +{added} / -{deleted}")
+
+    @staticmethod
+    def _net(changes: List[Change]) -> List[Change]:
+        """Collapses an IXFR spanning several versions into its net effect."""
+        net: Dict[Record, int] = {}
+        for op, record in changes:
+            net[record] = net.get(record, 0) + (1 if op == "add" else -1)
+        return [("add" if count > 0 else "delete", record) for record, count in net.items() if count]
+
+    def _failed(self, watch: Watch) -> float:
+        watch.failures += 1
+        if watch.failures >= MAX_FAILURES:
+            watch.nameservers = [] # The delegation may have moved; look it up again
+        log.warning(f"[yellow]![/] No SOA for {watch.domain} ({watch.failures} failed checks in a row)")
+        return self._jitter(watch.retry)
+
+    def _interval(self, seconds: int) -> float:
+        return min(max(float(seconds), MIN_INTERVAL), self.max_refresh)
+
+    @staticmethod
+    def _jitter(delay: float) -> float:
+        # Zones that share a refresh value would otherwise stay in lockstep
+        return delay * random.uniform(0.9, 1.0)
+
+class NotifyListener(asyncio.DatagramProtocol):
+    """
+    Answers DNS NOTIFY messages (RFC 1996) and makes the zone due for a check at once.
+    Only a NOTIFY from one of the zone's own name servers is acted on.
+    """
+    def __init__(self, monitor: Monitor):
+        self.monitor = monitor
+        self.transport = None
+
+    @classmethod
+    async def start(cls, monitor: Monitor, host: str, port: int) -> asyncio.DatagramTransport:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: cls(monitor), local_addr=(host, port))
+        log.info(f"[blue]*[/] Listening for NOTIFY on {host}:{port}")
+        return transport
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            message = dns.message.from_wire(data)
+        except Exception:
+            return
+        if message.opcode() != dns.opcode.NOTIFY or message.flags & dns.flags.QR or not message.question:
+            return
+        domain = message.question[0].name.to_text(omit_final_dot=True).lower()
+        watch = self.monitor.watches.get(domain)
+        response = dns.message.make_response(message)
+        if watch is None or addr[0] not in watch.nameservers:
+            response.set_rcode(dns.rcode.REFUSED)
+        else:
+            response.flags |= dns.flags.AA
+            log.info(f"[blue]*[/] NOTIFY for {domain} from {addr[0]}")
+            self.monitor.notify(watch)
+        self.transport.sendto(response.to_wire(), addr)
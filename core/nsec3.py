@@ -0,0 +1,175 @@
+import asyncio
+import base64
+import bisect
+import hashlib
+import os
+import dns.exception
+import dns.message
+import dns.name
+import dns.rdatatype
+from dataclasses import dataclass, field
+from typing import List, Dict, Set, Optional, Sequence
+from output.logger import log
+from utils.metrics import Metrics
+from core.transport import HedgedPool
+
+RING = 1 << 160 # SHA-1 output space, the only NSEC3 hash algorithm in use
+FAILURE_WINDOWS = 2 # windows of probes in a row without an answer before the collector gives up
+
+def name_wire(name: str, origin_wire: bytes) -> bytes:
+    """Canonical (lowercase) wire format of name.origin, as hashed by NSEC3; name may hold several labels."""
+    wire = bytearray()
+    for label in name.lower().split("."):
+        raw = label.encode("ascii")
+        if not 0 < len(raw) <= 63:
+            raise ValueError(f"Invalid label {label!r} in {name!r}")
+        wire.append(len(raw))
+        wire += raw
+    if len(wire) + len(origin_wire) > 255:
+        raise ValueError(f"{name!r} is too long under this origin")
+    return bytes(wire) + origin_wire
+
+def nsec3_digest(wire: bytes, salt: bytes, iterations: int) -> bytes:
+    """RFC 5155 hash of a name already in canonical wire format."""
+    digest = hashlib.sha1(wire + salt).digest()
+    for _ in range(iterations):
+        digest = hashlib.sha1(digest + salt).digest()
+    return digest
+
+@dataclass
+class NSEC3Chain:
+    """The part of a zone's NSEC3 chain seen so far, keyed by the integer value of each hash."""
+    algorithm: int
+    iterations: int
+    salt: bytes
+    links: Dict[int, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._owners = sorted(self.links)
+        self._spanned = sum(self._span(owner, next_hash) for owner, next_hash in self.links.items())
+
+    def add(self, owner: int, next_hash: int) -> bool:
+        if owner in self.links:
+            return False
+        self.links[owner] = next_hash
+        self._spanned += self._span(owner, next_hash)
+        bisect.insort(self._owners, owner)
+        return True
+
+    def is_covered(self, value: int) -> bool:
+        """True when value is an owner or falls strictly inside a known (owner, next) interval."""
+        if not self._owners:
+            return False
+        # bisect - 1 wraps to the last owner for values below the first one
+        owner = self._owners[bisect.bisect_right(self._owners, value) - 1]
+        return value == owner or (value - owner) % RING < (self.links[owner] - owner) % RING
+
+    def coverage(self) -> float:
+        """Fraction of the hash ring spanned by the collected intervals."""
+        return min(1.0, self._spanned / RING)
+
+    def estimated_size(self) -> int:
+        """Rough number of names in the zone, extrapolated from the coverage so far."""
+        coverage = self.coverage()
+        return int(len(self.links) / coverage) if coverage else 0
+
+    def _span(self, owner: int, next_hash: int) -> int:
+        # A single-link chain (owner == next) spans the whole ring
+        return (next_hash - owner) % RING or RING
+
+    def hashes(self) -> Set[bytes]:
+        """Every hashed owner name seen, as raw digests."""
+        values = set(self.links) | set(self.links.values())
+        return {value.to_bytes(20, "big") for value in values}
+
+    def hashcat_lines(self, domain: str) -> List[str]:
+        """hashcat mode 8300 lines (hash:.domain:salt:iterations) for external cracking."""
+        salt = self.salt.hex()
+        return [f"{base64.b32hexencode(digest).decode().lower()}:.{domain}:{salt}:{self.iterations}"
+                for digest in sorted(self.hashes())]
+
+class NSEC3Collector:
+    """
+    Harvests hashed owner names and chain parameters from NXDOMAIN responses.
+    Candidate names are hashed locally first and only those landing in an uncovered
+    gap are queried, so almost every query reveals a new part of the chain. Probes the
+    nameserver is slow to answer are hedged to the fastest of alternates; once two
+    windows' worth of probes in a row went unanswered, the collector stops with what it has.
+    """
+    def __init__(self, domain: str, nameserver: str, concurrency: int = 32, timeout: float = 3.0,
+                 retries: int = 1, alternates: Sequence[str] = ()):
+        self.domain = domain
+        self.nameserver = nameserver
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.servers = [nameserver] + [ns for ns in alternates if ns != nameserver]
+        self.origin = dns.name.from_text(domain)
+        self.origin_wire = self.origin.canonicalize().to_wire()
+        self.chain = None
+        self.queries = 0
+        self.failures = 0 # probes in a row without an answer, over all workers
+        self.pool: Optional[HedgedPool] = None
+
+    async def run(self, target_coverage: float = 0.95, max_queries: int = 100000) -> Optional[NSEC3Chain]:
+        log.info(f"[cyan]➜[/] Collecting NSEC3 hashes from {self.nameserver}...")
+        async with HedgedPool(self.servers) as self.pool:
+            return await self._collect(target_coverage, max_queries)
+
+    async def _collect(self, target_coverage: float, max_queries: int) -> Optional[NSEC3Chain]:
+        # The first answer tells us whether the zone uses NSEC3 at all, and with which parameters
+        try:
+            await self._probe(self._random_label())
+        except (dns.exception.DNSException, OSError) as e:
+            Metrics.error(self.nameserver, e)
+            log.warning(f"[yellow]![/] NSEC3 probe failed on {self.nameserver}: {e}")
+            return None
+        if not self.chain:
+            log.debug(f"No NSEC3 records returned by {self.nameserver}")
+            return None
+
+        max_failures = FAILURE_WINDOWS * self.concurrency
+
+        async def worker():
+            misses = 0
+            while (self.chain.coverage() < target_coverage and self.queries < max_queries
+                   and self.failures < max_failures):
+                label = self._random_label()
+                value = int.from_bytes(nsec3_digest(name_wire(label, self.origin_wire),
+                                                    self.chain.salt, self.chain.iterations), "big")
+                if self.chain.is_covered(value):
+                    misses += 1
+                    if misses % 256 == 0:
+                        await asyncio.sleep(0) # Hashing is CPU-bound, let the queries progress
+                    continue
+                try:
+                    await self._probe(label)
+                    self.failures = 0
+                except (dns.exception.DNSException, OSError) as e:
+                    self.failures += 1
+                    Metrics.error(self.nameserver, e)
+                    log.debug(f"NSEC3 probe failed on {self.nameserver}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        if self.failures >= max_failures:
+            log.warning(f"[yellow]![/] {self.nameserver} stopped answering NSEC3 probes ({self.failures} failures in a row)")
+        log.info(f"[bold green]✓[/] NSEC3: {len(self.chain.links)} hashes, "
+                 f"{self.chain.coverage():.1%} of the chain covered (~{self.chain.estimated_size()} names)")
+        return self.chain
+
+    async def _probe(self, label: str):
+        self.queries += 1
+        request = dns.message.make_query(dns.name.from_text(label, self.origin), dns.rdatatype.A,
+                                         use_edns=0, payload=4096, want_dnssec=True)
+        response = await self.pool.query(request, self.timeout, self.retries)
+        for rrset in response.authority:
+            if rrset.rdtype != dns.rdatatype.NSEC3:
+                continue
+            owner = int.from_bytes(base64.b32hexdecode(rrset.name[0].upper()), "big")
+            for rdata in rrset:
+                if self.chain is None:
+                    self.chain = NSEC3Chain(rdata.algorithm, rdata.iterations, rdata.salt)
+                self.chain.add(owner, int.from_bytes(rdata.next, "big"))
+
+    def _random_label(self) -> str:
+        return os.urandom(8).hex()
@@ -0,0 +1,185 @@
+from itertools import islice
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, Optional
+
+class Record:
+    """
+    One finding (name, type, value). Slots instead of a per-record dict, and interned
+    strings, so the owner names, types and values repeated across a zone are stored once.
+    """
+    __slots__ = ("name", "type", "value")
+    FIELDS = ("name", "type", "value")
+
+    def __init__(self, name: str, type: str, value: str):
+        self.name = intern(name)
+        self.type = intern(type)
+        self.value = intern(value)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.name == other.name and self.type == other.type and self.value == other.value
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.type, self.value))
+
+    def __repr__(self) -> str:
+        return f"Record({self.name!r}, {self.type!r}, {self.value!r})"
+
+    def __reduce__(self):
+        return (Record, (self.name, self.type, self.value))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "type": self.type, "value": self.value}
+
+class NameNode:
+    """One label of a NameTree; an owner name once records are attached to it."""
+    __slots__ = ("label", "parent", "children", "records")
+
+    def __init__(self, label: str, parent: Optional["NameNode"]):
+        self.label = label
+        self.parent = parent
+        self.children: Dict[str, NameNode] = {}
+        self.records: Dict[str, List[Record]] = {} # type -> records, whichever source found them
+
+    @property
+    def name(self) -> str:
+        labels = []
+        node = self
+        while node.parent is not None:
+            labels.append(node.label)
+            node = node.parent
+        return ".".join(labels)
+
+    def __iter__(self) -> Iterator[Record]:
+        for records in self.records.values():
+            yield from records
+
+class NameTree:
+    """
+    Owner names as a trie of reversed labels ("com" -> "example" -> "dev"), so questions
+    about the hierarchy cost as much as their answer rather than a pass over the zone:
+    everything under a name, the names a given number of labels below it, and every
+    type one owner has. Names are matched case-insensitively without the trailing dot,
+    so records for one owner from AXFR, NSEC walks and OSINT share a single node.
+    """
+    def __init__(self, records: Iterable[Record] = ()):
+        self.root = NameNode("", None)
+        self.owners = 0
+        self._nodes: Dict[str, NameNode] = {} # record.name as found -> its node
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def labels(name: str) -> List[str]:
+        # Transfers name apex records "@.<domain>"; "@" is the apex itself, not a label
+        return [label for label in reversed(name.lower().rstrip(".").split(".")) if label and label != "@"]
+
+    def add(self, record: Record) -> NameNode:
+        # Owners repeat across a zone's records, so the walk down the trie is done once per name
+        node = self._nodes.get(record.name)
+        if node is None:
+            node = self._nodes[record.name] = self._insert(record.name)
+        if not node.records:
+            self.owners += 1
+        records = node.records.get(record.type)
+        if records is None:
+            node.records[record.type] = [record]
+        else:
+            records.append(record)
+        return node
+
+    def _insert(self, name: str) -> NameNode:
+        node = self.root
+        for label in reversed(name.lower().rstrip(".").split(".")):
+            child = node.children.get(label)
+            if child is None:
+                if not label or label == "@":
+                    continue # Never a key, so the lookup above misses for these alone
+                child = node.children[label] = NameNode(label, node)
+            node = child
+        return node
+
+    def find(self, name: str) -> Optional[NameNode]:
+        """The node of name, owner or not, or None if nothing at or below it was found."""
+        node = self.root
+        for label in self.labels(name):
+            node = node.children.get(label)
+            if node is None:
+                return None
+        return node
+
+    def subtree(self, name: str = "") -> Iterator[NameNode]:
+        """Every owner at or below name, parents before their children."""
+        start = self.find(name)
+        stack = [start] if start else []
+        while stack:
+            node = stack.pop()
+            if node.records:
+                yield node
+            stack.extend(reversed(node.children.values()))
+
+    def at_depth(self, name: str, depth: int) -> Iterator[NameNode]:
+        """Owners exactly depth labels below name (1: its direct children)."""
+        start = self.find(name)
+        level = [start] if start else []
+        for _ in range(depth):
+            level = [child for node in level for child in node.children.values()]
+        return (node for node in level if node.records)
+
+    def records(self, name: str = "", rtype: Optional[str] = None) -> Iterator[Record]:
+        """Records owned by name or anything below it, optionally of one type only."""
+        for node in self.subtree(name):
+            if rtype is None:
+                yield from node
+            else:
+                yield from node.records.get(rtype, ())
+
+class RecordSet:
+    """
+    Records in arrival order with duplicates dropped as they come in, so a scan never
+    has to rebuild its results to deduplicate them. index() adds a NameTree over them
+    for the stages that ask about the name hierarchy.
+    """
+    def __init__(self, records: Iterable[Record] = ()):
+        self._records: Dict[Record, None] = {}
+        self._tree: Optional[NameTree] = None
+        self._pending: List[Record] = [] # Added since the last index(), once there is a tree
+        self.extend(records)
+
+    def add(self, record: Record) -> bool:
+        """Adds record and returns True, or returns False if it was already present."""
+        if record in self._records:
+            return False
+        self._records[record] = None
+        if self._tree is not None:
+            self._pending.append(record)
+        return True
+
+    def extend(self, records: Iterable[Record]) -> List[Record]:
+        """Adds records and returns the ones that were new."""
+        return [record for record in records if self.add(record)]
+
+    def index(self) -> NameTree:
+        """The name index, brought up to date with the records added since the last call."""
+        if self._tree is None:
+            # Built on first use, so scans that never ask pay nothing on the add() path
+            self._tree = NameTree(self._records)
+        else:
+            for record in self._pending:
+                self._tree.add(record)
+        self._pending.clear()
+        return self._tree
+
+    def tail(self, count: int) -> List[Record]:
+        """The last count records added, oldest first."""
+        return list(islice(reversed(self._records), count))[::-1]
+
+    def __contains__(self, record: Record) -> bool:
+        return record in self._records
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -1,28 +1,59 @@
-import socks
-import socket
-import dns.resolver
-from output.logger import log
-
-class ResolverWrapper:
-    def __init__(self, proxy: str = None):
-        self.proxy = proxy
-        self.resolver = dns.resolver.Resolver()
-        self._configure_proxy()
-
-    def _configure_proxy(self):
-        """Routes DNS traffic through SOCKS5 if configured."""
-        if self.proxy:
-            try:
-                host, port = self.proxy.split(":")
-                socks.set_default_proxy(socks.SOCKS5, host, int(port))
-                socket.socket = socks.socksocket
-                log.info(f"[bold green]✓[/] Proxy enabled: Routing via {self.proxy}")
-            except ValueError:
-                log.error("[bold red]![/] Invalid proxy format. Use IP:PORT")
-        
-        # Optimize resolver
-        self.resolver.timeout = 5.0
-        self.resolver.lifetime = 5.0
-
-    def get_resolver(self) -> dns.resolver.Resolver:
-        return self.resolver
\ No newline at end of file
+import socks
+import socket
+import dns.inet
+import dns.nameserver
+import dns.query
+import dns.resolver
+from typing import List
+from output.logger import log
+from core.transport import Connections
+
+class PooledNameserver(dns.nameserver.Do53Nameserver):
+    """
+    A recursive resolver reached over DNS-over-TCP, through the SOCKS5 proxies when any
+    are configured. On the event loop lookups share the pipelined pool connections;
+    blocking lookups get a PySocks socket of their own.
+    """
+    def kind(self) -> str:
+        return "Do53/TCP"
+
+    def is_always_max_size(self) -> bool:
+        return True
+
+    def query(self, request, timeout, source, source_port, max_size, one_rr_per_rrset=False, ignore_trailing=False):
+        sock = socks.socksocket(dns.inet.af_for_address(self.address), socket.SOCK_STREAM)
+        proxy = Connections.proxy()
+        if proxy:
+            sock.set_proxy(socks.SOCKS5, proxy.host, proxy.port, username=proxy.username, password=proxy.password)
+        with sock:
+            sock.settimeout(timeout)
+            sock.connect((self.address, self.port))
+            return dns.query.tcp(request, self.address, timeout, self.port, sock=sock,
+                                 one_rr_per_rrset=one_rr_per_rrset, ignore_trailing=ignore_trailing)
+
+    async def async_query(self, request, timeout, source, source_port, max_size, backend,
+                          one_rr_per_rrset=False, ignore_trailing=False):
+        return await Connections.get(self.address).query(request, timeout, retries=0)
+
+class ResolverWrapper:
+    def __init__(self, nameservers: List[str] = None):
+        # Explicit nameservers make /etc/resolv.conf optional
+        self.resolver = dns.resolver.Resolver(configure=not nameservers)
+        if nameservers:
+            self.resolver.nameservers = nameservers
+        self._configure_transport()
+
+    def _configure_transport(self):
+        """Sends lookups over pooled TCP (and the SOCKS5 proxies) when Connections is enabled."""
+        if Connections.enabled:
+            self.resolver.nameservers = [PooledNameserver(str(ns)) for ns in self.resolver.nameservers]
+            proxies = [str(proxy) for proxy in Connections.proxies if proxy]
+            if proxies:
+                log.info(f"[bold green]✓[/] Proxy enabled: Routing DNS via {', '.join(proxies)}")
+
+        # Optimize resolver
+        self.resolver.timeout = 5.0
+        self.resolver.lifetime = 5.0
+
+    def get_resolver(self) -> dns.resolver.Resolver:
+        return self.resolver
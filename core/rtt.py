@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class RTTEstimator:
+    """
+    Smoothed RTT and retransmission timeout for one nameserver, as TCP keeps them (RFC 6298),
+    plus a short window of raw samples for the p95 used to hedge.
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, min_rto: float = 0.2, max_rto: float = 10.0, window: int = 64):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto: Optional[float] = None
+        self._backed_off = False
+        self._hold_until = 0.0 # no further doubling before this (time.monotonic())
+        self._samples = deque(maxlen=window)
+        self._p95: Optional[float] = None
+        self._fresh = 0 # samples since _p95 was computed
+
+    def observe(self, rtt: float):
+        """Feeds one RTT; only answers to a first transmission count (Karn's algorithm)."""
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        rto = min(self.max_rto, self.srtt + max(self.min_rto, 4 * self.rttvar))
+        if self._backed_off:
+            now = time.monotonic()
+            if now < self._hold_until:
+                rto = max(rto, self.rto) # Answers to queries sent before the loss prove nothing yet
+            elif self.rto / 2 > rto:
+                rto = self.rto / 2
+                self._hold_until = now + rto
+            else:
+                self._backed_off = False
+        self.rto = rto
+        self._samples.append(rtt)
+        self._fresh += 1
+
+    def backoff(self):
+        """Doubles the RTO after a timeout, unless it was already doubled within the last RTO."""
+        now = time.monotonic()
+        if self.rto is not None and now >= self._hold_until:
+            self.rto = min(self.max_rto, self.rto * 2)
+            self._backed_off = True
+            self._hold_until = now + self.rto
+
+    def timeout(self, attempt: int, default: float) -> float:
+        """How long to wait for attempt (0 = first send); default until anything was measured."""
+        base = self.rto if self.rto is not None else default
+        return min(self.max_rto, base * 2 ** attempt)
+
+    def hedge_delay(self, default: float) -> float:
+        """How long to wait for this server before asking another: its p95 RTT once known."""
+        if len(self._samples) < 8:
+            return self.timeout(0, default)
+        # Re-sorting the window on every sample would cost more than the query
+        if self._p95 is None or self._fresh >= 8:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[int(len(ordered) * 0.95)]
+            self._fresh = 0
+        return max(self.min_rto, self._p95)
+
+class RTTTracker:
+    """Process-wide RTT estimators, one per nameserver address, shared by every stage."""
+    _estimators: Dict[str, RTTEstimator] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, nameserver: str) -> RTTEstimator:
+        estimator = cls._estimators.get(nameserver)
+        if estimator is None:
+            with cls._lock:
+                estimator = cls._estimators.setdefault(nameserver, RTTEstimator())
+        return estimator
+
+    @classmethod
+    def reset(cls):
+        cls._estimators = {}
@@ -1,42 +1,144 @@
-import dns.message
-import dns.query
-import dns.flags
-from typing import List, Dict
-from output.logger import log
-
-class CacheSnooper:
-    """
-    Sends non-recursive queries (RD=0) to check if records exist in the NS cache.
-    """
-    def __init__(self, nameserver: str):
-        self.nameserver = nameserver
-        # Domains to check in the cache
-        self.targets = [
-            "google.com", "facebook.com", # General traffic
-            "update.microsoft.com",       # Server patching
-            "github.com",                 # Dev activity
-            "pornhub.com",                # Policy violation
-            "torproject.org"              # Security/Privacy usage
-        ]
-
-    def run(self) -> List[Dict[str, str]]:
-        log.info(f"[cyan]➜[/] performing Cache Snooping on {self.nameserver}...")
-        findings = []
-
-        for target in self.targets:
-            try:
-                # Make query with Recursion Desired = 0
-                query = dns.message.make_query(target, dns.rdatatype.A)
-                query.flags &= ~dns.flags.RD 
-                
-                response = dns.query.udp(query, self.nameserver, timeout=3)
-                
-                # If we get an Answer without RD bit set, it's cached
-                if len(response.answer) > 0:
-                    msg = f"Cache HIT: {target} is in memory (TTL: {response.answer[0].ttl}s)"
-                    log.warning(f"[yellow]![/] {msg}")
-                    findings.append({"severity": "MEDIUM", "msg": msg})
-            except Exception:
-                pass
-        
-        return findings
\ No newline at end of file
+import asyncio
+import time
+import dns.message
+import dns.query
+import dns.flags
+import dns.rdatatype
+from typing import List, Dict, Optional
+from output.logger import log
+from core.transport import open_channel
+from utils.metrics import Metrics
+
+class CacheSnooper:
+    """
+    Sends non-recursive queries (RD=0) to check if records exist in the NS cache.
+    All probes for one nameserver share a single UDP socket (or the pooled TCP
+    connections) and run concurrently, but only so many at once: beyond what the
+    server answers within its RTO, probes time out and cached names look uncached.
+    Probes that got no answer are retried at a tenth of the concurrency.
+    """
+    # Domains to check in the cache
+    DEFAULT_TARGETS = [
+        "google.com", "facebook.com", # General traffic
+        "update.microsoft.com",       # Server patching
+        "github.com",                 # Dev activity
+        "pornhub.com",                # Policy violation
+        "torproject.org"              # Security/Privacy usage
+    ]
+
+    def __init__(self, nameserver: str, targets: Optional[List[str]] = None,
+                 concurrency: int = 50, timeout: float = 3.0, retries: int = 1):
+        self.nameserver = nameserver
+        self.targets = targets or self.DEFAULT_TARGETS
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+
+    @staticmethod
+    def load_targets(path: str) -> List[str]:
+        """Reads one name per line, skipping blanks and comments."""
+        with open(path) as f:
+            names = (line.strip().rstrip(".") for line in f)
+            return list(dict.fromkeys(n for n in names if n and not n.startswith("#")))
+
+    def run(self) -> List[Dict[str, str]]:
+        """Blocking single pass, for callers outside the event loop."""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> List[Dict[str, str]]:
+        log.info(f"[cyan]➜[/] performing Cache Snooping on {self.nameserver} ({len(self.targets)} names)...")
+        findings = []
+        for target, ttl in (await self._probe_all()).items():
+            if ttl is not None:
+                msg = f"Cache HIT: {target} is in memory on {self.nameserver} (TTL: {ttl}s)"
+                log.warning(f"[yellow]![/] {msg}")
+                findings.append({"severity": "MEDIUM", "msg": msg})
+        return findings
+
+    async def sample(self, rounds: int, interval: float) -> List[Dict[str, str]]:
+        """
+        Probes every target repeatedly and analyses how the cached TTLs decay.
+        A TTL that jumps back up between samples means the entry expired and a client
+        fetched it again, which gives a lower bound on how often the name is queried.
+        """
+        log.info(f"[cyan]➜[/] TTL sampling on {self.nameserver}: {rounds} rounds every {interval}s...")
+        series = {target: [] for target in self.targets}
+        for i in range(rounds):
+            started = time.monotonic()
+            for target, ttl in (await self._probe_all()).items():
+                series[target].append((started, ttl))
+            if i < rounds - 1:
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+        findings = []
+        for target, samples in series.items():
+            analysis = self._analyse(samples)
+            if analysis:
+                msg = (f"Cache HIT: {target} on {self.nameserver} - seen in {analysis['hits']}/{len(samples)} samples, "
+                       f"re-fetched {analysis['refills']}x in {analysis['window']:.0f}s, "
+                       f"last fill ~{analysis['age']:.0f}s before the last sample (max TTL {analysis['max_ttl']}s)")
+                log.warning(f"[yellow]![/] {msg}")
+                findings.append({"severity": "MEDIUM", "msg": msg})
+        return findings
+
+    def _analyse(self, samples: List[tuple]) -> Optional[Dict[str, float]]:
+        hits = [(t, ttl) for t, ttl in samples if ttl is not None]
+        if not hits:
+            return None
+        # The largest TTL seen is the best estimate of the authoritative TTL
+        max_ttl = max(ttl for _, ttl in hits)
+        refills = 0
+        last_fill = hits[0][0] - (max_ttl - hits[0][1])
+        previous = None
+        for t, ttl in samples:
+            if ttl is None:
+                previous = None
+                continue
+            expected = previous[1] - (t - previous[0]) if previous else None
+            # Absent -> present, or a TTL higher than plain decay allows, is a new fill
+            if previous is None and t != samples[0][0] or (expected is not None and ttl > expected + 1):
+                refills += 1
+                last_fill = t - (max_ttl - ttl)
+            previous = (t, ttl)
+        return {
+            "hits": len(hits),
+            "refills": refills,
+            "window": samples[-1][0] - samples[0][0],
+            "age": samples[-1][0] - last_fill,
+            "max_ttl": max_ttl
+        }
+
+    async def _probe_all(self) -> Dict[str, Optional[int]]:
+        """Returns the cached TTL of every target, or None when it is not cached."""
+        async with open_channel(self.nameserver) as channel:
+            results = await self._probe(channel, self.targets, self.concurrency)
+            failed = [target for target, ttl in results.items() if ttl is False]
+            if failed:
+                # A "not cached" answer is only trusted from a server that answered at all
+                results.update(await self._probe(channel, failed, max(1, self.concurrency // 10)))
+        unanswered = sum(1 for ttl in results.values() if ttl is False)
+        if unanswered:
+            log.warning(f"[yellow]![/] {unanswered} snoop probes got no answer from {self.nameserver}")
+        return {target: ttl if ttl is not False else None for target, ttl in results.items()}
+
+    async def _probe(self, channel, targets: List[str], concurrency: int) -> Dict[str, object]:
+        """TTL when cached, None when not, False when the probe got no answer."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def probe(target):
+            async with semaphore:
+                try:
+                    # Make query with Recursion Desired = 0
+                    query = dns.message.make_query(target, dns.rdatatype.A)
+                    query.flags &= ~dns.flags.RD
+                    response = await channel.query(query, self.timeout, self.retries)
+                except Exception as e:
+                    Metrics.error(self.nameserver, e)
+                    log.debug(f"Snoop probe for {target} failed on {self.nameserver}: {e}")
+                    return target, False
+                # If we get an Answer without RD bit set, it's cached
+                if len(response.answer) > 0:
+                    return target, response.answer[0].ttl
+                return target, None
+
+        return dict(await asyncio.gather(*(probe(t) for t in targets)))
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+REPLIES = {
+    1: "general SOCKS server failure", 2: "connection not allowed by ruleset", 3: "network unreachable",
+    4: "host unreachable", 5: "connection refused", 6: "TTL expired", 7: "command not supported",
+    8: "address type not supported"
+}
+
+class ProxyError(ConnectionError):
+    pass
+
+@dataclass(frozen=True)
+class Proxy:
+    host: str
+    port: int
+    username: Optional[str] = None
+    password: Optional[str] = None
+
+    @classmethod
+    def parse(cls, text: str) -> "Proxy":
+        """[USER:PASS@]HOST:PORT, with IPv6 hosts in brackets."""
+        credentials, _, address = text.rpartition("@")
+        host, _, port = address.rpartition(":")
+        host = host.strip("[]")
+        if not host or not port.isdigit():
+            raise ValueError(f"invalid proxy {text!r}, expected [USER:PASS@]HOST:PORT")
+        username, _, password = credentials.partition(":")
+        return cls(host, int(port), username or None, password or None)
+
+    def __str__(self):
+        return f"[{self.host}]:{self.port}" if ":" in self.host else f"{self.host}:{self.port}"
+
+async def open_connection(host: str, port: int, proxy: Optional[Proxy] = None,
+                          timeout: float = 10.0) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """asyncio.open_connection(), optionally tunnelled through a SOCKS5 proxy (RFC 1928)."""
+    if proxy is None:
+        return await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(proxy.host, proxy.port), timeout)
+    try:
+        await asyncio.wait_for(_connect(reader, writer, proxy, host, port), timeout)
+    except BaseException:
+        writer.close()
+        raise
+    return reader, writer
+
+async def _connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, proxy: Proxy, host: str, port: int):
+    methods = b"\x00\x02" if proxy.username else b"\x00"
+    writer.write(b"\x05" + bytes([len(methods)]) + methods)
+    version, method = await reader.readexactly(2)
+    if version != 5:
+        raise ProxyError(f"{proxy} is not a SOCKS5 proxy")
+    if method == 2:
+        # Username/password authentication (RFC 1929)
+        username, password = proxy.username.encode(), (proxy.password or "").encode()
+        writer.write(b"\x01" + bytes([len(username)]) + username + bytes([len(password)]) + password)
+        _, status = await reader.readexactly(2)
+        if status != 0:
+            raise ProxyError(f"{proxy} rejected the credentials")
+    elif method != 0:
+        raise ProxyError(f"{proxy} accepts none of our authentication methods")
+
+    writer.write(b"\x05\x01\x00" + _address(host) + struct.pack("!H", port))
+    _, reply, _, kind = await reader.readexactly(4)
+    if reply != 0:
+        raise ProxyError(f"{proxy} could not connect to {host}:{port}: {REPLIES.get(reply, f'error {reply}')}")
+    # The address the proxy bound is of no use to us
+    length = {1: 4, 4: 16}.get(kind) or (await reader.readexactly(1))[0]
+    await reader.readexactly(length + 2)
+
+def _address(host: str) -> bytes:
+    for kind, family in ((b"\x01", socket.AF_INET), (b"\x04", socket.AF_INET6)):
+        try:
+            return kind + socket.inet_pton(family, host)
+        except OSError:
+            pass
+    name = host.encode("idna")
+    return b"\x03" + bytes([len(name)]) + name
@@ -1,113 +1,296 @@
-import dns.query
-import dns.zone
-import dns.xfr
-import dns.rdatatype
-import dns.name
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from output.logger import log
-from utils.jitter import Jitter
-
-class AttackStrategy(ABC):
-    @abstractmethod
-    def execute(self, domain: str, nameserver: str) -> List[Dict[str, Any]]:
-        pass
-
-class AXFRStrategy(AttackStrategy):
-    def execute(self, domain: str, nameserver: str) -> List[Dict[str, Any]]:
-        Jitter.wait()
-        results = []
-        try:
-            log.info(f"[cyan]➜[/] Attempting AXFR on {nameserver}...")
-            zone = dns.zone.from_xfr(dns.query.xfr(nameserver, domain, lifetime=10.0))
-            
-            for name, node in zone.nodes.items():
-                for rdataset in node.rdatasets:
-                    results.append({
-                        "name": str(name) + "." + domain,
-                        "type": dns.rdatatype.to_text(rdataset.rdtype),
-                        "value": str(rdataset[0])
-                    })
-            log.info(f"[bold green]✓[/] AXFR Successful! retrieved {len(results)} records.")
-        except Exception as e:
-            log.debug(f"AXFR failed on {nameserver}: {e}")
-        return results
-
-class IXFRStrategy(AttackStrategy):
-    def __init__(self, current_serial: int):
-        self.serial = current_serial
-
-    def execute(self, domain: str, nameserver: str) -> List[Dict[str, Any]]:
-        Jitter.wait()
-        results = []
-        if not self.serial:
-            return []
-            
-        try:
-            log.info(f"[cyan]➜[/] Attempting IXFR on {nameserver} (Serial: {self.serial})...")
-            # Note: dnspython xfr handles IXFR if serial is provided
-            zone = dns.zone.from_xfr(dns.query.xfr(nameserver, domain, rdtype=dns.rdatatype.IXFR, serial=self.serial, lifetime=10.0))
-            
-            for name, node in zone.nodes.items():
-                for rdataset in node.rdatasets:
-                    results.append({
-                        "name": str(name) + "." + domain,
-                        "type": dns.rdatatype.to_text(rdataset.rdtype),
-                        "value": str(rdataset[0])
-                    })
-            log.info(f"[bold green]✓[/] IXFR Successful!")
-        except Exception as e:
-            log.debug(f"IXFR failed on {nameserver}: {e}")
-        return results
-
-class NSECWalkStrategy(AttackStrategy):
-    def execute(self, domain: str, nameserver: str) -> List[Dict[str, Any]]:
-        log.info(f"[cyan]➜[/] Attempting NSEC Zone Walking on {nameserver}...")
-        found_subdomains = set()
-        current_name = domain # Start at root
-        
-        # Safety break to prevent infinite loops
-        max_hops = 100 
-        hops = 0
-
-        try:
-            while hops < max_hops:
-                Jitter.wait()
-                hops += 1
-                
-                # Query for a non-existent name to trigger NSEC
-                # We append a garbage label to the current known name
-                query_name = f"00-nonexistent.{current_name}" if current_name == domain else current_name
-                
-                request = dns.message.make_query(query_name, dns.rdatatype.A, use_edns=0, payload=4096)
-                request.flags |= dns.flags.DO # DNSSEC OK
-                
-                response = dns.query.udp(request, nameserver, timeout=4.0)
-                
-                # Look in Authority section for NSEC
-                nsec_found = False
-                for rrset in response.authority:
-                    if rrset.rdtype == dns.rdatatype.NSEC:
-                        nsec_record = rrset[0]
-                        next_name = nsec_record.next.to_text()
-                        
-                        # Check if we wrapped around or found new
-                        if next_name in found_subdomains or next_name == domain:
-                            return self._format_results(found_subdomains, domain)
-                        
-                        found_subdomains.add(next_name)
-                        current_name = next_name
-                        nsec_found = True
-                        log.info(f"[green]+[/] NSEC Walk: Found {next_name}")
-                        break
-                
-                if not nsec_found:
-                    break
-                    
-        except Exception as e:
-            log.debug(f"NSEC walk interrupted: {e}")
-
-        return self._format_results(found_subdomains, domain)
-
-    def _format_results(self, subdomains, domain) -> List[Dict[str, Any]]:
-        return [{"name": sub, "type": "NSEC_WALKED", "value": "N/A"} for sub in subdomains]
\ No newline at end of file
+import asyncio
+import bisect
+import dns.query
+import dns.rdatatype
+import dns.name
+import dns.message
+import dns.exception
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, AsyncIterator, Sequence
+from output.logger import log
+from utils.ratelimit import RateLimiter
+from utils.metrics import Metrics
+from core.xfr import XFRStream, Change, stream_changes
+from core.transport import HedgedPool
+from core.records import Record
+
+class AttackStrategy(ABC):
+    @abstractmethod
+    def execute(self, domain: str, nameserver: str) -> List[Record]:
+        pass
+
+    @abstractmethod
+    async def execute_async(self, domain: str, nameserver: str) -> List[Record]:
+        """Non-blocking variant of execute() for use on the event loop."""
+        pass
+
+class AXFRStrategy(AttackStrategy):
+    def __init__(self):
+        self.complete = False # stream() reached the closing SOA
+        self.serial = None
+
+    def execute(self, domain: str, nameserver: str) -> List[Record]:
+        RateLimiter.acquire_sync(nameserver)
+        results = []
+        try:
+            log.info(f"[cyan]➜[/] Attempting AXFR on {nameserver}...")
+            results = [record for op, record in stream_changes(domain, nameserver) if op == "add"]
+            log.info(f"[bold green]✓[/] AXFR Successful! retrieved {len(results)} records.")
+        except Exception as e:
+            Metrics.error(nameserver, e)
+            log.debug(f"AXFR failed on {nameserver}: {e}")
+        return results
+
+    async def execute_async(self, domain: str, nameserver: str) -> List[Record]:
+        results = []
+        async for batch in self.stream(domain, nameserver):
+            results.extend(batch)
+        return results
+
+    async def stream(self, domain: str, nameserver: str) -> AsyncIterator[List[Record]]:
+        """Yields one batch of records per XFR message while the transfer is running."""
+        await RateLimiter.acquire(nameserver)
+        total = 0
+        try:
+            log.info(f"[cyan]➜[/] Attempting AXFR on {nameserver}...")
+            xfr = XFRStream(domain, nameserver)
+            async for batch in xfr.records():
+                total += len(batch)
+                yield batch
+            self.complete, self.serial = True, xfr.state.end_serial
+            log.info(f"[bold green]✓[/] AXFR Successful! retrieved {total} records.")
+        except Exception as e:
+            Metrics.error(nameserver, e)
+            log.debug(f"AXFR failed on {nameserver} after {total} records: {e}")
+
+class IXFRStrategy(AttackStrategy):
+    def __init__(self, current_serial: int):
+        self.serial = current_serial
+        self.complete = False
+        self.incremental = False # the server sent a diff rather than the whole zone
+        self.end_serial = None
+
+    def execute(self, domain: str, nameserver: str) -> List[Record]:
+        RateLimiter.acquire_sync(nameserver)
+        results = []
+        if not self.serial:
+            return []
+            
+        try:
+            log.info(f"[cyan]➜[/] Attempting IXFR on {nameserver} (Serial: {self.serial})...")
+            results = [record for op, record in stream_changes(domain, nameserver, self.serial) if op == "add"]
+            log.info("[bold green]✓[/] IXFR Successful!")
+        except Exception as e:
+            Metrics.error(nameserver, e)
+            log.debug(f"IXFR failed on {nameserver}: {e}")
+        return results
+
+    async def execute_async(self, domain: str, nameserver: str) -> List[Record]:
+        results = []
+        async for batch in self.stream(domain, nameserver):
+            results.extend(batch)
+        return results
+
+    async def stream(self, domain: str, nameserver: str) -> AsyncIterator[List[Record]]:
+        """Yields one batch of records per XFR message while the transfer is running."""
+        async for changes in self.changes(domain, nameserver):
+            batch = [record for op, record in changes if op == "add"]
+            if batch:
+                yield batch
+
+    async def changes(self, domain: str, nameserver: str) -> AsyncIterator[List[Change]]:
+        """Yields the ("add" | "delete", record) changes carried by each XFR message."""
+        await RateLimiter.acquire(nameserver)
+        if not self.serial:
+            return
+
+        try:
+            log.info(f"[cyan]➜[/] Attempting IXFR on {nameserver} (Serial: {self.serial})...")
+            xfr = XFRStream(domain, nameserver, self.serial)
+            async for changes in xfr.changes():
+                yield changes
+            self.complete = True
+            self.incremental = xfr.state.incremental
+            self.end_serial = xfr.state.end_serial
+            log.info("[bold green]✓[/] IXFR Successful!")
+        except Exception as e:
+            Metrics.error(nameserver, e)
+            log.debug(f"IXFR failed on {nameserver}: {e}")
+
+class NSECWalkStrategy(AttackStrategy):
+    """
+    Walks the NSEC chain in concurrent segments started across the label space, splitting
+    the gaps that prove large; slow queries are hedged to the zone's other nameservers.
+    """
+    # Sorted by byte value, which is the canonical DNS order for hostname labels
+    ALPHABET = "-0123456789abcdefghijklmnopqrstuvwxyz"
+    SPLIT_HOPS = 8 # hops a segment makes before its gap counts as large enough to split
+
+    def __init__(self, concurrency: int = 32, timeout: float = 4.0, retries: int = 2,
+                 alternates: Sequence[str] = ()):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.alternates = alternates
+
+    def execute(self, domain: str, nameserver: str) -> List[Record]:
+        log.info(f"[cyan]➜[/] Attempting NSEC Zone Walking on {nameserver}...")
+        origin = dns.name.from_text(domain)
+        chain = {}
+        visited = set()
+        # Start at root
+        current = dns.name.from_text("00-nonexistent", origin)
+
+        try:
+            while current is not None and current not in visited:
+                visited.add(current)
+                RateLimiter.acquire_sync(nameserver)
+                response = dns.query.udp(self._make_request(current), nameserver, timeout=self.timeout)
+                current = None
+                for owner, next_name in self._links(response, origin):
+                    if owner not in chain:
+                        chain[owner] = next_name
+                        log.info(f"[green]+[/] NSEC Walk: Found {next_name}")
+                    # Loop closed once the next owner has been seen already
+                    if next_name not in chain:
+                        current = next_name
+        except Exception as e:
+            Metrics.error(nameserver, e)
+            log.debug(f"NSEC walk interrupted: {e}")
+
+        return self._format_results(chain, origin)
+
+    async def execute_async(self, domain: str, nameserver: str) -> List[Record]:
+        log.info(f"[cyan]➜[/] Attempting segmented NSEC Zone Walking on {nameserver}...")
+        origin = dns.name.from_text(domain)
+        chain = {}
+        owners = [] # chain keys in canonical order, for finding gaps
+        queued = set()
+        queue = asyncio.Queue()
+
+        def enqueue(name: dns.name.Name, hops: int):
+            if name not in queued and name not in chain:
+                queued.add(name)
+                queue.put_nowait((name, hops))
+
+        for seed in self._seeds(origin):
+            enqueue(seed, 0)
+
+        busy = 0 # workers with a query in flight
+
+        async def worker(pool: HedgedPool):
+            nonlocal busy
+            while True:
+                name, hops = await queue.get()
+                busy += 1
+                try:
+                    response = await pool.query(self._make_request(name), self.timeout, self.retries)
+                    for owner, next_name in self._links(response, origin):
+                        if owner not in chain:
+                            chain[owner] = next_name
+                            bisect.insort(owners, owner)
+                            log.debug(f"NSEC Walk: {owner} -> {next_name}")
+                        # A segment that has not run into a known owner for a while is in a
+                        # large gap; split it, but only for a worker that would otherwise sit idle
+                        probe = None
+                        if hops + 1 >= self.SPLIT_HOPS and queue.qsize() + busy <= self.concurrency:
+                            probe = self._split(next_name, owners, origin)
+                        # Segments join where the next owner is already known
+                        enqueue(next_name, 0 if probe else hops + 1)
+                        if probe:
+                            enqueue(probe, 0)
+                except Exception as e:
+                    Metrics.error(nameserver, e)
+                    log.debug(f"NSEC query for {name} failed on {nameserver}: {e}")
+                finally:
+                    busy -= 1
+                    queue.task_done()
+
+        servers = [nameserver] + [ns for ns in self.alternates if ns != nameserver]
+        async with HedgedPool(servers) as pool:
+            workers = [asyncio.create_task(worker(pool)) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        if chain:
+            log.info(f"[bold green]✓[/] NSEC Walk mapped {len(chain)} owners on {nameserver}")
+        return self._format_results(chain, origin)
+
+    def _seeds(self, origin: dns.name.Name) -> List[dns.name.Name]:
+        """Synthesized names spread evenly over the label space, one per segment."""
+        labels = [a + b for a in self.ALPHABET[1:] for b in self.ALPHABET]
+        step = max(1, len(labels) // self.concurrency)
+        seeds = ["00-nonexistent"] + labels[::step]
+        return [dns.name.from_text(label, origin) for label in seeds]
+
+    def _split(self, start: dns.name.Name, owners: List[dns.name.Name], origin: dns.name.Name) -> Optional[dns.name.Name]:
+        """A synthesized name half-way between start and the next known owner, if one fits."""
+        i = bisect.bisect_right(owners, start)
+        end = owners[i] if i < len(owners) else None
+        depth = len(origin)
+        if len(start) <= depth or (end is not None and len(end) <= depth):
+            return None
+
+        # Only the label right below the origin is split; deeper names stay sequential
+        low = self._label_digits(start[-depth - 1])
+        high = self._label_digits(end[-depth - 1]) if end is not None else [len(self.ALPHABET)] * 4
+        base = len(self.ALPHABET)
+        width = max(len(low), len(high)) + 1
+        while width <= 63:
+            lo = self._digits_value(low, width, base)
+            hi = self._digits_value(high, width, base)
+            mid = (lo + hi) // 2
+            if mid > lo:
+                break
+            width += 1
+        else:
+            return None
+
+        digits = []
+        for _ in range(width):
+            mid, digit = divmod(mid, base)
+            digits.append(self.ALPHABET[digit])
+        label = "".join(reversed(digits)).rstrip("-") or "-"
+        probe = dns.name.from_text(label, origin)
+        if start < probe and (end is None or probe < end):
+            return probe
+        return None
+
+    def _label_digits(self, label: bytes) -> List[int]:
+        # Map every byte to the closest alphabet position at or below it
+        text = label.decode("ascii", "replace").lower()
+        return [max(0, bisect.bisect_right(self.ALPHABET, c) - 1) for c in text]
+
+    def _digits_value(self, digits: List[int], width: int, base: int) -> int:
+        value = 0
+        for digit in (digits + [0] * width)[:width]:
+            value = value * base + digit
+        return value
+
+    def _make_request(self, name: dns.name.Name) -> dns.message.Message:
+        # Asking for the NSEC type returns the record at a known owner directly,
+        # and an NXDOMAIN proof with the covering NSEC for a synthesized name
+        # DO is an EDNS flag; OR-ing it into the header flags would set QR instead
+        return dns.message.make_query(name, dns.rdatatype.NSEC, use_edns=0, payload=4096, want_dnssec=True)
+
+    def _links(self, response: dns.message.Message, origin: dns.name.Name) -> List[tuple]:
+        """Every (owner, next) pair proved by NSEC records anywhere in the response."""
+        links = []
+        for rrset in response.answer + response.authority:
+            if rrset.rdtype != dns.rdatatype.NSEC or not rrset.name.is_subdomain(origin):
+                continue
+            for rdata in rrset:
+                next_name = rdata.next
+                # Skip minimally-covering "white lies" (\000.owner), which never end
+                if not next_name.is_subdomain(origin) or next_name[0].startswith(b"\x00"):
+                    continue
+                links.append((rrset.name, next_name))
+        return links
+
+    def _format_results(self, chain: Dict[dns.name.Name, dns.name.Name], origin: dns.name.Name) -> List[Record]:
+        names = (set(chain) | set(chain.values())) - {origin}
+        return [Record(sub.to_text(), "NSEC_WALKED", "N/A") for sub in sorted(names)]
@@ -0,0 +1,419 @@
+import asyncio
+import copy
+import random
+import socket
+import struct
+import dns.exception
+import dns.message
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack, nullcontext
+from typing import Awaitable, Dict, Callable, List, Optional, Sequence, Set, Tuple, Union
+from output.logger import log
+from utils.ratelimit import RateLimiter
+from utils.metrics import Metrics
+from core.rtt import RTTTracker
+from core.socks import Proxy, open_connection
+
+class DNSChannel(ABC):
+    """
+    Many in-flight queries to one nameserver over one socket. Responses are matched
+    back to their query by message ID and question; subclasses provide the transport.
+    """
+    def __init__(self, nameserver: str, port: int = 53, rtt_key: Optional[str] = None):
+        self.nameserver = nameserver
+        self.port = port
+        self.rtt = RTTTracker.get(rtt_key or nameserver)
+        self._pending: Dict[int, tuple] = {}
+        self._late: Dict[int, float] = {} # message ID -> send time of first attempts a hedge won
+
+    async def query(self, request: dns.message.Message, timeout: float = 3.0, retries: int = 1) -> dns.message.Message:
+        """Sends request (re-sending on loss) and returns the matching response."""
+        def match(data):
+            try:
+                response = dns.message.from_wire(data)
+            except dns.exception.DNSException:
+                return None # Garbage or truncated datagram
+            return response if request.is_response(response) else None
+
+        request.id = self._free_id()
+        return await self._exchange(request.id, request.to_wire(), match, timeout, retries)
+
+    async def query_raw(self, question: bytes, flags: int = 0, timeout: float = 3.0, retries: int = 1) -> bytes:
+        """
+        Fast path for bulk work: question is the wire-format QNAME/QTYPE/QCLASS (lowercase)
+        and the raw response is returned unparsed, so callers can skip parsing negative answers.
+        """
+        def match(data):
+            return data if data[12:12 + len(question)].lower() == question else None
+
+        qid = self._free_id()
+        wire = struct.pack("!HHHHHH", qid, flags, 1, 0, 0, 0) + question
+        return await self._exchange(qid, wire, match, timeout, retries)
+
+    @abstractmethod
+    async def _exchange(self, qid: int, wire: bytes, match: Callable, timeout: float, retries: int):
+        pass
+
+    async def _attempt(self, qid: int, match: Callable, send: Callable[[], None], size: int, attempt: int,
+                       timeout: float, last: bool, flush: Optional[Callable[[], Awaitable]] = None):
+        """
+        One send of a query and the wait for its answer. Returns None when it timed out
+        and may be retried; the last attempt raises Timeout instead.
+        """
+        loop = asyncio.get_running_loop()
+        # A plain timer is much cheaper than wait_for() at tens of thousands of queries/sec
+        future = loop.create_future()
+        self._pending[qid] = (match, future)
+        wait = self.rtt.timeout(attempt, timeout)
+        timer = loop.call_later(wait, self._expire, future)
+        send()
+        sent = loop.time()
+        if Metrics.enabled:
+            Metrics.sent(self.nameserver, size)
+        try:
+            if flush:
+                await flush()
+            result = await future
+            if attempt == 0:
+                # Karn: a reply after a resend may answer either send, so it is not sampled
+                self.rtt.observe(loop.time() - sent)
+            if Metrics.enabled:
+                Metrics.dns_response(self.nameserver, loop.time() - sent, result)
+            return result
+        except asyncio.TimeoutError:
+            self.rtt.backoff()
+            Metrics.timeout(self.nameserver)
+            if last:
+                raise dns.exception.Timeout(timeout=wait)
+            return None
+        except asyncio.CancelledError:
+            if attempt == 0:
+                self._linger(loop, qid, sent)
+            raise
+        finally:
+            timer.cancel()
+
+    def _deliver(self, data: bytes):
+        if len(data) < 12:
+            return
+        qid = struct.unpack_from("!H", data)[0]
+        entry = self._pending.get(qid)
+        if entry is None:
+            sent = self._late.pop(qid, None)
+            if sent is not None:
+                # Sampling only the answers that beat the hedge would shrink the p95 until
+                # almost every query is hedged, so the slow ones still count
+                self.rtt.observe(asyncio.get_running_loop().time() - sent)
+            return # Late answer to a query we already gave up on
+        match, future = entry
+        if not future.done():
+            result = match(data)
+            if result is not None:
+                future.set_result(result)
+
+    def _linger(self, loop: asyncio.AbstractEventLoop, qid: int, sent: float):
+        """Keeps listening for the answer to a first attempt a hedge won, for its RTT only."""
+        self._late[qid] = sent
+        loop.call_later(self.rtt.max_rto, self._late.pop, qid, None)
+
+    def _fail_pending(self, exc: BaseException, ids=None):
+        for qid in list(self._pending if ids is None else ids):
+            entry = self._pending.get(qid)
+            if entry and not entry[1].done():
+                entry[1].set_exception(exc)
+
+    @staticmethod
+    def _expire(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    def _free_id(self) -> int:
+        if len(self._pending) >= 65536:
+            raise dns.exception.DNSException("all 65536 message IDs are in flight")
+        while True:
+            qid = random.getrandbits(16)
+            if qid not in self._pending and qid not in self._late:
+                return qid
+
+class UDPChannel(DNSChannel, asyncio.DatagramProtocol):
+    """One connected UDP socket to one nameserver, shared by many in-flight queries."""
+    def __init__(self, nameserver: str, port: int = 53):
+        super().__init__(nameserver, port)
+        self.transport = None
+
+    async def __aenter__(self) -> "UDPChannel":
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, remote_addr=(self.nameserver, self.port))
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        for _, future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        self._late.clear()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self._deliver(data)
+
+    def error_received(self, exc):
+        log.debug(f"UDP error from {self.nameserver}: {exc}")
+
+    async def _exchange(self, qid: int, wire: bytes, match: Callable, timeout: float, retries: int):
+        """
+        timeout only applies until the server's RTT is known; after that every attempt
+        waits for its retransmission timeout, doubled per retry.
+        """
+        try:
+            for attempt in range(retries + 1):
+                await RateLimiter.acquire(self.nameserver)
+                result = await self._attempt(qid, match, lambda: self.transport.sendto(wire), len(wire),
+                                             attempt, timeout, attempt == retries)
+                if result is not None:
+                    return result
+        finally:
+            self._pending.pop(qid, None)
+
+class TCPChannel(DNSChannel):
+    """
+    One DNS-over-TCP connection to one nameserver, direct or through a SOCKS5 proxy.
+    Queries are pipelined (RFC 7766): each is written as soon as it is made and answers
+    are matched in whatever order the server sends them. The connection is opened on
+    first use and opened again whenever the server closes it.
+    """
+    def __init__(self, nameserver: str, port: int = 53, proxy: Optional[Proxy] = None, max_inflight: int = 100):
+        # Timings differ from UDP's, but not between proxies of the same pool
+        super().__init__(nameserver, port, rtt_key=f"tcp:{nameserver}")
+        self.proxy = proxy
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._lock = asyncio.Lock()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._ids: Set[int] = set() # queries written to the current connection
+        self._readers: Set[asyncio.Task] = set()
+
+    def close(self):
+        if self._writer:
+            # Closing completes on the channel's event loop, which may never run again
+            sock = self._writer.get_extra_info("socket")
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass # Already disconnected
+            self._writer.close()
+            self._writer = None
+        for task in self._readers:
+            task.cancel()
+        self._fail_pending(ConnectionResetError(f"connection to {self.nameserver} closed"))
+        self._late.clear()
+
+    async def _connect(self, timeout: float) -> Tuple[asyncio.StreamWriter, Set[int]]:
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, writer = await open_connection(self.nameserver, self.port, self.proxy, timeout)
+                self._writer, self._ids = writer, set()
+                task = asyncio.ensure_future(self._read(reader, writer, self._ids))
+                self._readers.add(task)
+                task.add_done_callback(self._readers.discard)
+            return self._writer, self._ids
+
+    async def _read(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, ids: Set[int]):
+        try:
+            while True:
+                (length,) = struct.unpack("!H", await reader.readexactly(2))
+                self._deliver(await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, OSError) as e:
+            log.debug(f"TCP connection to {self.nameserver} closed: {e}")
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            # Whatever was still waiting on this connection is sent again on a new one
+            self._fail_pending(ConnectionResetError(f"{self.nameserver} closed the connection"), ids)
+
+    async def _exchange(self, qid: int, wire: bytes, match: Callable, timeout: float, retries: int):
+        """Like UDPChannel._exchange(); a lost connection also counts as a failed attempt."""
+        frame = struct.pack("!H", len(wire)) + wire
+        async with self._slots:
+            try:
+                for attempt in range(retries + 1):
+                    await RateLimiter.acquire(self.nameserver)
+                    try:
+                        writer, ids = await self._connect(timeout)
+                    except (OSError, asyncio.TimeoutError) as e:
+                        Metrics.error(self.nameserver, e)
+                        if attempt == retries:
+                            raise
+                        continue
+                    ids.add(qid)
+                    try:
+                        result = await self._attempt(qid, match, lambda: writer.write(frame), len(frame),
+                                                     attempt, timeout, attempt == retries, writer.drain)
+                    except ConnectionError:
+                        if attempt == retries:
+                            raise
+                        continue
+                    finally:
+                        ids.discard(qid)
+                    if result is not None:
+                        return result
+            finally:
+                self._pending.pop(qid, None)
+
+class TCPPool:
+    """
+    Several pipelined TCP connections to one nameserver, spread over the SOCKS5 proxies.
+    Each query goes to the connection with the fewest answers outstanding.
+    """
+    def __init__(self, nameserver: str, proxies: Sequence[Optional[Proxy]] = (None,), size: int = 2, port: int = 53):
+        self.nameserver = nameserver
+        self.channels = [TCPChannel(nameserver, port, proxies[i % len(proxies)]) for i in range(size)]
+        self.rtt = self.channels[0].rtt
+
+    def _channel(self) -> TCPChannel:
+        return min(self.channels, key=lambda channel: len(channel._pending))
+
+    async def query(self, request: dns.message.Message, timeout: float = 3.0, retries: int = 1) -> dns.message.Message:
+        return await self._channel().query(request, timeout, retries)
+
+    async def query_raw(self, question: bytes, flags: int = 0, timeout: float = 3.0, retries: int = 1) -> bytes:
+        return await self._channel().query_raw(question, flags, timeout, retries)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+class Connections:
+    """
+    Process-wide DNS-over-TCP settings and the pools built from them, one per nameserver,
+    kept open for every stage of the scan. Off by default: queries then go over UDP.
+    """
+    enabled = False
+    proxies: List[Optional[Proxy]] = [None]
+    size = 2 # connections per nameserver and proxy
+    _pools: Dict[str, TCPPool] = {}
+    _loop = None
+    _turn = 0
+
+    @classmethod
+    def configure(cls, tcp: bool = False, proxies: Sequence[Proxy] = (), size: int = 2):
+        # SOCKS5 proxies carry TCP only, in practice
+        cls.enabled = tcp or bool(proxies)
+        cls.proxies = list(proxies) or [None]
+        cls.size = size
+        cls.close()
+
+    @classmethod
+    def get(cls, nameserver: str) -> TCPPool:
+        loop = asyncio.get_running_loop()
+        if loop is not cls._loop:
+            # Connections belong to the event loop that opened them. asyncio.run() closed them
+            # when it cancelled that loop's tasks; a loop left open still holds them
+            if cls._loop is not None and not cls._loop.is_closed():
+                cls.close()
+            cls._pools, cls._loop = {}, loop
+        pool = cls._pools.get(nameserver)
+        if pool is None:
+            # Each nameserver starts at a different proxy, so small pools still use them all
+            offset = len(cls._pools) % len(cls.proxies)
+            proxies = cls.proxies[offset:] + cls.proxies[:offset]
+            pool = cls._pools[nameserver] = TCPPool(nameserver, proxies, cls.size * len(proxies))
+        return pool
+
+    @classmethod
+    def proxy(cls) -> Optional[Proxy]:
+        """The next proxy in turn, for connections outside the pools such as zone transfers."""
+        cls._turn += 1
+        return cls.proxies[cls._turn % len(cls.proxies)]
+
+    @classmethod
+    def close(cls):
+        for pool in cls._pools.values():
+            pool.close()
+        cls._pools = {}
+
+def open_channel(nameserver: str):
+    """
+    Async context manager giving a channel to nameserver: a UDPChannel of its own, or
+    the shared TCP pool (left open on exit) when DNS goes over TCP.
+    """
+    if Connections.enabled:
+        return nullcontext(Connections.get(nameserver))
+    return UDPChannel(nameserver)
+
+class HedgedPool:
+    """
+    Channels to several authoritative servers of the same zone. A query goes to one
+    server first; if that server has not answered within its p95 RTT, the same query is
+    also sent to the next fastest one and whichever answer arrives first is used.
+    """
+    def __init__(self, nameservers: List[str]):
+        self.nameservers = nameservers
+        self.channels: List[Union[DNSChannel, TCPPool]] = []
+        self._stack = AsyncExitStack()
+
+    async def __aenter__(self) -> "HedgedPool":
+        for ns in self.nameservers:
+            self.channels.append(await self._stack.enter_async_context(open_channel(ns)))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._stack.aclose()
+        self.channels = []
+
+    async def query(self, request: dns.message.Message, timeout: float = 3.0, retries: int = 1,
+                    primary: int = 0) -> dns.message.Message:
+        """DNSChannel.query() starting at channels[primary]."""
+        first = self.channels[primary % len(self.channels)]
+        # Each channel gives the request its own message ID, so the hedge sends a copy
+        return await self._hedged(
+            lambda channel: channel.query(request if channel is first else copy.copy(request), timeout, retries),
+            first, timeout
+        )
+
+    async def query_raw(self, question: bytes, flags: int = 0, timeout: float = 3.0, retries: int = 1,
+                        primary: int = 0) -> bytes:
+        """DNSChannel.query_raw() starting at channels[primary]."""
+        return await self._hedged(lambda channel: channel.query_raw(question, flags, timeout, retries),
+                                  self.channels[primary % len(self.channels)], timeout)
+
+    def _backup(self, first):
+        others = [channel for channel in self.channels if channel is not first]
+        if not others:
+            return None
+        # Servers not measured yet sort last, so hedges go where answers are known to be quick
+        return min(others, key=lambda channel: channel.rtt.srtt if channel.rtt.srtt is not None else float("inf"))
+
+    async def _hedged(self, send: Callable, first, timeout: float):
+        backup = self._backup(first)
+        if backup is None:
+            return await send(first)
+
+        primary = asyncio.ensure_future(send(first))
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=first.rtt.hedge_delay(timeout))
+            if done and not primary.exception():
+                return primary.result()
+
+            Metrics.hedged(backup.nameserver)
+            attempts.add(asyncio.ensure_future(send(backup)))
+            while True:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception():
+                        return task.result()
+                if not attempts:
+                    return task.result() # Both failed: raise the last error
+        finally:
+            for task in attempts:
+                task.cancel()
@@ -0,0 +1,182 @@
+import asyncio
+import struct
+import time
+import dns.exception
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdatatype
+import dns.xfr
+import dns.zone
+from typing import List, Tuple, Optional, AsyncIterator, Iterator
+from core.records import Record
+from utils.metrics import Metrics
+from core.rtt import RTTTracker
+from core.socks import open_connection
+from core.transport import Connections
+
+# A change is ("add" | "delete", record)
+Change = Tuple[str, Record]
+
+class XFRState:
+    """
+    Incremental AXFR/IXFR parser. Messages are fed one at a time and turned into
+    record changes straight away, so nothing larger than a single message is held.
+    """
+    def __init__(self, domain: str, serial: Optional[int] = None):
+        self.domain = domain
+        self.serial = serial
+        self.rdtype = dns.rdatatype.AXFR if serial is None else dns.rdatatype.IXFR
+        self.end_serial = None
+        self.incremental = False
+        self.done = False
+        self._op = "add"
+        self._seen = 0
+
+    def feed(self, message: dns.message.Message) -> List[Change]:
+        if message.rcode() != dns.rcode.NOERROR:
+            raise dns.exception.DNSException(f"transfer refused ({dns.rcode.to_text(message.rcode())})")
+        changes = []
+        for rrset in message.answer:
+            for rdata in rrset:
+                if self.done:
+                    raise dns.exception.FormError("records after end of transfer")
+                change = self._next(rrset, rdata)
+                if change:
+                    changes.append(change)
+        return changes
+
+    def _next(self, rrset, rdata) -> Optional[Change]:
+        self._seen += 1
+        is_soa = rrset.rdtype == dns.rdatatype.SOA
+
+        # First RR is always the SOA of the version being transferred
+        if self._seen == 1:
+            if not is_soa:
+                raise dns.exception.FormError("transfer does not start with SOA")
+            self.end_serial = rdata.serial
+            if self.rdtype == dns.rdatatype.IXFR and self.end_serial == self.serial:
+                self.done = True # Already up to date
+                return None
+            return ("add", self._record(rrset, rdata))
+
+        # Second RR decides between AXFR-style and incremental IXFR
+        if self._seen == 2 and is_soa and self.rdtype == dns.rdatatype.IXFR:
+            if rdata.serial == self.end_serial:
+                self.done = True # Already up to date
+                return None
+            self.incremental = True
+            self._op = "delete"
+            return ("delete", self._record(rrset, rdata))
+
+        if not self.incremental:
+            if is_soa:
+                self.done = True
+                return None
+            return ("add", self._record(rrset, rdata))
+
+        # Incremental: SOA(old) deletions... SOA(new) additions... repeated
+        if is_soa:
+            if self._op == "delete":
+                self._op = "add"
+            elif rdata.serial == self.end_serial:
+                self.done = True
+                return None
+            else:
+                self._op = "delete"
+        return (self._op, self._record(rrset, rdata))
+
+    def _record(self, rrset, rdata) -> Record:
+        return Record(str(rrset.name) + "." + self.domain, dns.rdatatype.to_text(rrset.rdtype), str(rdata))
+
+def _make_query(domain: str, serial: Optional[int]) -> dns.message.Message:
+    # The empty zone only supplies the origin; serial=None forces AXFR
+    query, _ = dns.xfr.make_query(dns.zone.Zone(domain), serial=serial)
+    return query
+
+def stream_changes(domain: str, nameserver: str, serial: Optional[int] = None,
+                   lifetime: float = 10.0, port: int = 53) -> Iterator[Change]:
+    """Blocking generator over the changes of a transfer (AXFR unless serial is given)."""
+    state = XFRState(domain, serial)
+    for message in dns.query.xfr(nameserver, domain, rdtype=state.rdtype,
+                                 serial=serial or 0, lifetime=lifetime, port=port,
+                                 relativize=True):
+        yield from state.feed(message)
+        if state.done:
+            return
+
+class XFRStream:
+    """
+    Async iterator over an AXFR/IXFR. Every TCP message is parsed and handed out as soon
+    as it arrives, so memory is bounded by the message size, not the zone size.
+
+    Instead of a fixed lifetime, which cuts off large zones, the transfer fails when the
+    server goes quiet: each read may take four retransmission timeouts of that server
+    (at least MIN_IDLE seconds). lifetime optionally caps the whole transfer as well.
+    """
+    MIN_IDLE = 2.0
+    CONNECT_TIMEOUT = 10.0 # a SOCKS5 hop takes a few round trips more than a direct connect
+
+    def __init__(self, domain: str, nameserver: str, serial: Optional[int] = None,
+                 lifetime: Optional[float] = None, port: int = 53, idle: Optional[float] = None):
+        self.domain = domain
+        self.nameserver = nameserver
+        self.serial = serial
+        self.lifetime = lifetime
+        self.port = port
+        # Until the server's RTT is known this is 10s, the old fixed lifetime
+        self.idle = idle or max(self.MIN_IDLE, RTTTracker.get(nameserver).timeout(2, 10.0))
+        self.state = None
+
+    async def changes(self) -> AsyncIterator[List[Change]]:
+        """Yields the changes carried by each message of the transfer."""
+        query = _make_query(self.domain, self.serial)
+        self.state = XFRState(self.domain, self.serial)
+        origin = dns.name.from_text(self.domain)
+        expiration = time.monotonic() + self.lifetime if self.lifetime else float("inf")
+
+        # Through the next SOCKS5 proxy when any are configured
+        reader, writer = await open_connection(self.nameserver, self.port, Connections.proxy(),
+                                               min(self.CONNECT_TIMEOUT, expiration - time.monotonic()))
+        try:
+            wire = query.to_wire()
+            writer.write(struct.pack("!H", len(wire)) + wire)
+            Metrics.sent(self.nameserver, len(wire) + 2)
+            sent = time.monotonic()
+            tsig_ctx = None
+            while not self.state.done:
+                (length,) = struct.unpack("!H", await self._read_exactly(reader, 2, expiration))
+                message = dns.message.from_wire(
+                    await self._read_exactly(reader, length, expiration),
+                    xfr=True, origin=origin, tsig_ctx=tsig_ctx, multi=True,
+                    one_rr_per_rrset=True
+                )
+                tsig_ctx = message.tsig_ctx
+                # Every message counts as a response; only the first one has a meaningful RTT
+                Metrics.dns_response(self.nameserver, time.monotonic() - sent if sent else None, message)
+                sent = None
+                yield self.state.feed(message)
+        finally:
+            writer.close()
+
+    async def records(self) -> AsyncIterator[List[Record]]:
+        """Yields the records added by each message, for callers that only want the zone contents."""
+        async for changes in self.changes():
+            batch = [record for op, record in changes if op == "add"]
+            if batch:
+                yield batch
+
+    async def _read_exactly(self, reader: asyncio.StreamReader, count: int, expiration: float) -> bytes:
+        try:
+            return await asyncio.wait_for(reader.readexactly(count), self._timeout(expiration))
+        except asyncio.TimeoutError:
+            raise dns.exception.Timeout
+        except asyncio.IncompleteReadError:
+            raise EOFError("EOF")
+
+    def _timeout(self, expiration: float) -> float:
+        remaining = expiration - time.monotonic()
+        if remaining <= 0:
+            raise dns.exception.Timeout
+        return min(remaining, self.idle)
@@ -1,219 +1,618 @@
-import argparse
-import sys
-import asyncio
-from rich.console import Console
-from rich.live import Live
-from rich.table import Table
-from rich.layout import Layout
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
-
-# Import Modules
-from utils.banner import show_banner
-from output.logger import setup_logger, log
-from core.resolver_wrapper import ResolverWrapper
-from core.enumerator import NSEnumerator
-from core.strategies import AXFRStrategy, IXFRStrategy, NSECWalkStrategy
-from core.snooper import CacheSnooper
-from recon.passive import CertificateTransparency
-from recon.cloud import CloudHunter
-from analysis.intel import IntelAnalyzer
-from analysis.visualizer import TopologyVisualizer
-from output.exporter import Exporter
-
-console = Console()
-
-class ScanContext:
-    def __init__(self):
-        self.found_records = []
-        self.vulns = []
-        self.nameservers = []
-        self.status_msg = "Initializing..."
-
-def generate_layout(ctx: ScanContext) -> Layout:
-    """Generates the Dashboard UI"""
-    layout = Layout()
-    layout.split_column(
-        Layout(name="upper", size=3),
-        Layout(name="middle"),
-        Layout(name="lower", size=10)
-    )
-
-    # Header
-    layout["upper"].update(Panel(f"[bold cyan]Target Domain: {ctx.domain if hasattr(ctx, 'domain') else '...'} [/] | [bold yellow]Status: {ctx.status_msg}[/]", border_style="blue"))
-
-    # Stats Table
-    stats_table = Table(show_header=True, header_style="bold magenta", expand=True)
-    stats_table.add_column("Metric", style="white")
-    stats_table.add_column("Count", style="green")
-    
-    stats_table.add_row("Name Servers Found", str(len(ctx.nameservers)))
-    stats_table.add_row("Total Records", str(len(ctx.found_records)))
-    stats_table.add_row("Vulnerabilities", f"[red]{len(ctx.vulns)}[/]")
-
-    layout["middle"].update(Panel(stats_table, title="Live Statistics", border_style="green"))
-
-    # Recent Findings (Tail)
-    log_text = ""
-    if ctx.found_records:
-        recent = ctx.found_records[-5:]
-        for r in recent:
-            log_text += f"[grey70]{r['type']} -> {r['name']}[/]\n"
-    
-    layout["lower"].update(Panel(log_text, title="Recent Findings", border_style="white"))
-    
-    return layout
-
-async def run_scan(args):
-    # Setup
-    show_banner()
-    ctx = ScanContext()
-    ctx.domain = args.domain
-    setup_logger("ERROR") # Silence standard logs to keep Dashboard clean
-    
-    # Resolver
-    resolver_wrapper = ResolverWrapper(args.proxy)
-    resolver = resolver_wrapper.get_resolver()
-
-    with Live(generate_layout(ctx), refresh_per_second=4, console=console) as live:
-        
-        # 1. Passive Recon
-        if args.passive:
-            ctx.status_msg = "Running Passive OSINT (crt.sh)..."
-            live.update(generate_layout(ctx))
-            ct = CertificateTransparency(args.domain)
-            ct_subs = await ct.run()
-            for sub in ct_subs:
-                ctx.found_records.append({"name": sub, "type": "OSINT", "value": "crt.sh"})
-            await asyncio.sleep(0.5)
-
-        # 2. Enumeration
-        ctx.status_msg = "Enumerating Name Servers..."
-        live.update(generate_layout(ctx))
-        enumerator = NSEnumerator(args.domain, resolver)
-        ctx.nameservers = enumerator.get_nameservers()
-        
-        if not ctx.nameservers:
-            ctx.status_msg = "[Red]Failed: No NS Found[/]"
-            return
-
-        # 3. Active Attacks
-        ctx.status_msg = "Engaging Active Strategies (AXFR/IXFR/NSEC)..."
-        live.update(generate_layout(ctx))
-
-        zone_records = []
-        snoop_findings = []
-
-        for ns in ctx.nameservers:
-            ctx.status_msg = f"Attacking Name Server: {ns}"
-            live.update(generate_layout(ctx))
-            
-            # Snooping
-            if args.snoop:
-                snooper = CacheSnooper(ns)
-                findings = snooper.run()
-                for f in findings:
-                    ctx.vulns.append(f)
-                    snoop_findings.append(f)
-
-            # Strategies
-            axfr = AXFRStrategy()
-            records = axfr.execute(args.domain, ns)
-            
-            if not records:
-                serial = enumerator.get_soa_serial(ns)
-                if serial:
-                    ixfr = IXFRStrategy(serial)
-                    records = ixfr.execute(args.domain, ns)
-            
-            if not records and args.walk:
-                walker = NSECWalkStrategy()
-                records = walker.execute(args.domain, ns)
-
-            if records:
-                zone_records.extend(records)
-                ctx.found_records.extend(records)
-                # Quick flash of success
-                ctx.status_msg = f"[Green]Zone Dumped from {ns}![/]"
-                live.update(generate_layout(ctx))
-                await asyncio.sleep(1)
-                break 
-
-        # 4. Analysis
-        ctx.status_msg = "Running Post-Exploitation Analysis..."
-        live.update(generate_layout(ctx))
-
-        # Deduplicate
-        unique = [dict(t) for t in {tuple(d.items()) for d in ctx.found_records}]
-        ctx.found_records = unique
-
-        # Cloud Hunt
-        if args.cloud:
-            ctx.status_msg = "Hunting for Subdomain Takeovers..."
-            live.update(generate_layout(ctx))
-            hunter = CloudHunter(unique)
-            cloud_vulns = await hunter.check()
-            ctx.vulns.extend(cloud_vulns)
-
-        # Intel
-        analyzer = IntelAnalyzer(unique)
-        intel_vulns = analyzer.run()
-        ctx.vulns.extend(intel_vulns)
-
-        ctx.status_msg = "Finalizing Report..."
-        live.update(generate_layout(ctx))
-        await asyncio.sleep(1)
-
-    # --- End Live Mode, Print Final Summary ---
-    
-    console.print("\n[bold green]SCAN COMPLETE[/]")
-    
-    # 1. Scorecard
-    if ctx.vulns:
-        table = Table(title="[bold red]VULNERABILITY REPORT[/]", show_lines=True)
-        table.add_column("Severity", style="bold red")
-        table.add_column("Details", style="white")
-        for v in ctx.vulns:
-            color = "red" if v['severity'] in ["CRITICAL", "HIGH"] else "yellow"
-            table.add_row(f"[{color}]{v['severity']}[/{color}]", v['msg'])
-        console.print(table)
-    else:
-        console.print(Panel("[green]System Clean: No obvious vulnerabilities found.[/]", title="Security Status"))
-
-    # 2. Export
-    exporter = Exporter(args.output, args.domain)
-    exporter.to_json(ctx.found_records)
-    exporter.to_csv(ctx.found_records)
-
-    # 3. Graph
-    if args.graph and ctx.found_records:
-        viz = TopologyVisualizer(ctx.found_records, args.domain)
-        viz.generate(f"{args.output}/{args.domain}.dot")
-
-def main():
-    parser = argparse.ArgumentParser(description="ZoneXplorer v4 Ultimate")
-    parser.add_argument("-d", "--domain", required=True, help="Target Domain")
-    parser.add_argument("-o", "--output", default="results", help="Output Folder")
-    parser.add_argument("--proxy", help="SOCKS5 (IP:PORT)")
-    
-    # Features
-    parser.add_argument("--passive", action="store_true", help="OSINT via CRT.sh")
-    parser.add_argument("--walk", action="store_true", help="NSEC Walking")
-    parser.add_argument("--snoop", action="store_true", help="DNS Cache Snooping")
-    parser.add_argument("--cloud", action="store_true", help="Cloud Takeover Hunt")
-    parser.add_argument("--graph", action="store_true", help="Generate Network Graph")
-    parser.add_argument("--all", action="store_true", help="Enable ALL features")
-
-    args = parser.parse_args()
-    
-    # Helper for lazy hackers
-    if args.all:
-        args.passive = args.walk = args.snoop = args.cloud = args.graph = True
-
-    try:
-        asyncio.run(run_scan(args))
-    except KeyboardInterrupt:
-        console.print("[bold red]\nScan Aborted by User[/]")
-
-if __name__ == "__main__":
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import asyncio
+from collections import deque
+from contextlib import nullcontext, contextmanager, asynccontextmanager, ExitStack
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich.markup import escape
+
+# Import Modules
+from utils.banner import show_banner
+from output.logger import setup_logger, log
+from utils.ratelimit import RateLimiter
+from utils.metrics import Metrics
+from core.resolver_wrapper import ResolverWrapper
+from core.socks import Proxy
+from core.transport import Connections
+from core.enumerator import NSEnumerator
+from core.engine import StrategyEngine, NameServerSlots
+from core.snooper import CacheSnooper
+from core.nsec3 import NSEC3Collector
+from core.bruteforce import BruteForcer
+from core.jobs import JobQueue
+from core.monitor import Monitor, NotifyListener, ChangeEvent
+from recon.passive import CertificateTransparency, DEFAULT_CACHE_DIR
+from recon.cloud import CloudHunter
+from recon.signatures import load_signatures, DEFAULT_SIGNATURES
+from analysis.intel import IntelAnalyzer, load_config, DEFAULT_CONFIG
+from analysis.visualizer import TopologyVisualizer, GRAPH_FORMATS, GRAPH_SUFFIXES, AGGREGATIONS
+from analysis.nsec3_cracker import NSEC3Cracker
+from output.exporter import Exporter, STREAM_FORMATS, zstandard
+from output.store import ScanStore
+from core.records import Record, RecordSet
+
+console = Console()
+
+class ScanContext:
+    def __init__(self):
+        self.found_records = RecordSet()
+        self.vulns = []
+        self.nameservers = []
+        self.ns_info = []
+        self.winner = None
+        self.nsec3 = None
+        self.streams = []
+        self.recent = deque(maxlen=5) # ring buffer of the latest findings, for the dashboard
+        self.status_msg = "Initializing..."
+        self.progress = None # optional callable with a live detail for the current stage
+
+    def add_records(self, records):
+        """Deduplicates incoming records and streams the new ones straight to disk."""
+        new = self.found_records.extend(records)
+        self.recent.extend(new[-self.recent.maxlen:])
+        for stream in self.streams:
+            stream.write(new)
+
+async def scan_domain(ctx: ScanContext, args, resolver, ns_slots: NameServerSlots = None, store: ScanStore = None):
+    """Runs the passive, active and analysis stages for ctx.domain. Display is left to whoever watches ctx."""
+    # 1. Passive Recon
+    if args.passive:
+        ctx.status_msg = "Running Passive OSINT (crt.sh)..."
+        with Metrics.phase("passive"):
+            ct = CertificateTransparency(ctx.domain, cache_dir=args.ct_cache or None, ttl=args.ct_ttl * 3600,
+                                         fixture_dir=args.ct_fixture)
+            ct_subs = await ct.run()
+        ctx.add_records(Record(sub, "OSINT", "crt.sh") for sub in ct_subs)
+
+    # 2. Enumeration
+    ctx.status_msg = "Enumerating Name Servers..."
+    with Metrics.phase("discover"):
+        enumerator = NSEnumerator(ctx.domain, resolver)
+        ctx.ns_info = await enumerator.discover()
+    ctx.nameservers = [ip for info in ctx.ns_info for ip in info.ips]
+
+    if not ctx.nameservers:
+        ctx.status_msg = "[Red]Failed: No NS Found[/]"
+        return False
+
+    # 3. Active Attacks
+    ctx.status_msg = "Engaging Active Strategies (AXFR/IXFR/NSEC)..."
+
+    # Snooping
+    if args.snoop:
+        ctx.status_msg = "Cache Snooping all Name Servers..."
+
+        targets = CacheSnooper.load_targets(args.snoop_list) if args.snoop_list else None
+
+        async def snoop(ns):
+            snooper = CacheSnooper(ns, targets, concurrency=args.snoop_concurrency)
+            async with ns_slots(ns) if ns_slots else nullcontext():
+                if args.snoop_rounds > 1:
+                    return await snooper.sample(args.snoop_rounds, args.snoop_interval)
+                return await snooper.run_async()
+
+        with Metrics.phase("snoop"):
+            for findings in await asyncio.gather(*(snoop(ns) for ns in ctx.nameservers)):
+                ctx.vulns.extend(findings)
+
+    # Strategies (raced against every NS at once)
+    ctx.status_msg = f"Attacking {len(ctx.nameservers)} Name Servers in parallel..."
+    engine = StrategyEngine(
+        ctx.domain, ctx.nameservers,
+        serials={ip: serial for info in ctx.ns_info for ip, serial in info.serials.items()},
+        walk=args.walk, deadline=args.deadline, on_records=ctx.add_records, ns_slots=ns_slots,
+        walk_concurrency=args.walk_concurrency, store=store
+    )
+    with Metrics.phase("strategies"):
+        ctx.winner, _ = await engine.run()
+
+    if ctx.winner:
+        ctx.status_msg = f"[Green]Zone Dumped from {ctx.winner}![/]"
+
+    # NSEC3 zones cannot be walked: harvest the hashed chain from the fastest NS instead
+    if args.nsec3 and not ctx.winner:
+        ctx.status_msg = "Harvesting NSEC3 hashes..."
+        timed = sorted((rtt, ip) for info in ctx.ns_info for ip, rtt in info.rtts.items())
+        target = timed[0][1] if timed else ctx.nameservers[0]
+        with Metrics.phase("nsec3"):
+            async with ns_slots(target) if ns_slots else nullcontext():
+                collector = NSEC3Collector(ctx.domain, target, args.walk_concurrency, alternates=ctx.nameservers)
+                ctx.nsec3 = await collector.run(args.nsec3_coverage)
+
+        if ctx.nsec3 and args.wordlist:
+            ctx.status_msg = f"Cracking {len(ctx.nsec3.links)} NSEC3 hashes..."
+            cracker = NSEC3Cracker(ctx.nsec3, ctx.domain)
+            with Metrics.phase("crack"):
+                cracked = await asyncio.to_thread(cracker.crack, args.wordlist, args.permute, args.crack_procs)
+            ctx.add_records(cracked)
+
+    # Nothing dumped: guess names against the authoritative servers
+    if args.brute and not ctx.winner:
+        brute = BruteForcer(ctx.domain, ctx.nameservers, args.brute, concurrency=args.brute_concurrency,
+                            on_records=ctx.add_records)
+        ctx.status_msg = "Brute forcing"
+        ctx.progress = lambda: f"{brute.stats.sent} sent, {brute.stats.found} found, {brute.stats.qps:.0f} q/s"
+        try:
+            with Metrics.phase("brute"):
+                await brute.run()
+        finally:
+            ctx.progress = None
+
+    # 4. Analysis
+    ctx.status_msg = "Running Post-Exploitation Analysis..."
+
+    # Cloud Hunt
+    if args.cloud:
+        ctx.status_msg = "Hunting for Subdomain Takeovers..."
+        hunter = CloudHunter(ctx.found_records, concurrency=args.cloud_concurrency,
+                             signatures=load_signatures(args.signatures), resolver=resolver)
+        with Metrics.phase("cloud"):
+            cloud_vulns = await hunter.check()
+        ctx.vulns.extend(cloud_vulns)
+
+    # Intel
+    with Metrics.phase("intel"):
+        analyzer = IntelAnalyzer(ctx.found_records, load_config(args.intel_config), domain=ctx.domain)
+        intel_vulns = analyzer.run()
+    ctx.vulns.extend(intel_vulns)
+    return True
+
+@contextmanager
+def record_streams(ctx: ScanContext, args):
+    """Opens the --stream outputs for ctx.domain; leaving the block finalises them."""
+    with ExitStack() as stack:
+        exporter = Exporter(args.output, ctx.domain)
+        ctx.streams = [stack.enter_context(exporter.stream(fmt)) for fmt in args.stream]
+        yield
+
+@asynccontextmanager
+async def metrics_export(args):
+    """Collects metrics for the block when any --metrics-* output is requested, and writes them on exit."""
+    if not (args.metrics_json or args.metrics_prom or args.metrics_port):
+        yield
+        return
+    Metrics.configure(True)
+    server = await Metrics.serve("127.0.0.1", args.metrics_port) if args.metrics_port else None
+    try:
+        yield
+    finally:
+        if server:
+            server.close()
+        if args.metrics_json:
+            Metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            Metrics.write_prometheus(args.metrics_prom)
+
+def warn_unproxied(args):
+    if args.proxy and (args.passive or args.cloud):
+        log.warning("[yellow]![/] Only DNS goes through --proxy; crt.sh and takeover HTTP checks connect directly")
+
+def export_results(ctx: ScanContext, args):
+    exporter = Exporter(args.output, ctx.domain)
+    if not args.stream:
+        # Streamed scans already have their records on disk
+        exporter.to_json(ctx.found_records)
+        exporter.to_csv(ctx.found_records)
+    if ctx.nsec3:
+        exporter.to_nsec3(ctx.nsec3)
+
+    if args.graph and ctx.found_records:
+        signatures = load_signatures(args.signatures) if "provider" in args.graph_aggregate else None
+        viz = TopologyVisualizer(ctx.found_records, ctx.domain, fmt=args.graph_format,
+                                 aggregate=args.graph_aggregate, signatures=signatures)
+        viz.generate(f"{args.output}/{ctx.domain}.{GRAPH_SUFFIXES[args.graph_format]}")
+
+async def run_scan(args):
+    # Setup
+    show_banner()
+    ctx = ScanContext()
+    ctx.domain = args.domain
+    if args.headless:
+        setup_logger("INFO") # Plain log lines instead of the dashboard
+        display = nullcontext()
+    else:
+        setup_logger("ERROR") # Silence standard logs to keep Dashboard clean
+        from output.dashboard import Dashboard # rich.live is only loaded when it is shown
+        display = Dashboard(ctx, console, fps=args.fps)
+
+    # Resolver
+    resolver_wrapper = ResolverWrapper(args.resolver)
+    resolver = resolver_wrapper.get_resolver()
+    warn_unproxied(args)
+
+    store = ScanStore(args.store) if args.store else None
+    async with metrics_export(args):
+        try:
+            async with display:
+                with record_streams(ctx, args):
+                    if not await scan_domain(ctx, args, resolver, store=store):
+                        return ctx
+        finally:
+            Connections.close()
+            if store:
+                store.close()
+
+        # --- End Live Mode, Print Final Summary ---
+
+        console.print("\n[bold green]SCAN COMPLETE[/]")
+
+        # 1. Scorecard
+        if ctx.vulns:
+            table = Table(title="[bold red]VULNERABILITY REPORT[/]", show_lines=True)
+            table.add_column("Severity", style="bold red")
+            table.add_column("Details", style="white")
+            for v in ctx.vulns:
+                color = "red" if v['severity'] in ["CRITICAL", "HIGH"] else "yellow"
+                table.add_row(f"[{color}]{v['severity']}[/{color}]", v['msg'])
+            console.print(table)
+        else:
+            console.print(Panel("[green]System Clean: No obvious vulnerabilities found.[/]", title="Security Status"))
+
+        # 2. Export & 3. Graph
+        with Metrics.phase("export"):
+            export_results(ctx, args)
+    return ctx
+
+def read_domains(source: str):
+    """Yields target domains from a file, or stdin when source is '-'."""
+    handle = sys.stdin if source == "-" else open(source)
+    seen = set()
+    try:
+        for line in handle:
+            domain = line.strip().rstrip(".").lower()
+            if domain and not domain.startswith("#") and domain not in seen:
+                seen.add(domain)
+                yield domain
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+async def scan_one(domain: str, args, resolver, ns_slots: NameServerSlots, store: ScanStore = None):
+    """Scans and exports one domain of a batch; returns its context and summary row."""
+    ctx = ScanContext()
+    ctx.domain = domain
+    start = time.monotonic()
+    try:
+        with record_streams(ctx, args):
+            ok = await scan_domain(ctx, args, resolver, ns_slots=ns_slots, store=store)
+        with Metrics.phase("export"):
+            export_results(ctx, args)
+        status = f"dumped from {ctx.winner}" if ctx.winner else ("no NS" if not ok else "no transfer")
+    except Exception as e:
+        status = f"error: {e}"
+    row = {
+        "domain": domain,
+        "status": status,
+        "nameservers": len(ctx.nameservers),
+        "records": len(ctx.found_records),
+        "vulns": len(ctx.vulns),
+        "seconds": round(time.monotonic() - start, 2)
+    }
+    return ctx, row
+
+def print_domain(row: dict):
+    console.print(f"[blue]*[/] {row['domain']}: {row['status']} ({row['records']} records, {row['vulns']} vulns)")
+
+async def run_batch(args):
+    """Scans every domain from --input-list in one event loop with bounded concurrency."""
+    show_banner()
+    setup_logger("WARNING")
+    resolver = ResolverWrapper(args.resolver).get_resolver()
+    warn_unproxied(args)
+    ns_slots = NameServerSlots(args.per_ns)
+    store = ScanStore(args.store) if args.store else None
+    domains = read_domains(args.input_list)
+    summary = []
+    started = time.monotonic()
+
+    async def worker():
+        # Workers share one iterator, so at most --concurrency domains are in flight
+        for domain in domains:
+            _, row = await scan_one(domain, args, resolver, ns_slots, store)
+            summary.append(row)
+            print_domain(row)
+
+    try:
+        async with metrics_export(args):
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        Connections.close()
+        if store:
+            store.close()
+    batch_summary(args, summary, time.monotonic() - started)
+
+async def run_worker(args, worker: str):
+    """
+    Scans domains from the --queue job queue until it is empty, --concurrency at a time.
+    Any number of workers, in other processes or on other machines, can share one queue.
+    """
+    queue = JobQueue(args.queue)
+    resolver = ResolverWrapper(args.resolver).get_resolver()
+    ns_slots = NameServerSlots(args.per_ns)
+    store = ScanStore(args.store) if args.store else None
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(queue.lease / 4)
+            queue.heartbeat(worker)
+
+    async def consume():
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                # Jobs other workers are running may still come back to the queue
+                if not queue.remaining():
+                    return
+                await asyncio.sleep(1.0)
+                continue
+            ctx, row = await scan_one(job.domain, args, resolver, ns_slots, store)
+            if row["status"].startswith("error"):
+                queue.fail(job, worker, row)
+            else:
+                queue.complete(job, worker, row, ctx.found_records)
+
+    beat = asyncio.ensure_future(heartbeat())
+    try:
+        await asyncio.gather(*(consume() for _ in range(args.concurrency)))
+    finally:
+        beat.cancel()
+        queue.release(worker)
+        queue.close()
+        Connections.close()
+        if store:
+            store.close()
+
+def worker_process(args, worker: str):
+    """Entry point of a spawned worker process: one event loop, so one core, per worker."""
+    configure(args)
+    setup_logger("WARNING")
+    try:
+        asyncio.run(run_worker(args, worker))
+    except KeyboardInterrupt:
+        pass
+
+def run_fleet(args):
+    """
+    Coordinator: queues the --input-list domains, starts --workers worker processes and
+    streams what they finish into one merged output (<output>/fleet.<fmt>) until the
+    queue is empty. Workers started elsewhere with --worker on the same --queue help out.
+    """
+    show_banner()
+    setup_logger("WARNING")
+    warn_unproxied(args)
+    queue = JobQueue(args.queue)
+    added = queue.add(read_domains(args.input_list))
+    console.print(f"[blue]*[/] {added} new domains queued in {args.queue}, {queue.remaining()} to scan")
+
+    mp = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    workers = [mp.Process(target=worker_process, args=(args, f"{host}:{os.getpid()}:{i}"), daemon=True)
+               for i in range(args.workers)]
+    for process in workers:
+        process.start()
+
+    summary = []
+    started = time.monotonic()
+    exporter = Exporter(args.output, "fleet")
+    seq = 0
+    try:
+        with ExitStack() as stack:
+            streams = [stack.enter_context(exporter.stream(fmt)) for fmt in args.stream or ["ndjson"]]
+            while True:
+                remaining = queue.remaining()
+                for seq, job_id, row in queue.finished(seq):
+                    for batch in queue.records(job_id):
+                        for stream in streams:
+                            stream.write(batch)
+                    summary.append(row)
+                    print_domain(row)
+                if not remaining:
+                    break
+                if workers and not any(process.is_alive() for process in workers):
+                    console.print(f"[yellow]![/] All workers exited with {remaining} domains left in {args.queue}")
+                    break
+                time.sleep(0.5)
+    finally:
+        for process in workers:
+            process.join()
+        queue.close()
+    batch_summary(args, summary, time.monotonic() - started)
+
+def batch_summary(args, summary: list, elapsed: float):
+    table = Table(title=f"[bold green]BATCH COMPLETE[/] ({len(summary)} domains in {elapsed:.1f}s)")
+    table.add_column("Metric", style="white")
+    table.add_column("Count", style="green")
+    table.add_row("Domains Scanned", str(len(summary)))
+    table.add_row("Zones Dumped", str(sum(1 for row in summary if row["status"].startswith("dumped"))))
+    table.add_row("Errors", str(sum(1 for row in summary if row["status"].startswith("error"))))
+    table.add_row("Total Records", str(sum(row["records"] for row in summary)))
+    table.add_row("Vulnerabilities", f"[red]{sum(row['vulns'] for row in summary)}[/]")
+    console.print(table)
+
+    Exporter(args.output, "batch_summary").to_json(summary)
+
+async def run_monitor(args):
+    """
+    Watches the -d / --input-list domains until interrupted, with one SOA query per zone
+    per refresh interval, and appends every record change to <output>/changes.ndjson.
+    """
+    show_banner()
+    setup_logger("WARNING" if args.input_list else "INFO")
+    resolver = ResolverWrapper(args.resolver).get_resolver()
+    domains = list(read_domains(args.input_list)) if args.input_list else [args.domain.rstrip(".").lower()]
+    os.makedirs(args.output, exist_ok=True)
+    store = ScanStore(args.store or os.path.join(args.output, "monitor.db"))
+    path = os.path.join(args.output, "changes.ndjson")
+    console.print(f"[blue]*[/] Monitoring {len(domains)} domains, changes go to {path}")
+
+    with open(path, "a") as changes:
+        def on_event(event: ChangeEvent):
+            changes.write(json.dumps(event.to_dict()) + "\n")
+            changes.flush()
+            if event.op == "serial":
+                console.print(f"[yellow]~[/] {event.domain} is now at serial {event.serial} (no transfer allowed)")
+            else:
+                mark = "[green]+[/]" if event.op == "add" else "[red]-[/]"
+                record = event.record
+                console.print(f"{mark} {escape(record.name)} {record.type} {escape(record.value)} (serial {event.serial})")
+
+        monitor = Monitor(domains, resolver, store, on_event, concurrency=args.concurrency,
+                          max_refresh=args.max_refresh)
+        listener = await NotifyListener.start(monitor, "0.0.0.0", args.notify_port) if args.notify_port else None
+        try:
+            async with metrics_export(args):
+                await monitor.run()
+        finally:
+            if listener:
+                listener.close()
+            Connections.close()
+            store.close()
+
+def stream_formats(value: str):
+    formats = [f for f in value.split(",") if f]
+    unknown = [f for f in formats if f not in STREAM_FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown format {', '.join(unknown)} (choose from {', '.join(STREAM_FORMATS)})")
+    if zstandard is None and any(f.endswith(".zst") for f in formats):
+        raise argparse.ArgumentTypeError("zstd output needs the 'zstandard' package (pip install zstandard)")
+    return formats
+
+def graph_aggregations(value: str):
+    modes = [m for m in value.split(",") if m]
+    unknown = [m for m in modes if m not in AGGREGATIONS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown aggregation {', '.join(unknown)} (choose from {', '.join(AGGREGATIONS)})")
+    return modes
+
+def proxy_list(value: str):
+    try:
+        return [Proxy.parse(p) for p in value.split(",") if p]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="ZoneXplorer v4 Ultimate")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("-d", "--domain", help="Target Domain")
+    target.add_argument("-iL", "--input-list", help="File with one domain per line ('-' for stdin)")
+    target.add_argument("--worker", action="store_true", help="Only scan domains taken from --queue (extra processes or machines)")
+    parser.add_argument("-o", "--output", default="results", help="Output Folder")
+    parser.add_argument("--stream", type=stream_formats, default=[],
+                        help=f"Write records while scanning, comma-separated: {', '.join(STREAM_FORMATS)}")
+    parser.add_argument("--headless", action="store_true", help="No dashboard: plain log output, for CI and scripts")
+    parser.add_argument("--fps", type=float, default=4.0, help="Dashboard frames per second")
+    parser.add_argument("--metrics-json", help="Write per-NS/per-phase query metrics and phase timings to this JSON file")
+    parser.add_argument("--metrics-prom", help="Write the same metrics in Prometheus text format to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT while scanning")
+    parser.add_argument("--proxy", type=proxy_list, default=[],
+                        help="SOCKS5 proxies for all DNS traffic, comma-separated [USER:PASS@]HOST:PORT (implies --tcp)")
+    parser.add_argument("--tcp", action="store_true", help="Send queries over persistent, pipelined TCP connections")
+    parser.add_argument("--tcp-connections", type=int, default=2, help="TCP connections per Name Server (and per proxy)")
+    parser.add_argument("--resolver", type=lambda v: [ip for ip in v.split(",") if ip],
+                        help="Recursive resolver IPs to use instead of /etc/resolv.conf, comma-separated")
+    parser.add_argument("--store", help="SQLite file of transferred zones; re-scans only fetch what changed")
+    parser.add_argument("--deadline", type=float, default=60.0, help="Total time budget for active strategies (seconds)")
+    
+    # Rate limiting
+    parser.add_argument("--rate", type=float, help="Max queries/sec to any single Name Server or HTTP host")
+    parser.add_argument("--global-rate", type=float, help="Max queries/sec across all targets")
+    parser.add_argument("--stealth", action="store_true", help="Slow, jittered per-target pacing (1 q/s + up to 1.5s jitter)")
+
+    # Batch
+    parser.add_argument("--concurrency", type=int, default=20, help="Domains scanned at once in batch mode")
+    parser.add_argument("--per-ns", type=int, default=4, help="Concurrent scans allowed against one Name Server")
+    parser.add_argument("--workers", type=int,
+                        help="Scan --input-list with this many worker processes (default: one per core; 0 = remote workers only)")
+    parser.add_argument("--queue", help="SQLite job queue shared by the workers (default: <output>/jobs.db)")
+
+    # Monitoring
+    parser.add_argument("--monitor", action="store_true",
+                        help="Keep watching the domains; transfer only when the SOA serial changes (store: <output>/monitor.db)")
+    parser.add_argument("--notify-port", type=int, help="Also check a zone as soon as its NS sends a NOTIFY to this UDP port")
+    parser.add_argument("--max-refresh", type=float, default=3600.0, help="Check every zone at least this often (seconds)")
+
+    # Features
+    parser.add_argument("--passive", action="store_true", help="OSINT via CRT.sh")
+    parser.add_argument("--ct-cache", default=DEFAULT_CACHE_DIR, help="Directory for cached crt.sh results ('' to disable)")
+    parser.add_argument("--ct-ttl", type=float, default=24.0, help="Hours before cached crt.sh results are refreshed")
+    parser.add_argument("--ct-fixture", help="Replay crt.sh responses from this directory, recording any that are missing")
+    parser.add_argument("--walk", action="store_true", help="NSEC Walking")
+    parser.add_argument("--walk-concurrency", type=int, default=32, help="In-flight NSEC queries per Name Server")
+    parser.add_argument("--nsec3", action="store_true", help="NSEC3 hash harvesting")
+    parser.add_argument("--nsec3-coverage", type=float, default=0.95, help="Stop harvesting once this share of the chain is covered")
+    parser.add_argument("--wordlist", help="Wordlist for offline NSEC3 cracking")
+    parser.add_argument("--permute", action="store_true", help="Also try common suffixes on every word")
+    parser.add_argument("--crack-procs", type=int, help="Cracking processes (default: all cores)")
+    parser.add_argument("--brute", metavar="WORDLIST", help="Brute force subdomains from WORDLIST when no zone dump succeeds")
+    parser.add_argument("--brute-concurrency", type=int, default=1000, help="In-flight brute force queries")
+    parser.add_argument("--snoop", action="store_true", help="DNS Cache Snooping")
+    parser.add_argument("--snoop-list", help="File of names to snoop for (one per line)")
+    parser.add_argument("--snoop-concurrency", type=int, default=50, help="In-flight snoop probes per Name Server")
+    parser.add_argument("--snoop-rounds", type=int, default=1, help="Repeat the snoop to track TTL decay")
+    parser.add_argument("--snoop-interval", type=float, default=30.0, help="Seconds between snoop rounds")
+    parser.add_argument("--cloud", action="store_true", help="Cloud Takeover Hunt")
+    parser.add_argument("--cloud-concurrency", type=int, default=100, help="HTTP takeover checks in flight")
+    parser.add_argument("--signatures", default=DEFAULT_SIGNATURES, help="JSON file of takeover fingerprints")
+    parser.add_argument("--intel-config", default=DEFAULT_CONFIG, help="JSON file of intel rules, private ranges and keywords")
+    parser.add_argument("--graph", action="store_true", help="Generate Network Graph")
+    parser.add_argument("--graph-format", choices=GRAPH_FORMATS, default="dot", help="Graph file format")
+    parser.add_argument("--graph-aggregate", type=graph_aggregations, default=[],
+                        help="Collapse the graph: comma list of parent,network,provider")
+    parser.add_argument("--all", action="store_true", help="Enable ALL features")
+    return parser
+
+def configure(args):
+    """Process-wide settings; spawned worker processes apply them again."""
+    if args.stealth:
+        RateLimiter.configure(per_target=args.rate or 1.0, global_rate=args.global_rate, jitter=1.5)
+    else:
+        RateLimiter.configure(per_target=args.rate, global_rate=args.global_rate)
+    Connections.configure(tcp=args.tcp, proxies=args.proxy, size=args.tcp_connections)
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    # Helper for lazy hackers
+    if args.all:
+        args.passive = args.walk = args.nsec3 = args.snoop = args.cloud = args.graph = True
+
+    fleet = args.worker or args.workers is not None or args.queue is not None
+    if fleet and args.domain:
+        parser.error("--workers/--queue need -iL/--input-list")
+    if fleet and (args.metrics_json or args.metrics_prom or args.metrics_port):
+        parser.error("--metrics-* outputs are per process and not available with --workers/--worker")
+    if args.monitor and fleet:
+        parser.error("--monitor runs in one process and cannot be combined with --worker/--workers/--queue")
+    if args.worker and not args.queue:
+        parser.error("--worker needs --queue")
+    if fleet:
+        args.queue = args.queue or os.path.join(args.output, "jobs.db")
+        os.makedirs(os.path.dirname(args.queue) or ".", exist_ok=True)
+        if args.workers is None and args.input_list:
+            args.workers = os.cpu_count() or 1
+
+    configure(args)
+    try:
+        if args.worker:
+            show_banner()
+            setup_logger("WARNING")
+            asyncio.run(run_worker(args, f"{socket.gethostname()}:{os.getpid()}"))
+        elif fleet:
+            run_fleet(args)
+        elif args.monitor:
+            asyncio.run(run_monitor(args))
+        else:
+            asyncio.run(run_batch(args) if args.input_list else run_scan(args))
+    except KeyboardInterrupt:
+        console.print("[bold red]\nScan Aborted by User[/]")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
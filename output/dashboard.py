@@ -0,0 +1,80 @@
+import asyncio
+from rich.console import Console
+from rich.layout import Layout
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+
+class Dashboard:
+    """
+    Live view of a ScanContext, drawn by its own task at a fixed frame rate. The scan
+    never touches the display: each frame reads a few counters from the context and
+    only redraws when they changed, so rendering costs the same whatever the scan does.
+    """
+    def __init__(self, ctx, console: Console, fps: float = 4.0):
+        self.ctx = ctx
+        self.interval = 1.0 / fps
+        self.layout = Layout()
+        self.layout.split_column(
+            Layout(name="upper", size=3),
+            Layout(name="middle"),
+            Layout(name="lower", size=10)
+        )
+        self.live = Live(self.layout, console=console, auto_refresh=False)
+        self._task = None
+        self._shown = None
+
+    async def __aenter__(self) -> "Dashboard":
+        self._draw()
+        self.live.start(refresh=True)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.ctx.status_msg = "Finalizing Report..."
+        self._draw()
+        self.live.stop()
+
+    async def _run(self):
+        while True:
+            self._draw()
+            await asyncio.sleep(self.interval)
+
+    def _snapshot(self) -> tuple:
+        ctx = self.ctx
+        progress = ctx.progress() if ctx.progress else None
+        return (ctx.status_msg, progress, len(ctx.nameservers), len(ctx.found_records),
+                len(ctx.vulns), tuple(ctx.recent))
+
+    def _draw(self):
+        snapshot = self._snapshot()
+        if snapshot == self._shown:
+            return
+        self._shown = snapshot
+        status, progress, nameservers, records, vulns, recent = snapshot
+        if progress:
+            status = f"{status}: {progress}"
+
+        # Header
+        domain = getattr(self.ctx, "domain", None) or "..."
+        self.layout["upper"].update(Panel(f"[bold cyan]Target Domain: {domain} [/] | [bold yellow]Status: {status}[/]", border_style="blue"))
+
+        # Stats Table
+        stats_table = Table(show_header=True, header_style="bold magenta", expand=True)
+        stats_table.add_column("Metric", style="white")
+        stats_table.add_column("Count", style="green")
+        stats_table.add_row("Name Servers Found", str(nameservers))
+        stats_table.add_row("Total Records", str(records))
+        stats_table.add_row("Vulnerabilities", f"[red]{vulns}[/]")
+        self.layout["middle"].update(Panel(stats_table, title="Live Statistics", border_style="green"))
+
+        # Recent Findings (Tail)
+        log_text = "".join(f"[grey70]{r.type} -> {r.name}[/]\n" for r in recent)
+        self.layout["lower"].update(Panel(log_text, title="Recent Findings", border_style="white"))
+
+        self.live.refresh()
@@ -1,28 +1,130 @@
-import json
-import csv
-import os
-from typing import List, Dict, Any
-from output.logger import log
-
-class Exporter:
-    def __init__(self, output_dir: str, domain: str):
-        self.output_dir = output_dir
-        self.domain = domain
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-    def to_json(self, data: List[Dict[str, Any]]):
-        path = os.path.join(self.output_dir, f"{self.domain}.json")
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=4)
-        log.info(f"[blue]*[/] JSON saved to {path}")
-
-    def to_csv(self, data: List[Dict[str, Any]]):
-        if not data: return
-        path = os.path.join(self.output_dir, f"{self.domain}.csv")
-        keys = data[0].keys()
-        with open(path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(data)
-        log.info(f"[blue]*[/] CSV saved to {path}")
\ No newline at end of file
+import json
+import csv
+import gzip
+import io
+import os
+import time
+from typing import Dict, Any, Iterable, Union
+from output.logger import log
+from core.records import Record
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STREAM_FORMATS = ("ndjson", "csv", "ndjson.gz", "csv.gz", "ndjson.zst", "csv.zst")
+
+class RecordStream:
+    """
+    Appends records to an NDJSON or CSV file (optionally gzip/zstd compressed) while the
+    scan runs. Data goes to <path>.part, is flushed and fsynced at checkpoints so it can be
+    tailed and survives a crash, and is renamed to <path> when the stream is closed.
+    """
+    def __init__(self, path: str, checkpoint_records: int = 10000, checkpoint_interval: float = 5.0):
+        self.path = path
+        self.partial = path + ".part"
+        self.csv = ".csv" in os.path.basename(path)
+        self.checkpoint_records = checkpoint_records
+        self.checkpoint_interval = checkpoint_interval
+        self.written = 0
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+        self._raw = open(self.partial, "wb", buffering=1 << 20)
+        self._flush_mode = () # gzip's default flush is already a sync flush
+        if path.endswith(".gz"):
+            self._binary = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        elif path.endswith(".zst"):
+            if zstandard is None:
+                self._raw.close()
+                os.remove(self.partial)
+                raise ValueError("zstd output needs the 'zstandard' package (pip install zstandard)")
+            self._binary = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+            self._flush_mode = (zstandard.FLUSH_BLOCK,)
+        else:
+            self._binary = self._raw
+        self._text = io.TextIOWrapper(self._binary, encoding="utf-8", newline="")
+        if self.csv:
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(Record.FIELDS)
+
+    def __enter__(self) -> "RecordStream":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, records: Iterable[Record]):
+        count = 0
+        if self.csv:
+            for rec in records:
+                self._csv.writerow((rec.name, rec.type, rec.value))
+                count += 1
+        else:
+            lines = [json.dumps(rec.to_dict()) + "\n" for rec in records]
+            self._text.write("".join(lines))
+            count = len(lines)
+        self.written += count
+        self._pending += count
+        if self._pending >= self.checkpoint_records or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Pushes everything written so far to disk, readable by anyone tailing the file."""
+        self._text.flush()
+        if self._binary is not self._raw:
+            # Ends the current compressed block so a reader can decode up to here
+            self._binary.flush(*self._flush_mode)
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._pending = 0
+        self._last_checkpoint = time.monotonic()
+
+    def close(self):
+        if self._raw.closed:
+            return
+        self._text.flush()
+        self._text.detach()
+        if self._binary is not self._raw:
+            self._binary.close() # Writes the compression trailer; the file itself stays open
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self.partial, self.path)
+        log.info(f"[blue]*[/] {self.written} records streamed to {self.path}")
+
+class Exporter:
+    def __init__(self, output_dir: str, domain: str):
+        self.output_dir = output_dir
+        self.domain = domain
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+    def stream(self, fmt: str) -> RecordStream:
+        """Opens a RecordStream for <domain>.<fmt>, fmt being one of STREAM_FORMATS."""
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"unknown stream format '{fmt}' (choose from {', '.join(STREAM_FORMATS)})")
+        return RecordStream(os.path.join(self.output_dir, f"{self.domain}.{fmt}"))
+
+    def to_json(self, data: Iterable[Union[Record, Dict[str, Any]]]):
+        path = os.path.join(self.output_dir, f"{self.domain}.json")
+        with open(path, 'w') as f:
+            json.dump([rec.to_dict() if isinstance(rec, Record) else rec for rec in data], f, indent=4)
+        log.info(f"[blue]*[/] JSON saved to {path}")
+
+    def to_csv(self, data: Iterable[Record]):
+        if not data: return
+        path = os.path.join(self.output_dir, f"{self.domain}.csv")
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(Record.FIELDS)
+            writer.writerows((rec.name, rec.type, rec.value) for rec in data)
+        log.info(f"[blue]*[/] CSV saved to {path}")
+
+    def to_nsec3(self, chain):
+        """Writes harvested NSEC3 hashes in hashcat (mode 8300) format."""
+        path = os.path.join(self.output_dir, f"{self.domain}.nsec3")
+        with open(path, 'w') as f:
+            f.write("\n".join(chain.hashcat_lines(self.domain)) + "\n")
+        log.info(f"[blue]*[/] NSEC3 hashes saved to {path}")
\ No newline at end of file
@@ -0,0 +1,145 @@
+import sqlite3
+import time
+from typing import List, Iterator, Optional
+from output.logger import log
+from core.records import Record
+from core.xfr import Change
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS zones (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    nameserver TEXT NOT NULL,
+    serial INTEGER,
+    updated REAL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS zones_current ON zones (domain, nameserver) WHERE complete = 1;
+CREATE TABLE IF NOT EXISTS records (
+    zone_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (zone_id, name, type, value)
+);
+"""
+
+class ZoneWriter:
+    """
+    Writes one full zone copy as it streams in. The copy only replaces the stored
+    one on commit(), so an interrupted transfer never leaves a half-written zone.
+    """
+    def __init__(self, store: "ScanStore", domain: str, nameserver: str):
+        self.store = store
+        self.domain = domain
+        self.nameserver = nameserver
+        with store.db:
+            self.zone_id = store.db.execute(
+                "INSERT INTO zones (domain, nameserver, complete) VALUES (?, ?, 0)", (domain, nameserver)
+            ).lastrowid
+
+    def add(self, batch: List[Record]):
+        with self.store.db:
+            self.store.db.executemany(
+                "INSERT OR IGNORE INTO records (zone_id, name, type, value) VALUES (?, ?, ?, ?)",
+                ((self.zone_id, r.name, r.type, r.value) for r in batch)
+            )
+
+    def commit(self, serial: Optional[int]):
+        db = self.store.db
+        with db:
+            db.execute(
+                "DELETE FROM records WHERE zone_id IN "
+                "(SELECT id FROM zones WHERE domain = ? AND nameserver = ? AND complete = 1)",
+                (self.domain, self.nameserver)
+            )
+            db.execute("DELETE FROM zones WHERE domain = ? AND nameserver = ? AND complete = 1",
+                       (self.domain, self.nameserver))
+            db.execute("UPDATE zones SET serial = ?, updated = ?, complete = 1 WHERE id = ?",
+                       (serial, time.time(), self.zone_id))
+
+    def abort(self):
+        self.store._drop(self.zone_id)
+
+class ScanStore:
+    """
+    On-disk copy of every transferred zone, keyed by domain and nameserver, with the
+    SOA serial it was taken at. Re-scans use it to skip unchanged zones and to turn
+    changed ones into an IXFR from the stored serial instead of a full AXFR.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        # Copies left behind by a crashed run are never going to be committed
+        for (zone_id,) in self.db.execute("SELECT id FROM zones WHERE complete = 0").fetchall():
+            self._drop(zone_id)
+
+    def close(self):
+        self.db.close()
+
+    def serial(self, domain: str, nameserver: str) -> Optional[int]:
+        """Serial of the stored copy, or None if this NS was never transferred."""
+        row = self._zone(domain, nameserver)
+        return row[1] if row else None
+
+    def latest(self, domain: str) -> Optional[tuple]:
+        """(nameserver, serial) of the most recently updated copy of domain from any NS."""
+        return self.db.execute(
+            "SELECT nameserver, serial FROM zones WHERE domain = ? AND complete = 1 ORDER BY updated DESC LIMIT 1",
+            (domain,)
+        ).fetchone()
+
+    def records(self, domain: str, nameserver: str, batch_size: int = 1000) -> Iterator[List[Record]]:
+        """Yields the stored zone in batches, in the same format the transfers produce."""
+        row = self._zone(domain, nameserver)
+        if not row:
+            return
+        cursor = self.db.execute("SELECT name, type, value FROM records WHERE zone_id = ?", (row[0],))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [Record(name, rtype, value) for name, rtype, value in rows]
+
+    def writer(self, domain: str, nameserver: str) -> ZoneWriter:
+        return ZoneWriter(self, domain, nameserver)
+
+    def apply(self, domain: str, nameserver: str, serial: int, changes: List[Change]):
+        """Applies an IXFR diff, in order, to the stored copy and moves it to serial."""
+        row = self._zone(domain, nameserver)
+        if not row:
+            raise KeyError(f"no stored zone for {domain} on {nameserver}")
+        zone_id = row[0]
+        added = deleted = 0
+        with self.db:
+            for op, r in changes:
+                key = (zone_id, r.name, r.type, r.value)
+                if op == "add":
+                    added += self.db.execute(
+                        "INSERT OR IGNORE INTO records (zone_id, name, type, value) VALUES (?, ?, ?, ?)", key
+                    ).rowcount
+                else:
+                    deleted += self.db.execute(
+                        "DELETE FROM records WHERE zone_id = ? AND name = ? AND type = ? AND value = ?", key
+                    ).rowcount
+            self.db.execute("UPDATE zones SET serial = ?, updated = ? WHERE id = ?", (serial, time.time(), zone_id))
+        log.info(f"[bold green]✓[/] Stored copy of {domain} from {nameserver} updated to serial {serial} "
+                 f"(+{added} / -{deleted})")
+
+    def touch(self, domain: str, nameserver: str):
+        """Marks the stored copy as confirmed current."""
+        with self.db:
+            self.db.execute("UPDATE zones SET updated = ? WHERE domain = ? AND nameserver = ? AND complete = 1",
+                            (time.time(), domain, nameserver))
+
+    def _zone(self, domain: str, nameserver: str) -> Optional[tuple]:
+        return self.db.execute(
+            "SELECT id, serial FROM zones WHERE domain = ? AND nameserver = ? AND complete = 1",
+            (domain, nameserver)
+        ).fetchone()
+
+    def _drop(self, zone_id: int):
+        with self.db:
+            self.db.execute("DELETE FROM records WHERE zone_id = ?", (zone_id,))
+            self.db.execute("DELETE FROM zones WHERE id = ?", (zone_id,))
@@ -1,50 +1,150 @@
-import aiohttp
-import asyncio
-from typing import List, Dict, Any
-from output.logger import log
-
-class CloudHunter:
-    """
-    Checks CNAMEs against known cloud provider signatures for potential takeovers.
-    """
-    SIGNATURES = {
-        "s3.amazonaws.com": {"code": 404, "content": "NoSuchBucket"},
-        "blob.core.windows.net": {"code": 404, "content": "ResourceNotFound"},
-        "googleapis.com": {"code": 404, "content": "NoSuchBucket"},
-        "github.io": {"code": 404, "content": "There isn't a GitHub Pages site here"}
-    }
-
-    def __init__(self, records: List[Dict[str, Any]]):
-        self.records = records
-        self.vulns = []
-
-    async def check(self) -> List[Dict[str, str]]:
-        log.info("[cyan]➜[/] Hunting for Cloud Buckets & Takeovers...")
-        
-        tasks = []
-        for rec in self.records:
-            if rec['type'] == 'CNAME':
-                target = rec['value'].rstrip('.')
-                for provider, sig in self.SIGNATURES.items():
-                    if provider in target:
-                        tasks.append(self._verify_takeover(rec['name'], target, sig))
-        
-        if tasks:
-            await asyncio.gather(*tasks)
-        
-        return self.vulns
-
-    async def _verify_takeover(self, subdomain: str, cname: str, signature: dict):
-        # We try to access the subdomain via HTTP
-        url = f"http://{subdomain}"
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=5) as resp:
-                    text = await resp.text()
-                    # Check if the error code matches an unclaimed bucket
-                    if resp.status == signature['code'] and signature['content'] in text:
-                        msg = f"CONFIRMED TAKEOVER: {subdomain} -> {cname}"
-                        log.error(f"[bold red blink]!!![/] {msg}")
-                        self.vulns.append({"severity": "CRITICAL", "msg": msg})
-        except Exception:
-            pass # Connection errors are expected for some dead CNAMEs
\ No newline at end of file
+import aiohttp
+import asyncio
+import time
+import dns.asyncresolver
+import dns.resolver
+from typing import List, Dict, Iterable, Iterator, Optional
+from output.logger import log
+from utils.ratelimit import RateLimiter
+from utils.metrics import Metrics
+from core.records import Record
+from recon.signatures import Signature, Fingerprint, SignatureIndex, load_signatures
+
+class CloudHunter:
+    """
+    Checks CNAMEs against known cloud provider signatures for potential takeovers.
+    All checks share one pooled session; a fixed set of workers keeps the number of
+    open sockets bounded no matter how many CNAMEs there are.
+    """
+    def __init__(self, records: Iterable[Record], concurrency: int = 100, per_host: int = 8,
+                 max_body: int = 65536, timeout: float = 5.0, signatures: Optional[SignatureIndex] = None,
+                 resolver: Optional[dns.resolver.Resolver] = None):
+        self.records = records
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.max_body = max_body
+        self.timeout = timeout
+        self.signatures = signatures or load_signatures()
+        self.resolver = resolver
+        self.vulns = []
+        self._hosts = {}
+
+    async def check(self) -> List[Dict[str, str]]:
+        log.info("[cyan]➜[/] Hunting for Cloud Buckets & Takeovers...")
+
+        candidates = self._candidates()
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+            ssl=False, # Unclaimed endpoints serve the provider's certificate; SNI is still sent
+            enable_cleanup_closed=True
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout, connect=self.timeout)
+        resolver = self._async_resolver()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            # Workers share one iterator, so only `concurrency` checks are ever in flight
+            await asyncio.gather(*(self._worker(session, resolver, candidates) for _ in range(self.concurrency)))
+
+        return self.vulns
+
+    def _async_resolver(self) -> dns.asyncresolver.Resolver:
+        if not self.resolver:
+            return dns.asyncresolver.Resolver()
+        # Mirror the nameservers and timeouts of the configured sync resolver
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = self.resolver.nameservers
+        resolver.timeout = self.resolver.timeout
+        resolver.lifetime = self.resolver.lifetime
+        return resolver
+
+    def _candidates(self) -> Iterator[tuple]:
+        seen = set()
+        for rec in self.records:
+            if rec.type != 'CNAME':
+                continue
+            target = rec.value.rstrip('.')
+            for sig in self.signatures.match(target):
+                if (rec.name, sig.provider) not in seen:
+                    seen.add((rec.name, sig.provider))
+                    yield rec.name.rstrip('.'), target, sig
+
+    async def _worker(self, session: aiohttp.ClientSession, resolver: dns.asyncresolver.Resolver,
+                      candidates: Iterator[tuple]):
+        for subdomain, cname, signature in candidates:
+            # Many CNAMEs point at the same provider endpoint; don't hammer it
+            async with self._host_slot(cname):
+                await self._verify_takeover(session, resolver, subdomain, cname, signature)
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def _verify_takeover(self, session: aiohttp.ClientSession, resolver: dns.asyncresolver.Resolver,
+                               subdomain: str, cname: str, signature: Signature):
+        fingerprints = signature.fingerprints
+        if any(fp.nxdomain for fp in fingerprints):
+            dangling = await self._is_nxdomain(resolver, cname)
+            if dangling and any(fp.nxdomain and not fp.needs_http for fp in fingerprints):
+                return self._report(subdomain, cname, signature, "NXDOMAIN")
+            # Mixed fingerprints only apply while the target is dangling
+            fingerprints = [fp for fp in fingerprints if not fp.nxdomain or dangling]
+
+        http = [fp for fp in fingerprints if fp.needs_http]
+        if not http:
+            return
+        # Providers answer unclaimed names on either scheme, so try both
+        for scheme in ("http", "https"):
+            try:
+                await RateLimiter.acquire(subdomain)
+                if await self._matches(session, f"{scheme}://{subdomain}", http):
+                    return self._report(subdomain, cname, signature, scheme.upper())
+            except asyncio.TimeoutError:
+                Metrics.timeout(subdomain)
+            except Exception as e:
+                Metrics.error(subdomain, e) # Connection errors are expected for some dead CNAMEs
+
+    def _report(self, subdomain: str, cname: str, signature: Signature, evidence: str):
+        msg = f"CONFIRMED TAKEOVER: {subdomain} -> {cname} ({signature.provider}, {evidence})"
+        log.error(f"[bold red blink]!!![/] {msg}")
+        self.vulns.append({"severity": "CRITICAL", "msg": msg})
+
+    async def _is_nxdomain(self, resolver: dns.asyncresolver.Resolver, cname: str) -> bool:
+        try:
+            await resolver.resolve(cname, "A")
+        except dns.resolver.NXDOMAIN:
+            return True
+        except Exception as e:
+            Metrics.error(cname, e) # NODATA, timeouts: not proof that the target is gone
+        return False
+
+    async def _matches(self, session: aiohttp.ClientSession, url: str, fingerprints: List[Fingerprint]) -> bool:
+        """Reads at most max_body bytes, stopping as soon as a fingerprint's body shows up."""
+        host = url.split("://", 1)[1]
+        Metrics.sent(host)
+        started = time.monotonic()
+        read = 0
+        async with session.get(url) as resp:
+            rtt = time.monotonic() - started
+            try:
+                # Check if the status code and headers match an unclaimed resource
+                candidates = [fp for fp in fingerprints if fp.matches_head(resp.status, resp.headers)]
+                if not candidates:
+                    return False
+                if any(fp.body is None for fp in candidates):
+                    return True
+                needles = [fp.body.encode() for fp in candidates]
+                overlap = max(len(needle) for needle in needles) - 1
+                window = b""
+                async for chunk in resp.content.iter_any():
+                    # Keep the tail of the previous chunk so a split signature is still found
+                    window = (window[-overlap:] if overlap else b"") + chunk
+                    read += len(chunk)
+                    if any(needle in window for needle in needles):
+                        return True
+                    if read >= self.max_body:
+                        break
+                return False
+            finally:
+                Metrics.received(host, rtt, f"HTTP {resp.status}", read)
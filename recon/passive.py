@@ -1,32 +1,181 @@
-import aiohttp
-import asyncio
-from typing import List
-from output.logger import log
-
-class CertificateTransparency:
-    def __init__(self, domain: str):
-        self.domain = domain
-        self.url = f"https://crt.sh/?q=%.{domain}&output=json"
-
-    async def run(self) -> List[str]:
-        log.info(f"[cyan]➜[/] Querying CT Logs (crt.sh) for {self.domain}...")
-        subdomains = set()
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        for entry in data:
-                            name_value = entry['name_value']
-                            # Handle multi-line entries
-                            for sub in name_value.split('\n'):
-                                if "*" not in sub: # Ignore wildcards
-                                    subdomains.add(sub)
-                        log.info(f"[bold green]✓[/] CT Logs found {len(subdomains)} unique subdomains.")
-                    else:
-                        log.warning(f"[yellow]![/] CT Log query failed: {response.status}")
-        except Exception as e:
-            log.warning(f"[yellow]![/] CT Log error: {e}")
-            
-        return list(subdomains)
\ No newline at end of file
+import aiohttp
+import codecs
+import json
+import os
+import time
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Set
+from output.logger import log
+from utils.ratelimit import RateLimiter
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "zonexplorer", "ct")
+MAX_ELEMENT = 1 << 20 # characters one array element may span; crt.sh entries are well under 10 KB
+
+class JSONArrayStream:
+    """
+    Incremental parser for a top-level JSON array of objects. Text is fed in chunks of
+    any size and every complete element is yielded as soon as its closing brace arrives,
+    so only one element is ever buffered, and one longer than max_element is an error.
+    """
+    def __init__(self, max_element: int = MAX_ELEMENT):
+        self._decoder = json.JSONDecoder()
+        self.max_element = max_element
+        self._buffer = ""
+        self._started = False
+        self.finished = False
+
+    def feed(self, text: str) -> Iterator[Any]:
+        buf = self._buffer + text
+        pos = 0
+        while not self.finished:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not self._started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                self._started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                self.finished = True
+                pos += 1
+                break
+            try:
+                element, pos = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element continues in the next chunk, unless it is malformed and never will end
+                if len(buf) - pos > self.max_element:
+                    raise ValueError(f"JSON array element longer than {self.max_element} characters")
+                break
+            yield element
+        self._buffer = buf[pos:]
+
+    def close(self):
+        if not self.finished and (self._started or self._buffer.strip()):
+            raise ValueError("truncated JSON array")
+
+class CertificateTransparency:
+    """
+    Subdomains from crt.sh. The response is parsed as it downloads, and the names are
+    cached on disk: within the TTL the cache is used as is, and once it expires only
+    unexpired certificates are fetched and merged, since expired ones are already known.
+    """
+    def __init__(self, domain: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, ttl: float = 86400,
+                 fixture_dir: Optional[str] = None, chunk_size: int = 65536):
+        self.domain = domain.rstrip(".").lower()
+        self.url = f"https://crt.sh/?q=%.{self.domain}&output=json"
+        # Replays must not depend on what earlier runs left in the cache
+        self.cache_dir = None if fixture_dir else cache_dir
+        self.ttl = ttl
+        self.fixture_dir = fixture_dir
+        self.chunk_size = chunk_size
+
+    async def run(self) -> List[str]:
+        log.info(f"[cyan]➜[/] Querying CT Logs (crt.sh) for {self.domain}...")
+        cache = self._load_cache()
+        subdomains = set(cache["names"]) if cache else set()
+
+        if cache and time.time() - cache["fetched"] < self.ttl:
+            log.info(f"[bold green]✓[/] CT Logs cache hit: {len(subdomains)} unique subdomains.")
+            return sorted(subdomains)
+
+        url = self.url + "&exclude=expired" if cache else self.url
+        known = len(subdomains)
+        try:
+            await RateLimiter.acquire("crt.sh")
+            async for entry in self._entries(url):
+                self._collect(entry, subdomains)
+            log.info(f"[bold green]✓[/] CT Logs found {len(subdomains)} unique subdomains "
+                     f"({len(subdomains) - known} new).")
+            self._save_cache(subdomains)
+        except Exception as e:
+            log.warning(f"[yellow]![/] CT Log error: {e}")
+
+        return sorted(subdomains)
+
+    def _collect(self, entry: Dict[str, Any], subdomains: Set[str]):
+        # name_value holds one name per line
+        for sub in entry.get("name_value", "").split("\n"):
+            sub = sub.strip().rstrip(".").lower()
+            if "*" in sub: # Ignore wildcards
+                continue
+            if sub == self.domain or sub.endswith("." + self.domain):
+                subdomains.add(sub)
+
+    async def _entries(self, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """Certificate entries from the fixture when one exists, otherwise from crt.sh."""
+        fixture = self._fixture_path()
+        if fixture and os.path.exists(fixture):
+            log.debug(f"Replaying CT fixture {fixture}")
+            async for entry in self._parse(self._read_file(fixture)):
+                yield entry
+            return
+
+        # No total timeout: large organisations have bodies of hundreds of MB
+        timeout = aiohttp.ClientTimeout(total=None, connect=10, sock_read=60)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                      status=response.status, message="CT Log query failed")
+                chunks = response.content.iter_chunked(self.chunk_size)
+                if fixture:
+                    chunks = self._record(chunks, fixture)
+                async for entry in self._parse(chunks):
+                    yield entry
+
+    async def _parse(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parser = JSONArrayStream()
+        async for chunk in chunks:
+            for entry in parser.feed(decoder.decode(chunk)):
+                yield entry
+        for entry in parser.feed(decoder.decode(b"", final=True)):
+            yield entry
+        parser.close()
+
+    async def _read_file(self, path: str) -> AsyncIterator[bytes]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def _record(self, chunks: AsyncIterator[bytes], path: str) -> AsyncIterator[bytes]:
+        """Passes the body through while saving it, so the run can be replayed offline."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        partial = path + ".part"
+        with open(partial, "wb") as f:
+            async for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(partial, path)
+        log.info(f"[blue]*[/] CT response recorded to {path}")
+
+    def _fixture_path(self) -> Optional[str]:
+        return os.path.join(self.fixture_dir, f"{self.domain}.json") if self.fixture_dir else None
+
+    def _cache_path(self) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{self.domain}.json") if self.cache_dir else None
+
+    def _load_cache(self) -> Optional[Dict[str, Any]]:
+        path = self._cache_path()
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.debug(f"Ignoring unreadable CT cache {path}: {e}")
+            return None
+
+    def _save_cache(self, subdomains: Set[str]):
+        path = self._cache_path()
+        if not path:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"fetched": time.time(), "names": sorted(subdomains)}, f)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,75 @@
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+DEFAULT_SIGNATURES = os.path.join(os.path.dirname(__file__), "takeover_signatures.json")
+
+@dataclass
+class Fingerprint:
+    """One way an unclaimed resource gives itself away. Every field that is set must match."""
+    status: Optional[int] = None
+    body: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    nxdomain: bool = False # the CNAME target itself does not resolve
+
+    @property
+    def needs_http(self) -> bool:
+        return self.status is not None or self.body is not None or bool(self.headers)
+
+    def matches_head(self, status: int, headers) -> bool:
+        """Status and header checks; the body is matched separately while it streams in."""
+        if self.status is not None and status != self.status:
+            return False
+        return all(value.lower() in headers.get(name, "").lower() for name, value in self.headers.items())
+
+@dataclass
+class Signature:
+    provider: str
+    cnames: List[str]
+    fingerprints: List[Fingerprint]
+
+class SignatureIndex:
+    """
+    Suffix trie over reversed CNAME labels ("com" -> "amazonaws" -> "s3"), so finding the
+    provider of a CNAME costs one step per label, however many signatures are loaded.
+    A "*" label in a pattern matches any single label.
+    """
+    def __init__(self, signatures: List[Signature]):
+        self.signatures = signatures
+        self._root = {}
+        for sig in signatures:
+            for pattern in sig.cnames:
+                node = self._root
+                for label in reversed(pattern.lower().rstrip(".").split(".")):
+                    node = node.setdefault(label, {})
+                node.setdefault(None, []).append(sig) # The None key marks the end of a pattern
+
+    def match(self, cname: str) -> List[Signature]:
+        """Signatures of the most specific pattern that cname falls under."""
+        nodes = [self._root]
+        best = []
+        for label in reversed(cname.lower().rstrip(".").split(".")):
+            nodes = [child for node in nodes for child in (node.get(label), node.get("*")) if child is not None]
+            if not nodes:
+                break
+            found = [sig for node in nodes for sig in node.get(None, ())]
+            if found:
+                best = found
+        return best
+
+@lru_cache(maxsize=None)
+def load_signatures(path: str = DEFAULT_SIGNATURES) -> SignatureIndex:
+    """Loads and indexes a signature file once per process."""
+    with open(path) as f:
+        entries = json.load(f)
+    signatures = [
+        Signature(
+            provider=entry["provider"],
+            cnames=entry["cnames"],
+            fingerprints=[Fingerprint(**fp) for fp in entry["fingerprints"]]
+        )
+        for entry in entries
+    ]
+    return SignatureIndex(signatures)
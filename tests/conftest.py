@@ -0,0 +1,57 @@
+import asyncio
+import dns.message
+import dns.name
+import dns.rdatatype
+import pytest
+from contextlib import asynccontextmanager
+from typing import List
+from bench.fakeauth import SyntheticZone, FakeAuthServer
+from core.rtt import RTTTracker
+
+ORIGIN = "bench.test"
+
+class TruncatingServer(FakeAuthServer):
+    """Drops the TCP connection after the first message of every transfer."""
+    def _tcp_responses(self, query: dns.message.Message):
+        for i, response in enumerate(super()._tcp_responses(query)):
+            if i == 1:
+                raise ConnectionError("transfer cut off")
+            yield response
+
+@asynccontextmanager
+async def serving(*servers: FakeAuthServer):
+    """Runs fake servers on the current event loop (they listen on port 53, which needs root)."""
+    try:
+        for server in servers:
+            await server.start()
+        yield servers
+    finally:
+        for server in servers:
+            server.close()
+        await asyncio.sleep(0) # Lets the transports finish closing
+
+def transfer_messages(zone: SyntheticZone, rrsets: list, per_message: int) -> List[dns.message.Message]:
+    """rrsets split into transfer messages as a client reads them off the wire."""
+    query = dns.message.make_query(zone.origin, dns.rdatatype.AXFR)
+    messages = []
+    for i in range(0, len(rrsets), per_message):
+        response = dns.message.make_response(query)
+        response.answer = rrsets[i:i + per_message]
+        messages.append(dns.message.from_wire(response.to_wire(), xfr=True, origin=zone.origin,
+                                              one_rr_per_rrset=True))
+    return messages
+
+def zone_size(zone: SyntheticZone) -> int:
+    """Records in the zone, counting the SOA once."""
+    return sum(len(rrset) for rrset in zone.axfr()) - 1
+
+@pytest.fixture(autouse=True)
+def fresh_rtt():
+    # Estimators are process-wide; one test's timeouts must not slow the next one down
+    RTTTracker.reset()
+    yield
+    RTTTracker.reset()
+
+@pytest.fixture
+def zone() -> SyntheticZone:
+    return SyntheticZone(ORIGIN, size=500)
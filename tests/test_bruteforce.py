@@ -0,0 +1,48 @@
+import asyncio
+from bench.fakeauth import FakeAuthServer, SyntheticZone
+from core import bruteforce
+from core.bruteforce import BruteForcer
+from tests.conftest import ORIGIN, serving
+
+def test_labels_skip_recent_repeats_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(bruteforce, "RECENT_LABELS", 3)
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("www\nWWW\nmail.\n\napi\nwww\ndev\ntest\nwww\n")
+    labels = list(BruteForcer(ORIGIN, [], str(wordlist))._labels())
+    # The last www is more than three labels after the one before it
+    assert labels == ["www", "mail", "api", "dev", "test", "www"]
+
+def test_found_names_go_to_the_sink_only(tmp_path):
+    zone = SyntheticZone(ORIGIN, size=200)
+    hosts = sorted(name.relativize(zone.origin).to_text() for name in zone.names if name != zone.origin)
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("\n".join(hosts + ["nosuchname1", "nosuchname2"]) + "\n")
+
+    async def brute(sink):
+        async with serving(FakeAuthServer(zone)):
+            forcer = BruteForcer(ORIGIN, ["127.0.0.2"], str(wordlist), concurrency=20, timeout=1.0, on_records=sink)
+            return forcer, await forcer.run()
+
+    found = []
+    forcer, records = asyncio.run(brute(found.extend))
+    assert records == [] and forcer.records == []
+    assert forcer.stats.found == len(hosts)
+    assert {record.name for record in found} == {f"{host}.{ORIGIN}" for host in hosts}
+
+    forcer, records = asyncio.run(brute(None))
+    assert {record.name for record in records} == {f"{host}.{ORIGIN}" for host in hosts}
+
+def test_lost_names_are_retried_once_and_counted(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("www\nmail\n")
+    timeouts = []
+
+    class SilentPool:
+        async def query_raw(self, question, timeout, retries, primary):
+            timeouts.append(timeout)
+            raise asyncio.TimeoutError
+
+    forcer = BruteForcer(ORIGIN, [], str(wordlist), timeout=1.0)
+    asyncio.run(forcer._worker(forcer._labels(), SilentPool(), 0))
+    assert timeouts == [1.0, 2.0, 1.0, 2.0]
+    assert forcer.stats.lost == 2 and forcer.stats.sent == 4 and forcer.stats.answered == 0
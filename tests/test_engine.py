@@ -0,0 +1,51 @@
+import asyncio
+from bench.fakeauth import FakeAuthServer, SyntheticZone
+from core.engine import StrategyEngine
+from output.store import ScanStore
+from tests.conftest import ORIGIN, TruncatingServer, serving, zone_size
+
+NAMESERVERS = ["127.0.0.2", "127.0.0.3"]
+
+def race(zone: SyntheticZone, full_latency: float = 0.2, **engine_options):
+    """Runs the engine against a server that cuts its AXFR off and a slower one that completes it."""
+    async def run():
+        async with serving(TruncatingServer(zone, host="127.0.0.2"),
+                           FakeAuthServer(zone, host="127.0.0.3", latency=full_latency)):
+            return await StrategyEngine(ORIGIN, NAMESERVERS, deadline=20.0, **engine_options).run()
+    return asyncio.run(run())
+
+def test_truncated_transfer_does_not_win():
+    zone = SyntheticZone(ORIGIN, size=1000)
+    winner, records = race(zone)
+    assert winner == "127.0.0.3"
+    assert len(records) == len(set(records)) == zone_size(zone)
+
+def test_truncated_transfer_does_not_win_with_a_sink():
+    zone = SyntheticZone(ORIGIN, size=1000)
+    delivered = []
+    winner, records = race(zone, on_records=delivered.extend)
+    assert winner == "127.0.0.3"
+    assert records == []
+    # The first NS's partial batch may have reached the sink too, but nothing outside the zone did
+    assert len(set(delivered)) == zone_size(zone)
+
+def test_truncated_transfer_is_not_stored(tmp_path):
+    zone = SyntheticZone(ORIGIN, size=1000)
+    store = ScanStore(str(tmp_path / "scan.db"))
+    try:
+        winner, records = race(zone, store=store)
+        assert winner == "127.0.0.3"
+        assert store.serial(ORIGIN, "127.0.0.3") == zone.serial
+        assert store.serial(ORIGIN, "127.0.0.2") is None
+        assert sum(len(batch) for batch in store.records(ORIGIN, "127.0.0.3")) == zone_size(zone)
+    finally:
+        store.close()
+
+def test_no_winner_when_every_transfer_breaks_off():
+    zone = SyntheticZone(ORIGIN, size=1000)
+
+    async def run():
+        async with serving(TruncatingServer(zone, host="127.0.0.2"), TruncatingServer(zone, host="127.0.0.3")):
+            return await StrategyEngine(ORIGIN, NAMESERVERS, deadline=20.0).run()
+
+    assert asyncio.run(run()) == (None, [])
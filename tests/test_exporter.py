@@ -0,0 +1,56 @@
+import argparse
+import csv
+import gzip
+import json
+import zlib
+import pytest
+import main
+from core.records import Record
+from output.exporter import Exporter, RecordStream
+
+RECORDS = [Record(f"host{i}.example.com", "A", f"192.0.2.{i}") for i in range(10)]
+
+def test_ndjson_stream_is_renamed_on_close(tmp_path):
+    path = tmp_path / "example.com.ndjson"
+    with RecordStream(str(path)) as stream:
+        stream.write(RECORDS[:4])
+        stream.write(RECORDS[4:])
+        assert not path.exists()
+        assert (tmp_path / "example.com.ndjson.part").exists()
+    assert not (tmp_path / "example.com.ndjson.part").exists()
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [r.to_dict() for r in RECORDS]
+    assert stream.written == len(RECORDS)
+
+def test_csv_stream_has_one_header(tmp_path):
+    path = tmp_path / "example.com.csv"
+    with RecordStream(str(path)) as stream:
+        stream.write(RECORDS[:5])
+        stream.write(RECORDS[5:])
+    rows = list(csv.reader(path.read_text().splitlines()))
+    assert rows[0] == list(Record.FIELDS)
+    assert [Record(*row) for row in rows[1:]] == RECORDS
+
+def test_checkpoint_makes_the_partial_file_readable(tmp_path):
+    path = tmp_path / "example.com.ndjson.gz"
+    stream = RecordStream(str(path), checkpoint_records=5)
+    stream.write(RECORDS[:5]) # Reaches checkpoint_records
+    partial = (tmp_path / "example.com.ndjson.gz.part").read_bytes()
+    # A sync flush ends the deflate block without the gzip trailer, as a tailing reader sees it
+    text = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(partial).decode()
+    assert [json.loads(line)["name"] for line in text.splitlines()] == [r.name for r in RECORDS[:5]]
+    stream.write(RECORDS[5:])
+    stream.close()
+    stream.close() # A second close is a no-op
+    assert len(gzip.decompress(path.read_bytes()).decode().splitlines()) == len(RECORDS)
+
+def test_exporter_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        Exporter(str(tmp_path), "example.com").stream("xml")
+
+def test_stream_formats_argument(monkeypatch):
+    assert main.stream_formats("ndjson,csv.gz") == ["ndjson", "csv.gz"]
+    with pytest.raises(argparse.ArgumentTypeError):
+        main.stream_formats("ndjson,xml")
+    monkeypatch.setattr(main, "zstandard", None)
+    with pytest.raises(argparse.ArgumentTypeError):
+        main.stream_formats("ndjson.zst")
@@ -0,0 +1,32 @@
+from analysis.intel import CIDRSet
+
+def test_nested_networks_use_the_narrowest_label():
+    cidrs = CIDRSet({"wide": ["10.0.0.0/8"], "narrow": ["10.1.0.0/16"], "narrower": ["10.1.2.0/24"]})
+    assert cidrs.lookup("10.0.0.1") == "wide"
+    assert cidrs.lookup("10.1.0.0") == "narrow"
+    assert cidrs.lookup("10.1.2.255") == "narrower"
+    assert cidrs.lookup("10.1.3.0") == "narrow"
+    assert cidrs.lookup("10.2.0.0") == "wide"
+    assert cidrs.lookup("10.255.255.255") == "wide"
+    assert cidrs.lookup("11.0.0.0") is None
+    assert cidrs.lookup("9.255.255.255") is None
+
+def test_disjoint_networks_and_boundaries():
+    cidrs = CIDRSet({"a": ["192.0.2.0/25"], "b": ["192.0.2.128/25", "198.51.100.0/24"]})
+    assert cidrs.lookup("192.0.2.127") == "a"
+    assert cidrs.lookup("192.0.2.128") == "b"
+    assert cidrs.lookup("198.51.100.77") == "b"
+    assert cidrs.lookup("198.51.101.0") is None
+
+def test_ipv6_is_kept_apart_from_ipv4():
+    cidrs = CIDRSet({"v6": ["2001:db8::/32"], "v4": ["0.0.0.0/0"]})
+    assert cidrs.lookup("2001:db8:1::5") == "v6"
+    assert cidrs.lookup("2001:db9::1") is None
+    assert cidrs.lookup("203.0.113.9") == "v4"
+
+def test_non_addresses_and_host_bits():
+    cidrs = CIDRSet({"net": ["192.0.2.77/24"]}) # Host bits are tolerated
+    assert cidrs.lookup("192.0.2.1") == "net"
+    assert cidrs.lookup("www.example.com") is None
+    assert cidrs.lookup("") is None
+    assert CIDRSet({}).lookup("192.0.2.1") is None
@@ -0,0 +1,27 @@
+import pytest
+from utils.metrics import Metrics
+
+@pytest.fixture
+def metrics():
+    Metrics.configure()
+    yield Metrics
+    Metrics.configure(False)
+
+def test_prometheus_exports_every_phase_statistic(metrics):
+    metrics.span_done("axfr", 1.5)
+    metrics.span_done("axfr", 0.5)
+    metrics.span_done("walk", 2.0)
+    with metrics.phase("snoop"):
+        metrics.sent("192.0.2.53", 40)
+    text = metrics.prometheus()
+    lines = text.splitlines()
+    assert 'zonexplorer_phase_seconds_total{phase="axfr"} 2.0' in lines
+    assert 'zonexplorer_phase_runs_total{phase="axfr"} 2' in lines
+    assert 'zonexplorer_phase_longest_seconds{phase="axfr"} 1.5' in lines
+    assert 'zonexplorer_phase_runs_total{phase="walk"} 1' in lines
+    assert "# TYPE zonexplorer_phase_seconds_total counter" in lines
+    assert "# TYPE zonexplorer_phase_longest_seconds gauge" in lines
+    assert 'zonexplorer_queries_total{phase="snoop",target="192.0.2.53"} 1' in lines
+    # Counters follow the naming rules: every counter family ends in _total
+    counters = [line.split()[2] for line in lines if line.startswith("# TYPE") and line.endswith(" counter")]
+    assert counters and all(name.endswith("_total") for name in counters)
@@ -0,0 +1,91 @@
+import asyncio
+import dns.name
+import pytest
+from bench.fakeauth import FakeAuthServer, SyntheticZone
+from core.nsec3 import RING, NSEC3Chain, NSEC3Collector, name_wire
+from tests.conftest import ORIGIN, serving
+
+ORIGIN_WIRE = dns.name.from_text(ORIGIN).canonicalize().to_wire()
+
+class QuietServer(FakeAuthServer):
+    """Answers the first few queries, then nothing at all."""
+    def __init__(self, *args, answers: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.answers = answers
+
+    def datagram_received(self, data, addr):
+        if self.stats.queries < self.answers:
+            super().datagram_received(data, addr)
+        else:
+            self.stats.queries += 1
+
+def test_chain_coverage_and_wraparound():
+    chain = NSEC3Chain(1, 0, b"")
+    assert not chain.is_covered(5) and chain.coverage() == 0
+    assert chain.add(100, 200)
+    assert not chain.add(100, 300) # Owners are only added once
+    assert chain.is_covered(100) and chain.is_covered(150)
+    assert not chain.is_covered(200) and not chain.is_covered(99)
+    # The last link wraps around the end of the ring
+    chain.add(RING - 10, 10)
+    assert chain.is_covered(RING - 1) and chain.is_covered(0) and chain.is_covered(9)
+    assert not chain.is_covered(10)
+    assert chain.coverage() == pytest.approx(120 / RING)
+
+def test_chain_of_one_link_spans_the_ring():
+    chain = NSEC3Chain(1, 0, b"", {42: 42})
+    assert chain.coverage() == 1.0
+    assert chain.estimated_size() == 1
+
+def test_chain_counts_links_given_up_front():
+    half = RING // 2
+    chain = NSEC3Chain(1, 0, b"", {0: half, half: 0})
+    assert chain.coverage() == 1.0
+    assert chain.estimated_size() == 2
+    assert len(chain.hashes()) == 2
+
+def test_name_wire_matches_dnspython():
+    origin = dns.name.from_text(ORIGIN)
+    for name in ["www", "WWW", "a.b.c", "x" * 63]:
+        assert name_wire(name, ORIGIN_WIRE) == dns.name.from_text(name, origin).canonicalize().to_wire()
+
+@pytest.mark.parametrize("name", ["x" * 64, "a..b", "trailing.", "", "café", ".".join(["x" * 63] * 4)])
+def test_name_wire_rejects_invalid_names(name):
+    with pytest.raises(ValueError):
+        name_wire(name, ORIGIN_WIRE)
+
+def test_collector_covers_the_chain():
+    zone = SyntheticZone(ORIGIN, size=300, nsec3=True)
+
+    async def collect():
+        async with serving(FakeAuthServer(zone)):
+            collector = NSEC3Collector(ORIGIN, "127.0.0.2", concurrency=8, timeout=1.0)
+            return await collector.run(0.99)
+
+    chain = asyncio.run(collect())
+    assert chain.coverage() >= 0.99
+    assert (chain.salt, chain.iterations) == (zone.salt, zone.iterations)
+    assert chain.hashes() <= {digest for digest, _ in zone.hashes}
+
+def test_collector_gives_up_on_a_silent_server():
+    zone = SyntheticZone(ORIGIN, size=300, nsec3=True)
+
+    async def collect():
+        async with serving(QuietServer(zone, answers=1)):
+            collector = NSEC3Collector(ORIGIN, "127.0.0.2", concurrency=4, timeout=0.2, retries=0)
+            chain = await collector.run(0.99, max_queries=100000)
+            return chain, collector
+
+    chain, collector = asyncio.run(asyncio.wait_for(collect(), 30))
+    assert chain is not None and chain.coverage() < 0.99
+    assert collector.queries < 100
+
+def test_collector_without_a_first_answer_finds_no_chain():
+    zone = SyntheticZone(ORIGIN, size=300, nsec3=True)
+
+    async def collect():
+        async with serving(QuietServer(zone, answers=0)):
+            collector = NSEC3Collector(ORIGIN, "127.0.0.2", concurrency=4, timeout=0.2, retries=0)
+            return await collector.run(0.99)
+
+    assert asyncio.run(asyncio.wait_for(collect(), 30)) is None
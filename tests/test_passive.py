@@ -0,0 +1,16 @@
+import pytest
+from recon.passive import JSONArrayStream
+
+def test_array_elements_are_yielded_across_chunks():
+    parser = JSONArrayStream()
+    text = '[{"name_value": "www.example.com"}, {"name_value": "mail.example.com"}]'
+    elements = [element for i in range(0, len(text), 7) for element in parser.feed(text[i:i + 7])]
+    parser.close()
+    assert [element["name_value"] for element in elements] == ["www.example.com", "mail.example.com"]
+
+def test_an_element_that_never_ends_is_an_error():
+    parser = JSONArrayStream(max_element=64)
+    assert list(parser.feed('[{"name_value": "www.example.com"}, {"name_value": "')) == [{"name_value": "www.example.com"}]
+    with pytest.raises(ValueError):
+        for _ in range(10):
+            list(parser.feed("x" * 16))
@@ -0,0 +1,26 @@
+import pytest
+from utils.ratelimit import TokenBucket
+
+def test_burst_is_free_then_reservations_queue_up():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    delays = [bucket.reserve() for _ in range(3)]
+    assert delays == pytest.approx([0.1, 0.2, 0.3], abs=0.01)
+
+def test_default_burst_is_one_second_of_tokens():
+    assert TokenBucket(rate=5).capacity == 5
+    assert TokenBucket(rate=0.5).capacity == 1.0
+
+def test_refill_is_capped_at_capacity():
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.updated -= 60 # A minute idle refills the bucket, but only up to the burst
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+def test_partial_refill():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.reserve()
+    bucket.updated -= 0.05 # Half a token back
+    assert bucket.reserve() == pytest.approx(0.05, abs=0.01)
@@ -0,0 +1,60 @@
+from core.records import NameTree, Record, RecordSet
+
+def test_record_equality_and_hash():
+    a = Record("www.example.com", "A", "192.0.2.1")
+    b = Record("www.example.com", "A", "192.0.2.1")
+    assert a == b and hash(a) == hash(b)
+    assert a != Record("www.example.com", "A", "192.0.2.2")
+    assert a.to_dict() == {"name": "www.example.com", "type": "A", "value": "192.0.2.1"}
+
+def test_recordset_drops_duplicates_in_arrival_order():
+    records = RecordSet()
+    first = [Record("a.example.com", "A", "192.0.2.1"), Record("b.example.com", "A", "192.0.2.2")]
+    assert records.extend(first) == first
+    assert records.extend([Record("b.example.com", "A", "192.0.2.2"), Record("c.example.com", "A", "192.0.2.3")]) \
+        == [Record("c.example.com", "A", "192.0.2.3")]
+    assert not records.add(Record("a.example.com", "A", "192.0.2.1"))
+    assert [r.name for r in records] == ["a.example.com", "b.example.com", "c.example.com"]
+    assert len(records) == 3
+    assert Record("c.example.com", "A", "192.0.2.3") in records
+    assert records.tail(2) == [Record("b.example.com", "A", "192.0.2.2"), Record("c.example.com", "A", "192.0.2.3")]
+
+def test_recordset_index_catches_up():
+    records = RecordSet([Record("www.example.com", "A", "192.0.2.1")])
+    tree = records.index()
+    assert tree.owners == 1
+    records.add(Record("mail.example.com", "A", "192.0.2.2"))
+    assert records.index() is tree
+    assert tree.owners == 2
+    assert tree.find("mail.example.com") is not None
+    records.add(Record("www.example.com", "AAAA", "2001:db8::1"))
+    records.index()
+    assert records.index() is tree
+    assert [len(node.records) for node in tree.subtree()] == [2, 1]
+
+def test_nametree_merges_spellings_of_one_owner():
+    tree = NameTree([
+        Record("@.example.com", "SOA", "ns1 hostmaster 1 3600 600 86400 300"),
+        Record("example.com", "NS", "ns1.example.com."),
+        Record("WWW.Example.com.", "A", "192.0.2.1"),
+        Record("www.example.com", "AAAA", "2001:db8::1"),
+    ])
+    assert tree.owners == 2
+    apex = tree.find("example.com")
+    assert set(apex.records) == {"SOA", "NS"}
+    www = tree.find("www.example.com.")
+    assert www.name == "www.example.com"
+    assert set(www.records) == {"A", "AAAA"}
+
+def test_nametree_hierarchy_queries():
+    tree = NameTree(Record(name, "A", "192.0.2.1") for name in
+                    ["a.dev.example.com", "b.dev.example.com", "x.a.dev.example.com", "www.example.com", "other.org"])
+    assert tree.find("nothing.example.com") is None
+    assert tree.find("dev.example.com").records == {} # A label on the way, not an owner
+    assert [n.name for n in tree.subtree("dev.example.com")] == ["a.dev.example.com", "x.a.dev.example.com",
+                                                                 "b.dev.example.com"]
+    assert {n.name for n in tree.at_depth("example.com", 1)} == {"www.example.com"}
+    assert {n.name for n in tree.at_depth("example.com", 2)} == {"a.dev.example.com", "b.dev.example.com"}
+    assert len(list(tree.records("example.com"))) == 4
+    assert len(list(tree.records())) == 5
+    assert list(tree.records("example.com", "AAAA")) == []
@@ -0,0 +1,67 @@
+import asyncio
+import dns.exception
+import dns.message
+import dns.rdatatype
+import pytest
+from bench.fakeauth import FakeAuthServer, SyntheticZone
+from core.transport import Connections, DNSChannel, TCPChannel, UDPChannel
+from tests.conftest import ORIGIN, serving
+
+def ask(channel: DNSChannel, server: FakeAuthServer, **query_options) -> dns.message.Message:
+    async def run():
+        async with serving(server):
+            if isinstance(channel, UDPChannel):
+                await channel.__aenter__()
+            try:
+                request = dns.message.make_query(f"ns1.{ORIGIN}", dns.rdatatype.A)
+                return await channel.query(request, **query_options)
+            finally:
+                channel.close()
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("channel_type", [UDPChannel, TCPChannel])
+def test_query_is_answered_and_sampled(channel_type):
+    # Channels are created inside the test, after the autouse fixture reset the estimators
+    channel = channel_type("127.0.0.2")
+    response = ask(channel, FakeAuthServer(SyntheticZone(ORIGIN, size=10)))
+    assert response.answer[0][0].address == "127.0.0.2"
+    assert channel.rtt.srtt is not None
+
+def test_lost_queries_time_out_and_back_off():
+    server = FakeAuthServer(SyntheticZone(ORIGIN, size=10), loss=1.0)
+    with pytest.raises(dns.exception.Timeout):
+        ask(UDPChannel("127.0.0.2"), server, timeout=0.1, retries=1)
+    assert server.stats.queries == 2 # The first send and one retry
+
+def test_channel_needs_a_transport():
+    with pytest.raises(TypeError):
+        DNSChannel("127.0.0.2")
+
+def test_pools_of_an_abandoned_event_loop_are_closed():
+    zone = SyntheticZone(ORIGIN, size=10)
+    old_loop = asyncio.new_event_loop()
+    Connections.configure(tcp=True, size=1)
+    server = None
+    try:
+        async def first():
+            server = FakeAuthServer(zone)
+            await server.start()
+            pool = Connections.get("127.0.0.2")
+            await pool.query(dns.message.make_query(f"ns1.{ORIGIN}", dns.rdatatype.A))
+            return server, pool, pool.channels[0]._writer
+
+        server, old_pool, writer = old_loop.run_until_complete(first())
+
+        async def second():
+            return Connections.get("127.0.0.2")
+
+        # The first loop stays open but never runs again
+        assert asyncio.run(second()) is not old_pool
+        assert writer.is_closing()
+        assert old_pool.channels[0]._writer is None
+    finally:
+        Connections.configure()
+        if server:
+            server.close()
+        old_loop.run_until_complete(asyncio.sleep(0.05)) # Lets its tasks see the closed connections
+        old_loop.close()
@@ -0,0 +1,97 @@
+import asyncio
+import dns.exception
+import dns.rcode
+import pytest
+from core.xfr import XFRState, XFRStream
+from tests.conftest import ORIGIN, TruncatingServer, serving, transfer_messages, zone_size
+from bench.fakeauth import FakeAuthServer
+
+def feed_all(state: XFRState, messages) -> list:
+    changes = []
+    for message in messages:
+        changes.extend(state.feed(message))
+    return changes
+
+@pytest.mark.parametrize("per_message", [1, 7, 200, 10000])
+def test_axfr_across_message_boundaries(zone, per_message):
+    state = XFRState(ORIGIN)
+    changes = feed_all(state, transfer_messages(zone, zone.axfr(), per_message))
+    assert state.done
+    assert state.end_serial == zone.serial
+    assert not state.incremental
+    assert len(changes) == zone_size(zone)
+    assert all(op == "add" for op, _ in changes)
+    assert changes[0][1].type == "SOA"
+    assert all(record.name.endswith("." + ORIGIN) for _, record in changes)
+
+def test_truncated_axfr_is_not_done(zone):
+    messages = transfer_messages(zone, zone.axfr(), 50)
+    state = XFRState(ORIGIN)
+    changes = feed_all(state, messages[:-1])
+    assert not state.done
+    assert len(changes) < zone_size(zone)
+
+def test_axfr_missing_only_closing_soa_is_not_done(zone):
+    state = XFRState(ORIGIN)
+    feed_all(state, transfer_messages(zone, zone.axfr()[:-1], 50))
+    assert not state.done
+
+def test_records_after_closing_soa_are_rejected(zone):
+    rrsets = zone.axfr()
+    state = XFRState(ORIGIN)
+    with pytest.raises(dns.exception.FormError):
+        feed_all(state, transfer_messages(zone, rrsets + rrsets[1:2], 10000))
+
+def test_transfer_must_start_with_soa(zone):
+    with pytest.raises(dns.exception.FormError):
+        feed_all(XFRState(ORIGIN), transfer_messages(zone, zone.axfr()[1:], 10))
+
+def test_refused_transfer_raises(zone):
+    message = transfer_messages(zone, zone.axfr()[:1], 1)[0]
+    message.set_rcode(dns.rcode.REFUSED)
+    with pytest.raises(dns.exception.DNSException):
+        XFRState(ORIGIN).feed(message)
+
+def test_ixfr_diffs_span_several_versions(zone):
+    old = zone.first_serial
+    state = XFRState(ORIGIN, old)
+    changes = feed_all(state, transfer_messages(zone, zone.ixfr(old), 3))
+    assert state.done and state.incremental
+    assert state.end_serial == zone.serial
+    deleted = {(r.name, r.value) for op, r in changes if op == "delete" and r.type == "A"}
+    added = {(r.name, r.value) for op, r in changes if op == "add" and r.type == "A"}
+    expected_deleted = {(f"{owner}.{ORIGIN}", value) for serial in range(old, zone.serial)
+                        for owner, _, value in zone.diffs[serial][0]}
+    expected_added = {(f"{owner}.{ORIGIN}", value) for serial in range(old, zone.serial)
+                      for owner, _, value in zone.diffs[serial][1]}
+    assert deleted == expected_deleted
+    assert added == expected_added
+
+def test_ixfr_up_to_date(zone):
+    state = XFRState(ORIGIN, zone.serial)
+    assert feed_all(state, transfer_messages(zone, zone.ixfr(zone.serial), 1)) == []
+    assert state.done and not state.incremental
+
+def test_xfr_stream_from_server(zone):
+    async def transfer():
+        async with serving(FakeAuthServer(zone)):
+            stream = XFRStream(ORIGIN, "127.0.0.2")
+            return [record async for batch in stream.records() for record in batch], stream.state
+
+    records, state = asyncio.run(transfer())
+    assert state.done
+    assert len(records) == zone_size(zone)
+
+def test_xfr_stream_cut_off(zone):
+    async def transfer():
+        async with serving(TruncatingServer(zone)):
+            stream = XFRStream(ORIGIN, "127.0.0.2")
+            records = []
+            with pytest.raises(EOFError):
+                async for batch in stream.records():
+                    records.extend(batch)
+            return records, stream.state
+
+    records, state = asyncio.run(transfer())
+    assert not state.done
+    assert 0 < len(records) < zone_size(zone)
@@ -0,0 +1,240 @@
+import asyncio
+import bisect
+import contextvars
+import json
+import os
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Dict, Optional, Tuple, Union
+import dns.flags
+import dns.message
+import dns.rcode
+
+# Upper bounds (seconds) of the RTT histogram buckets; one more bucket catches everything above
+RTT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# The scan phase queries are attributed to; asyncio tasks inherit it from whoever created them
+_phase = contextvars.ContextVar("phase", default="other")
+
+class QueryStats:
+    """Counters for one (phase, target) pair. A target is an NS address or an HTTP host."""
+    __slots__ = ("queries", "hedged", "responses", "timeouts", "truncated", "bytes_sent", "bytes_received",
+                 "rtt_sum", "buckets", "codes", "errors")
+
+    def __init__(self):
+        self.queries = 0
+        self.hedged = 0 # queries sent here because another server was slow
+        self.responses = 0
+        self.timeouts = 0 # individual attempts that got no answer, retries included
+        self.truncated = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.rtt_sum = 0.0
+        self.buckets = [0] * (len(RTT_BUCKETS) + 1)
+        self.codes = Counter() # rcode names, or "HTTP <status>"
+        self.errors = Counter() # operations that failed for good, by exception type
+
+    def to_dict(self) -> dict:
+        return {
+            "queries": self.queries, "hedged": self.hedged, "responses": self.responses, "timeouts": self.timeouts,
+            "truncated": self.truncated, "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received,
+            "rtt_sum": round(self.rtt_sum, 6), "rtt_buckets": dict(zip([*map(str, RTT_BUCKETS), "+Inf"], self.buckets)),
+            "codes": dict(self.codes), "errors": dict(self.errors)
+        }
+
+class _Span:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._token = _phase.set(self.name)
+        self._started = time.monotonic()
+
+    def __exit__(self, *exc):
+        _phase.reset(self._token)
+        Metrics.span_done(self.name, time.monotonic() - self._started)
+
+class Metrics:
+    """
+    Process-wide query and phase metrics. Off by default: every hook then returns after
+    one attribute check, and hot paths test Metrics.enabled before calling at all.
+    """
+    enabled = False
+    _stats: Dict[Tuple[str, str], QueryStats] = {}
+    _spans: Dict[str, list] = {} # phase -> [count, total seconds, longest]
+    _started = 0.0
+    _null = nullcontext()
+
+    @classmethod
+    def configure(cls, enabled: bool = True):
+        cls.enabled = enabled
+        cls._stats = {}
+        cls._spans = {}
+        cls._started = time.monotonic()
+
+    @classmethod
+    def phase(cls, name: str):
+        """Context manager that times a phase and attributes the queries sent inside it."""
+        return _Span(name) if cls.enabled else cls._null
+
+    @classmethod
+    def span_done(cls, name: str, seconds: float):
+        span = cls._spans.setdefault(name, [0, 0.0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+        span[2] = max(span[2], seconds)
+
+    @classmethod
+    def _for(cls, target: str) -> QueryStats:
+        key = (_phase.get(), target)
+        stats = cls._stats.get(key)
+        if stats is None:
+            stats = cls._stats[key] = QueryStats()
+        return stats
+
+    @classmethod
+    def sent(cls, target: str, size: int = 0):
+        if not cls.enabled:
+            return
+        stats = cls._for(target)
+        stats.queries += 1
+        stats.bytes_sent += size
+
+    @classmethod
+    def received(cls, target: str, rtt: Optional[float], code: str, size: int = 0, truncated: bool = False):
+        if not cls.enabled:
+            return
+        stats = cls._for(target)
+        stats.responses += 1
+        stats.bytes_received += size
+        stats.codes[code] += 1
+        if truncated:
+            stats.truncated += 1
+        if rtt is not None:
+            stats.rtt_sum += rtt
+            stats.buckets[bisect.bisect_left(RTT_BUCKETS, rtt)] += 1
+
+    @classmethod
+    def dns_response(cls, target: str, rtt: Optional[float], response: Union[bytes, dns.message.Message]):
+        """received() for a DNS answer, given as raw wire data or a parsed message."""
+        if not cls.enabled:
+            return
+        if isinstance(response, (bytes, bytearray)):
+            wire = response
+            rcode, truncated = wire[3] & 0x0F, bool(wire[2] & 0x02)
+        else:
+            wire = response.wire or b""
+            rcode, truncated = response.rcode(), bool(response.flags & dns.flags.TC)
+        cls.received(target, rtt, dns.rcode.to_text(rcode), len(wire), truncated)
+
+    @classmethod
+    def hedged(cls, target: str):
+        if cls.enabled:
+            cls._for(target).hedged += 1
+
+    @classmethod
+    def timeout(cls, target: str):
+        if cls.enabled:
+            cls._for(target).timeouts += 1
+
+    @classmethod
+    def error(cls, target: str, exc: BaseException):
+        if cls.enabled:
+            cls._for(target).errors[type(exc).__name__] += 1
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        return {
+            "uptime": round(time.monotonic() - cls._started, 3),
+            "phases": {name: {"count": count, "seconds": round(total, 6), "longest": round(longest, 6)}
+                       for name, (count, total, longest) in cls._spans.items()},
+            "targets": [{"phase": phase, "target": target, **stats.to_dict()}
+                        for (phase, target), stats in sorted(cls._stats.items())]
+        }
+
+    @classmethod
+    def write_json(cls, path: str):
+        with open(path, "w") as f:
+            json.dump(cls.snapshot(), f, indent=2)
+
+    @classmethod
+    def prometheus(cls) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP zonexplorer_{name} {help_text}")
+            lines.append(f"# TYPE zonexplorer_{name} {kind}")
+
+        def sample(name: str, labels: Dict[str, str], value):
+            text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            lines.append(f"zonexplorer_{name}{{{text}}} {value}")
+
+        counters = (("queries_total", "queries", "Queries and HTTP requests sent"),
+                    ("hedged_total", "hedged", "Queries sent because another server was slow to answer"),
+                    ("responses_total", "responses", "Responses received"),
+                    ("timeouts_total", "timeouts", "Attempts that got no response"),
+                    ("truncated_total", "truncated", "DNS responses with the TC bit set"),
+                    ("sent_bytes_total", "bytes_sent", "Bytes sent"),
+                    ("received_bytes_total", "bytes_received", "Bytes received"))
+        for name, attr, help_text in counters:
+            family(name, "counter", help_text)
+            for (phase, target), stats in sorted(cls._stats.items()):
+                sample(name, {"phase": phase, "target": target}, getattr(stats, attr))
+
+        for name, attr, label, help_text in (("response_codes_total", "codes", "code", "Responses by rcode or HTTP status"),
+                                             ("errors_total", "errors", "error", "Failed operations by exception type")):
+            family(name, "counter", help_text)
+            for (phase, target), stats in sorted(cls._stats.items()):
+                for key, count in getattr(stats, attr).items():
+                    sample(name, {"phase": phase, "target": target, label: key}, count)
+
+        family("rtt_seconds", "histogram", "Round trip time of answered queries")
+        for (phase, target), stats in sorted(cls._stats.items()):
+            labels = {"phase": phase, "target": target}
+            cumulative = 0
+            for bound, count in zip([*map(str, RTT_BUCKETS), "+Inf"], stats.buckets):
+                cumulative += count
+                sample("rtt_seconds_bucket", {**labels, "le": bound}, cumulative)
+            sample("rtt_seconds_sum", labels, round(stats.rtt_sum, 6))
+            sample("rtt_seconds_count", labels, cumulative)
+
+        spans = sorted(cls._spans.items())
+        family("phase_seconds_total", "counter", "Time spent in each scan phase, summed over domains")
+        for name, (_, total, _) in spans:
+            sample("phase_seconds_total", {"phase": name}, round(total, 6))
+        family("phase_runs_total", "counter", "Times each scan phase ran, one per domain")
+        for name, (count, _, _) in spans:
+            sample("phase_runs_total", {"phase": name}, count)
+        family("phase_longest_seconds", "gauge", "Longest single run of each scan phase")
+        for name, (_, _, longest) in spans:
+            sample("phase_longest_seconds", {"phase": name}, round(longest, 6))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def write_prometheus(cls, path: str):
+        """Writes the text format atomically, for the node_exporter textfile collector."""
+        with open(path + ".tmp", "w") as f:
+            f.write(cls.prometheus())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    async def serve(cls, host: str, port: int) -> asyncio.AbstractServer:
+        """Minimal HTTP endpoint answering every request with the Prometheus text."""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass # Request line and headers: every path gets the metrics
+                body = cls.prometheus().encode()
+                writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+        return await asyncio.start_server(handle, host, port)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
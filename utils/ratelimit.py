@@ -0,0 +1,81 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+@dataclass
+class RateLimitConfig:
+    per_target: Optional[float] = None # queries/sec to one NS or HTTP host, None = unlimited
+    global_rate: Optional[float] = None # queries/sec across all targets, None = unlimited
+    jitter: float = 0.0 # max random extra delay per request (seconds)
+
+class TokenBucket:
+    """
+    Reservation-based token bucket. Each caller takes a token immediately (the balance
+    may go negative) and is told how long to wait, so waiters are served in order
+    without polling. Safe to share between the event loop and worker threads.
+    """
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token and returns the delay (seconds) before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class RateLimiter:
+    """
+    Process-wide rate limits: one token bucket per target (NS address or HTTP host) plus
+    an optional global QPS budget. Per-target limits only slow down that target, so a
+    stealthy scan still runs every target in parallel.
+    """
+    _config = RateLimitConfig()
+    _buckets: Dict[str, TokenBucket] = {}
+    _global: Optional[TokenBucket] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, per_target: Optional[float] = None, global_rate: Optional[float] = None, jitter: float = 0.0):
+        cls._config = RateLimitConfig(per_target, global_rate, jitter)
+        cls._buckets = {}
+        cls._global = TokenBucket(global_rate) if global_rate else None
+
+    @classmethod
+    def _delay(cls, target: str) -> float:
+        config = cls._config
+        delay = 0.0
+        if config.per_target:
+            bucket = cls._buckets.get(target)
+            if bucket is None:
+                with cls._lock:
+                    bucket = cls._buckets.setdefault(target, TokenBucket(config.per_target))
+            delay = bucket.reserve()
+        if cls._global:
+            delay = max(delay, cls._global.reserve())
+        if config.jitter:
+            delay += random.uniform(0, config.jitter)
+        return delay
+
+    @classmethod
+    async def acquire(cls, target: str):
+        """Waits, without blocking the event loop, until a request to target is allowed."""
+        delay = cls._delay(target)
+        if delay:
+            await asyncio.sleep(delay)
+
+    @classmethod
+    def acquire_sync(cls, target: str):
+        """Blocking variant of acquire() for sync code paths and worker threads."""
+        delay = cls._delay(target)
+        if delay:
+            time.sleep(delay)